@@ -14,10 +14,195 @@ MYSQL_USER = os.getenv("MYSQL_USER", "root")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "shooting-game")
 
+# Optional async SQLAlchemy URL overriding the MySQL settings above,
+# e.g. "sqlite+aiosqlite:///./local.db" for local testing
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+# Connection Pool Configuration (per worker process: total connections to
+# MySQL = gunicorn workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a pooled connection is replaced; keep below the server's
+# wait_timeout (and any proxy idle timeout) so idle connections never go stale
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Connections each worker opens at startup (0 disables warm-up)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "0"))
+# Apply pending schema migrations during application startup (under gunicorn,
+# once in the master before the workers are forked); set it to false when
+# migrations run as a separate deploy step (init_db.py)
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Read Replica Configuration
+# Comma-separated async URLs of read replicas (same pool settings as the
+# primary); rank, player, entry and page reads go to them round robin
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds between "SELECT 1" health checks of each replica
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+# Seconds a health check may take before the replica counts as down
+DB_REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", "2"))
+# MySQL replicas further behind than this are skipped (0 disables the lag
+# check; it needs the REPLICATION CLIENT privilege)
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "0"))
+# After a write, the client's reads go to the primary for this many seconds
+# (the X-Read-Your-Writes header it echoes back; 0 disables)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
 # Application Configuration
 API_PREFIX = "/api"
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
 
 # API Token Configuration
 API_TOKEN = os.getenv("API_TOKEN", "shooting-game-api-token-2024")
+# Additional per-client keys: a file of "client_id:token" lines and/or the
+# api_keys table (SHA-256 digests). API_TOKEN stays valid as client "default".
+API_KEYS_FILE = os.getenv("API_KEYS_FILE", "")
+API_KEYS_FROM_DB = os.getenv("API_KEYS_FROM_DB", "false").lower() == "true"
+# Seconds between reloads of the key sources
+API_KEYS_RELOAD_SECONDS = float(os.getenv("API_KEYS_RELOAD_SECONDS", "60"))
+# An unknown token triggers an early reload at most this often (new keys work sooner)
+API_KEYS_MISS_RELOAD_SECONDS = float(os.getenv("API_KEYS_MISS_RELOAD_SECONDS", "5"))
+# Rejected tokens remembered until the next reload, for at most API_KEYS_MISS_RELOAD_SECONDS
+API_KEYS_NEGATIVE_CACHE_SIZE = int(os.getenv("API_KEYS_NEGATIVE_CACHE_SIZE", "10000"))
+
+# Rate Limiting Configuration
+# Token buckets per (API key client, client IP) for /api routes; GET/HEAD
+# requests use the read budget, everything else the write budget. Off by
+# default: behind a reverse proxy every player shares the proxy's IP (and
+# so one bucket) unless the server trusts its X-Forwarded-For header
+# (FORWARDED_ALLOW_IPS in gunicorn_config.py)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_READ_PER_SECOND = float(os.getenv("RATE_LIMIT_READ_PER_SECOND", "20"))
+RATE_LIMIT_READ_BURST = float(os.getenv("RATE_LIMIT_READ_BURST", "40"))
+RATE_LIMIT_WRITE_PER_SECOND = float(os.getenv("RATE_LIMIT_WRITE_PER_SECOND", "2"))
+RATE_LIMIT_WRITE_BURST = float(os.getenv("RATE_LIMIT_WRITE_BURST", "10"))
+# Buckets unused this long are dropped (they would be full again anyway)
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "300"))
+# Memory-mapped bucket table shared by all workers of the host ("" = per worker)
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH", "")
+RATE_LIMIT_SHARED_SLOTS = int(os.getenv("RATE_LIMIT_SHARED_SLOTS", "65536"))
+
+
+# Leaderboard Cache Configuration
+# Top-N entries kept in memory (matches the max `limit` of GET /api/leaderboard)
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "100"))
+# Seconds before the cache is reloaded to pick up writes from other processes
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "5"))
+# Memory-mapped file sharing the cached top-N between worker processes on one
+# host (empty disables sharing; gunicorn_config.py sets a default)
+LEADERBOARD_SNAPSHOT_PATH = os.getenv("LEADERBOARD_SNAPSHOT_PATH", "")
+LEADERBOARD_SNAPSHOT_SIZE = int(os.getenv("LEADERBOARD_SNAPSHOT_SIZE", str(256 * 1024)))
+
+# Seconds browsers, CDNs and reverse proxies may reuse a GET /api/leaderboard
+# response without revalidating it (0 disables shared caching)
+LEADERBOARD_HTTP_MAX_AGE = int(os.getenv("LEADERBOARD_HTTP_MAX_AGE", "2"))
+
+# Live Leaderboard Stream Configuration (GET /api/leaderboard/stream)
+# Wait after a write so a burst of scores becomes one update
+LEADERBOARD_STREAM_COALESCE_MS = float(os.getenv("LEADERBOARD_STREAM_COALESCE_MS", "100"))
+# Seconds between checks for changes made by other workers
+LEADERBOARD_STREAM_POLL_SECONDS = float(os.getenv("LEADERBOARD_STREAM_POLL_SECONDS", "1"))
+# Seconds between keepalive comments on idle streams
+LEADERBOARD_STREAM_HEARTBEAT_SECONDS = float(os.getenv("LEADERBOARD_STREAM_HEARTBEAT_SECONDS", "15"))
+LEADERBOARD_STREAM_MAX_SUBSCRIBERS = int(os.getenv("LEADERBOARD_STREAM_MAX_SUBSCRIBERS", "10000"))
+# Streams are closed after this long; EventSource reconnects with Last-Event-ID,
+# which rebalances clients across workers and lets graceful shutdowns finish
+LEADERBOARD_STREAM_MAX_SECONDS = float(os.getenv("LEADERBOARD_STREAM_MAX_SECONDS", "300"))
+
+# Leaderboard Retention Configuration (archive_leaderboard.py)
+# Entries in the all-time top K always stay in the hot table
+LEADERBOARD_RETENTION_TOP_K = int(os.getenv("LEADERBOARD_RETENTION_TOP_K", "10000"))
+# Other entries older than this move to leaderboard_archive (at least 8 so
+# the week window never loses rows)
+LEADERBOARD_RETENTION_DAYS = int(os.getenv("LEADERBOARD_RETENTION_DAYS", "30"))
+# Rows moved per transaction
+LEADERBOARD_ARCHIVE_BATCH_SIZE = int(os.getenv("LEADERBOARD_ARCHIVE_BATCH_SIZE", "5000"))
+
+# Score Write Batching Configuration
+# Coalesce concurrent POST /api/leaderboard writes into multi-row INSERTs.
+# On MySQL this needs innodb_autoinc_lock_mode 0 or 1 so each INSERT gets
+# consecutive ids.
+SCORE_BATCH_ENABLED = os.getenv("SCORE_BATCH_ENABLED", "false").lower() == "true"
+SCORE_BATCH_MAX_SIZE = int(os.getenv("SCORE_BATCH_MAX_SIZE", "200"))
+SCORE_BATCH_MAX_DELAY_MS = float(os.getenv("SCORE_BATCH_MAX_DELAY_MS", "5"))
+
+# Score Write-Ahead Log Configuration (POST /api/leaderboard)
+# Acknowledge scores once appended to a local log on disk (202, no id yet);
+# each worker drains its log into the leaderboard table in the background,
+# so submissions keep being accepted while the database is down
+SCORE_WAL_ENABLED = os.getenv("SCORE_WAL_ENABLED", "false").lower() == "true"
+# Directory of the log segments; must survive restarts (not a tmpfs)
+SCORE_WAL_DIR = os.getenv("SCORE_WAL_DIR", "score-wal")
+# Size of each memory-mapped segment file
+SCORE_WAL_SEGMENT_BYTES = int(os.getenv("SCORE_WAL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+# Extra wait before an fsync so more appends share it (0: only appends made
+# while the previous fsync ran are grouped)
+SCORE_WAL_SYNC_DELAY_MS = float(os.getenv("SCORE_WAL_SYNC_DELAY_MS", "0"))
+# Records inserted per drain transaction
+SCORE_WAL_DRAIN_BATCH = int(os.getenv("SCORE_WAL_DRAIN_BATCH", "500"))
+# Seconds between scans for segments left behind by exited workers
+SCORE_WAL_ADOPT_SECONDS = float(os.getenv("SCORE_WAL_ADOPT_SECONDS", "5"))
+# Longest wait between drain retries while the database is failing
+SCORE_WAL_RETRY_MAX_SECONDS = float(os.getenv("SCORE_WAL_RETRY_MAX_SECONDS", "5"))
+# Failed inserts of a single record, while the database otherwise answers,
+# before it is moved to the segment's dead-letter file (<segment>.dead)
+SCORE_WAL_QUARANTINE_ATTEMPTS = int(os.getenv("SCORE_WAL_QUARANTINE_ATTEMPTS", "5"))
+
+# Bulk Score Submission Configuration (POST /api/leaderboard/batch)
+SCORE_BULK_MAX_ITEMS = int(os.getenv("SCORE_BULK_MAX_ITEMS", "5000"))
+SCORE_BULK_CHUNK_SIZE = int(os.getenv("SCORE_BULK_CHUNK_SIZE", "500"))
+
+# Leaderboard Export Configuration (GET /api/leaderboard/export)
+# Rows fetched from the server-side cursor and encoded per chunk
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+# Rows per Parquet row group (rows are held in Arrow form until a group is written)
+EXPORT_PARQUET_ROW_GROUP_ROWS = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_ROWS", "65536"))
+# Exports running at once per worker; each holds a pooled connection until done
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+
+# Rank Index Configuration (GET /api/leaderboard/rank)
+# Scores above this are tracked in a slower sorted list to bound memory
+RANK_INDEX_MAX_SCORE = int(os.getenv("RANK_INDEX_MAX_SCORE", "1000000"))
+# Seconds between catch-ups with rows inserted by other workers
+RANK_INDEX_SYNC_SECONDS = float(os.getenv("RANK_INDEX_SYNC_SECONDS", "1"))
+# Seconds between full rebuilds (picks up deletes made by other workers)
+RANK_INDEX_REBUILD_SECONDS = float(os.getenv("RANK_INDEX_REBUILD_SECONDS", "300"))
+# Seconds a catch-up waits for a missing id (an insert still committing) before skipping it
+RANK_INDEX_GAP_SECONDS = float(os.getenv("RANK_INDEX_GAP_SECONDS", "10"))
+
+# Windowed Leaderboards (GET /api/leaderboard?window=day|week)
+# Offset from UTC, in minutes, of the timezone where days and weeks roll over
+LEADERBOARD_WINDOW_UTC_OFFSET_MINUTES = int(os.getenv("LEADERBOARD_WINDOW_UTC_OFFSET_MINUTES", "0"))
+
+# Game Session Configuration (POST /api/sessions)
+# HMAC key signing session ids; every worker and host must share it. If unset a
+# random key is generated at startup, so sessions do not survive a restart
+# (and, without gunicorn preload, only work on the worker that issued them)
+GAME_SESSION_SECRET = os.getenv("GAME_SESSION_SECRET", "")
+# Seconds a session stays valid for submitting its result (pauses included)
+GAME_SESSION_TTL_SECONDS = int(os.getenv("GAME_SESSION_TTL_SECONDS", "1800"))
+# Most throws a submitted event log may contain
+GAME_MAX_SHOTS = int(os.getenv("GAME_MAX_SHOTS", "3600"))
+# Reject scores submitted without a game session (POST /api/leaderboard and /batch)
+GAME_SESSION_REQUIRED = os.getenv("GAME_SESSION_REQUIRED", "false").lower() == "true"
 
+# Logging and Tracing Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" writes one JSON object per line; "text" the plain "LEVEL:logger:message"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Log file path (empty: stderr)
+LOG_FILE = os.getenv("LOG_FILE", "")
+# Records waiting for the log writer thread; further records are dropped
+# rather than blocking the event loop
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of requests logged with a span breakdown (handler, controller,
+# DatabaseService and SQL timings); 0 disables tracing, 1 traces every request
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+# Statements slower than this are logged with their parameters and query
+# plan, whether or not the request is sampled (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Run EXPLAIN for slow statements (on a separate connection, off the request
+# path); plans are reused for the same statement for SLOW_QUERY_EXPLAIN_TTL_SECONDS
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_TTL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_TTL_SECONDS", "300"))
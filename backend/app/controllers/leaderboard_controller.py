@@ -1,41 +1,243 @@
 """Leaderboard controller - business logic for leaderboard operations."""
 from app.services.database_service import DatabaseService
-from app.models.leaderboard import LeaderboardEntry, AddScoreRequest
-from typing import List
+from app.services.leaderboard_cache import leaderboard_caches
+from app.services.score_batcher import score_batcher
+from app.services.score_wal import WalSyncError, score_wal
+from app.services.rank_index import rank_index
+from app.services.leaderboard_broadcaster import leaderboard_broadcaster
+from app.services.leaderboard_export import Export, leaderboard_exporter
+from app.config import SCORE_BATCH_ENABLED, SCORE_WAL_ENABLED, SCORE_BULK_MAX_ITEMS, SCORE_BULK_CHUNK_SIZE
+from app.models.leaderboard import (
+    LeaderboardEntry,
+    LeaderboardResponse,
+    AddScoreRequest,
+    BatchScoreResult,
+    BatchScoreResponse,
+    RankResponse,
+    CacheStatsResponse,
+)
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.windows import window_start
+from app.utils.json_encoding import encode_leaderboard
+from app.utils.tracing import traced
+from pydantic import ValidationError
+import hashlib
+import logging
+from typing import List, Any, AsyncIterator, Dict, Tuple, Optional
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
 
+# ETag of each cached first page by (window, limit), with the cache version token it was computed at
+_page_etags: Dict[Tuple[str, int], Tuple[str, str]] = {}
+
+
+@traced
 class LeaderboardController:
     """Controller for leaderboard operations."""
     
     @staticmethod
-    def get_leaderboard(limit: int = 10) -> List[LeaderboardEntry]:
-        """Get top leaderboard entries.
+    async def _get_page(
+        limit: int,
+        cursor: Optional[str],
+        window: str,
+        distinct: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetch a page of leaderboard entry dicts and the cursor of the next page.
         
         Args:
             limit: Maximum number of entries to return
+            cursor: Cursor from a previous page's nextCursor, or None for the top
+            window: "day", "week" or "all"
+            distinct: "players" to list only each player's best game
             
         Returns:
-            List of leaderboard entries sorted by score descending
+            Tuple of (entries sorted by score descending, ties by newest entry
+            first; next page cursor or None)
+            
+        Raises:
+            ValueError: If the cursor is malformed, or distinct is combined with
+                a day/week window
         """
+        if distinct == "players" and window != "all":
+            raise ValueError("distinct=players is only available for window=all")
+        
+        after = None
+        if cursor is not None:
+            score, entry_id = decode_cursor(cursor, 2)
+            if not isinstance(score, int) or not isinstance(entry_id, int):
+                raise ValueError("Invalid cursor")
+            after = (score, entry_id)
+        
         try:
-            entries_data = DatabaseService.get_leaderboard(limit)
-            entries = [
-                LeaderboardEntry(**entry) for entry in entries_data
-            ]
-            return entries
+            if distinct == "players":
+                entries_data = await DatabaseService.get_player_leaderboard(limit, after)
+            elif after is None:
+                entries_data = await DatabaseService.get_leaderboard(limit, window)
+            else:
+                entries_data = await DatabaseService.get_leaderboard_after(
+                    after[0], after[1], limit, window_start(window)
+                )
         except Exception as e:
             raise Exception(f"Failed to get leaderboard: {str(e)}")
+        
+        return entries_data, LeaderboardController._next_cursor(entries_data, limit)
+    
+    @staticmethod
+    def _next_cursor(entries_data: List[Dict[str, Any]], limit: int) -> Optional[str]:
+        """Cursor of the page after ``entries_data``, or None if it was the last."""
+        if entries_data and len(entries_data) == limit:
+            last = entries_data[-1]
+            return encode_cursor(last["score"], int(last["id"]))
+        return None
+    
+    @staticmethod
+    async def get_leaderboard(
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        window: str = "all",
+        distinct: Optional[str] = None
+    ) -> LeaderboardResponse:
+        """Get a page of leaderboard entries.
+        
+        Args:
+            limit: Maximum number of entries to return
+            cursor: Cursor from a previous page's nextCursor, or None for the top
+            window: "day", "week" or "all" (default: "all")
+            distinct: "players" to list only each player's best game
+            
+        Returns:
+            LeaderboardResponse with entries sorted by score descending (ties by
+            newest entry first) and the cursor of the next page
+            
+        Raises:
+            ValueError: If the cursor or window/distinct combination is invalid
+        """
+        entries_data, next_cursor = await LeaderboardController._get_page(limit, cursor, window, distinct)
+        entries = [
+            LeaderboardEntry(**entry) for entry in entries_data
+        ]
+        return LeaderboardResponse(entries=entries, total=len(entries), nextCursor=next_cursor)
+    
+    @staticmethod
+    async def get_leaderboard_json(
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        window: str = "all",
+        distinct: Optional[str] = None
+    ) -> bytes:
+        """Get a page of leaderboard entries as a ready-to-send JSON body.
+        
+        Same content as get_leaderboard, but the rows go straight from the
+        cache/database to JSON without building and revalidating models.
+        
+        Args:
+            limit: Maximum number of entries to return
+            cursor: Cursor from a previous page's nextCursor, or None for the top
+            window: "day", "week" or "all" (default: "all")
+            distinct: "players" to list only each player's best game
+            
+        Returns:
+            LeaderboardResponse encoded as JSON
+            
+        Raises:
+            ValueError: If the cursor or window/distinct combination is invalid
+        """
+        entries_data, next_cursor = await LeaderboardController._get_page(limit, cursor, window, distinct)
+        return encode_leaderboard(entries_data, next_cursor)
+    
+    @staticmethod
+    def leaderboard_etag(body: bytes) -> str:
+        """Strong ETag of a leaderboard response body.
+        
+        Derived from the content alone, so it only changes when the page
+        does: every worker gives the same ETag for the same page, and a
+        cache reload that finds nothing new keeps it.
+        
+        Args:
+            body: JSON body of the page
+            
+        Returns:
+            ETag, including quotes
+        """
+        return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+    
+    @staticmethod
+    def get_leaderboard_etag(
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        window: str = "all",
+        distinct: Optional[str] = None
+    ) -> Optional[str]:
+        """Get the ETag of the page a read would currently return, without reading it.
+        
+        Only known for first pages served from the cache; computing it never
+        touches the database, and the body is encoded (to hash it) once per
+        change of the cached list.
+        
+        Args:
+            limit: Maximum number of entries to return
+            cursor: Cursor of the requested page, or None for the top
+            window: "day", "week" or "all" (default: "all")
+            distinct: "players" for the per-player leaderboard
+            
+        Returns:
+            Strong ETag (quoted), or None if the page is not cached
+        """
+        if cursor is not None or distinct is not None:
+            return None
+        cache = leaderboard_caches[window]
+        token = cache.version_token(limit)
+        if token is None:
+            return None
+        known = _page_etags.get((window, limit))
+        if known is not None and known[0] == token:
+            return known[1]
+        entries_data = cache.peek(limit)
+        body = encode_leaderboard(entries_data, LeaderboardController._next_cursor(entries_data, limit))
+        etag = LeaderboardController.leaderboard_etag(body)
+        _page_etags[(window, limit)] = (token, etag)
+        return etag
+
+    @staticmethod
+    async def stream_leaderboard(limit: int = 10, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Subscribe to live changes of the top ``limit`` entries.
+        
+        The first event is a snapshot of the board (or, for a client resuming
+        with a Last-Event-ID this worker still knows, a diff from it); later
+        events are diffs of the top ``limit`` entries.
+        
+        Args:
+            limit: Number of top entries to follow
+            last_event_id: Last-Event-ID header of a reconnecting client
+            
+        Returns:
+            Async iterator of Server-Sent Event frames
+            
+        Raises:
+            SubscriberLimitError: If this worker already has too many subscribers
+        """
+        subscriber = await leaderboard_broadcaster.subscribe(limit, last_event_id)
+        return leaderboard_broadcaster.events(subscriber)
     
     @staticmethod
-    def add_score(request: AddScoreRequest) -> LeaderboardEntry:
+    async def add_score(request: AddScoreRequest) -> LeaderboardEntry:
         """Add a new score to the leaderboard.
         
+        With SCORE_WAL_ENABLED the score is only appended to the write-ahead
+        log and inserted by its drainer; the returned entry then has no id.
+        If the log cannot be written the score goes to the database directly,
+        but not once it is in the log: a failed sync leaves the record to be
+        inserted by a later one.
+        
         Args:
             request: AddScoreRequest containing name, score, and maxCombo
             
         Returns:
-            Created leaderboard entry
+            Created (or, without an id, accepted) leaderboard entry
+            
+        Raises:
+            WalSyncError: If the score was logged but the sync failed
         """
         try:
             entry_data = {
@@ -45,10 +247,174 @@ class LeaderboardController:
                 "timestamp": datetime.now().timestamp() * 1000,  # milliseconds
             }
             
-            entry_id = DatabaseService.add_leaderboard_entry(entry_data)
+            if SCORE_WAL_ENABLED:
+                try:
+                    await score_wal.append(entry_data)
+                    return LeaderboardEntry(**entry_data)
+                except WalSyncError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Score WAL append failed, writing to the database: {str(e)}")
+            
+            if SCORE_BATCH_ENABLED:
+                entry_id = await score_batcher.submit(entry_data)
+            else:
+                entry_id = await DatabaseService.add_leaderboard_entry(entry_data)
             entry_data["id"] = entry_id
+            leaderboard_broadcaster.notify()
             
             return LeaderboardEntry(**entry_data)
+        except WalSyncError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to add score: {str(e)}")
-
+    
+    @staticmethod
+    async def add_scores(items: AsyncIterator[Any]) -> BatchScoreResponse:
+        """Validate and insert a batch of scores in chunked transactions.
+        
+        Items that fail validation are reported individually; valid items are
+        inserted ``SCORE_BULK_CHUNK_SIZE`` at a time, one commit per chunk.
+        The whole batch is read before the first chunk is inserted, so a
+        batch over the limit is rejected without writing any of it.
+        
+        Args:
+            items: Async iterator of raw items, either parsed JSON values or
+                JSON-encoded bytes/str (one NDJSON line each)
+            
+        Returns:
+            BatchScoreResponse with the id or error of every item
+            
+        Raises:
+            ValueError: If the batch has more than SCORE_BULK_MAX_ITEMS items
+        """
+        results: List[BatchScoreResult] = []
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        
+        async def flush():
+            try:
+                ids = await DatabaseService.add_leaderboard_entries([entry for _, entry in chunk])
+                results.extend(BatchScoreResult(index=index, id=entry_id) for (index, _), entry_id in zip(chunk, ids))
+            except Exception as e:
+                results.extend(BatchScoreResult(index=index, error=str(e)) for index, _ in chunk)
+            chunk.clear()
+        
+        raw_items: List[Any] = []
+        async for item in items:
+            if len(raw_items) >= SCORE_BULK_MAX_ITEMS:
+                raise ValueError(f"Batch exceeds {SCORE_BULK_MAX_ITEMS} items")
+            raw_items.append(item)
+        
+        for index, item in enumerate(raw_items):
+            try:
+                if isinstance(item, (bytes, str)):
+                    request = AddScoreRequest.model_validate_json(item)
+                else:
+                    request = AddScoreRequest.model_validate(item)
+            except ValidationError as e:
+                results.append(BatchScoreResult(index=index, error=LeaderboardController._format_errors(e)))
+            else:
+                chunk.append((index, {
+                    "name": request.name,
+                    "score": request.score,
+                    "maxCombo": request.maxCombo,
+                    "timestamp": datetime.now().timestamp() * 1000,  # milliseconds
+                }))
+                if len(chunk) >= SCORE_BULK_CHUNK_SIZE:
+                    await flush()
+        
+        if chunk:
+            await flush()
+        
+        results.sort(key=lambda result: result.index)
+        inserted = sum(1 for result in results if result.id is not None)
+        if inserted:
+            leaderboard_broadcaster.notify()
+        return BatchScoreResponse(results=results, inserted=inserted, failed=len(results) - inserted)
+    
+    @staticmethod
+    def _format_errors(error: ValidationError) -> str:
+        """Condense a pydantic ValidationError into one line."""
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+            for err in error.errors()
+        )
+    
+    @staticmethod
+    async def load_rank_index() -> None:
+        """Build or refresh the in-memory rank index from the database."""
+        await rank_index.ensure_fresh(DatabaseService.get_score_counts, DatabaseService.get_scores_since)
+    
+    @staticmethod
+    async def get_rank(score: int) -> RankResponse:
+        """Get the rank a score has on the leaderboard.
+        
+        Args:
+            score: Score to rank
+            
+        Returns:
+            RankResponse with rank and total entry count
+        """
+        try:
+            await LeaderboardController.load_rank_index()
+            return RankResponse(rank=rank_index.rank(score), total=rank_index.total, score=score)
+        except Exception as e:
+            raise Exception(f"Failed to get rank: {str(e)}")
+    
+    @staticmethod
+    async def get_entry_rank(entry_id: int) -> Optional[RankResponse]:
+        """Get the rank of an existing leaderboard entry.
+        
+        Args:
+            entry_id: Entry ID
+            
+        Returns:
+            RankResponse for the entry's score, or None if the entry does not exist
+        """
+        entry = await DatabaseService.get_entry_by_id(entry_id)
+        if entry is None:
+            return None
+        rank = await LeaderboardController.get_rank(entry["score"])
+        rank.id = entry["id"]
+        return rank
+    
+    @staticmethod
+    def export_leaderboard(
+        format: str = "ndjson",
+        after: int = 0,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        include_archive: bool = True
+    ) -> Export:
+        """Start streaming the leaderboard (and by default its archive) in id order.
+        
+        Args:
+            format: "ndjson", "csv" or "parquet"
+            after: Only export entries with a greater id (the last id of an interrupted export)
+            since: Only export entries with a timestamp at or after this (epoch ms)
+            until: Only export entries with a timestamp before this (epoch ms)
+            include_archive: Also export entries moved to leaderboard_archive
+            
+        Returns:
+            Export with the media type, file extension and body chunks
+            
+        Raises:
+            ValueError: If the timestamp range is empty
+            ExportLimitError: If this worker already runs too many exports
+            ExportUnavailableError: If the format's optional dependency is missing
+        """
+        if since is not None and until is not None and since >= until:
+            raise ValueError("since must be before until")
+        return leaderboard_exporter.open(format, after, since, until, include_archive)
+    
+    @staticmethod
+    def get_cache_stats(window: str = "all") -> CacheStatsResponse:
+        """Get leaderboard cache counters.
+        
+        Args:
+            window: Window whose cache to report (default: "all")
+            
+        Returns:
+            Current cache hit/miss counters
+        """
+        return CacheStatsResponse(**leaderboard_caches[window].stats())
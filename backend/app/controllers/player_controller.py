@@ -0,0 +1,29 @@
+"""Player controller - business logic for player operations."""
+from app.services.database_service import DatabaseService
+from app.models.player import PlayerStatsResponse
+from app.utils.tracing import traced
+from typing import Optional
+
+
+@traced
+class PlayerController:
+    """Controller for player operations."""
+    
+    @staticmethod
+    async def get_player(name: str) -> Optional[PlayerStatsResponse]:
+        """Get a player's best score, best combo and game count.
+        
+        Args:
+            name: Player name
+            
+        Returns:
+            PlayerStatsResponse, or None if the player has no games
+        """
+        try:
+            stats = await DatabaseService.get_player_stats(name)
+        except Exception as e:
+            raise Exception(f"Failed to get player: {str(e)}")
+        
+        if stats is None:
+            return None
+        return PlayerStatsResponse(**stats)
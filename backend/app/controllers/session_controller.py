@@ -0,0 +1,81 @@
+"""Session controller - business logic for game sessions and replayed results."""
+from app.services.database_service import DatabaseService
+from app.services.game_session_service import GameSessionService, SessionUsedError
+from app.services.replay_validator import replay
+from app.services.score_wal import WalSyncError
+from app.controllers.leaderboard_controller import LeaderboardController
+from app.models.leaderboard import AddScoreRequest
+from app.models.session import GameSessionResponse, GameResultRequest, GameResultResponse
+from app.utils.tracing import traced
+from datetime import datetime
+
+
+@traced
+class SessionController:
+    """Controller for game session operations."""
+    
+    @staticmethod
+    def _now() -> int:
+        return int(datetime.now().timestamp() * 1000)  # milliseconds
+    
+    @staticmethod
+    def create_session(client_id: str) -> GameSessionResponse:
+        """Issue a game session, to be requested when a game starts.
+        
+        Args:
+            client_id: API client starting the game
+        
+        Returns:
+            GameSessionResponse with the signed session id
+        """
+        return GameSessionResponse(**GameSessionService.issue(client_id, SessionController._now()))
+    
+    @staticmethod
+    async def submit_result(session_id: str, client_id: str, request: GameResultRequest) -> GameResultResponse:
+        """Replay a game's event log and add the recomputed score to the leaderboard.
+        
+        Args:
+            session_id: Session id from create_session
+            client_id: API client submitting the result
+            request: GameResultRequest with the player name and event log
+        
+        Returns:
+            Created leaderboard entry with the game's shot stats
+        
+        Raises:
+            InvalidSessionError: If the session id is forged, expired or another client's
+            ReplayError: If the event log breaks the game rules
+            SessionUsedError: If a result was already submitted for the session
+            WalSyncError: If the score was logged but the sync failed
+        """
+        now = SessionController._now()
+        nonce, issued_at = GameSessionService.verify(session_id, client_id, now)
+        result = replay(request.shots, request.hits, request.hitTimes, request.swishes, now - issued_at)
+        
+        try:
+            consumed = await DatabaseService.consume_game_session(nonce, client_id, issued_at, now)
+        except Exception as e:
+            raise Exception(f"Failed to submit result: {str(e)}")
+        if not consumed:
+            raise SessionUsedError("A result was already submitted for this session")
+        
+        try:
+            entry = await LeaderboardController.add_score(AddScoreRequest(
+                name=request.name,
+                score=result.score,
+                maxCombo=result.max_combo,
+            ))
+        except WalSyncError:
+            # Logged, so inserted later: the session stays used
+            raise
+        except Exception:
+            # Let the player retry with the same session
+            await DatabaseService.release_game_session(nonce)
+            raise
+        
+        return GameResultResponse(
+            **entry.model_dump(),
+            shotsTaken=result.shots_taken,
+            shotsMade=result.shots_made,
+            accuracy=result.shots_made / result.shots_taken if result.shots_taken else 0.0,
+        )
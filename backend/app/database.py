@@ -1,18 +1,85 @@
 """Database connection and session management."""
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.config import MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+import asyncio
+from sqlalchemy import text
+from app.config import (
+    MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, DATABASE_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DATABASE_REPLICA_URLS,
+)
+from app.services.pool_metrics import MeteredAsyncQueuePool
+
+# Async drivers used by the API and their blocking counterparts used by scripts
+SYNC_DRIVERS = {
+    "mysql+aiomysql": "mysql+pymysql",
+    "sqlite+aiosqlite": "sqlite",
+}
+
+# Create async connection URL (MySQL via aiomysql unless DATABASE_URL is set)
+ASYNC_DATABASE_URL = DATABASE_URL or (
+    f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+)
+
+
+def to_sync_url(url: str) -> str:
+    """Map an async database URL to the equivalent blocking driver URL.
+
+    Args:
+        url: Async SQLAlchemy URL
+
+    Returns:
+        URL using the blocking driver for the same database
+    """
+    parsed = make_url(url)
+    drivername = SYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
 
-# Create MySQL connection URL
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+SYNC_DATABASE_URL = to_sync_url(ASYNC_DATABASE_URL)
 
-# Create engine
+# Create async engine used by the request handlers. Instead of pinging on
+# every checkout, connections are recycled before the server drops them, and a
+# disconnect error invalidates the whole pool so only one request sees it.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=MeteredAsyncQueuePool,  # Records checkout wait times
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=False            # Logs every statement; see SLOW_QUERY_MS and TRACE_SAMPLE_RATE
+)
+
+# Create async session factory; objects stay usable after commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Create one async engine per read replica, pooled like the primary (their
+# checkout waits are not part of the primary's pool metrics)
+replica_engines = [
+    create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        echo=False
+    )
+    for url in DATABASE_REPLICA_URLS
+]
+
+# Create blocking engine for schema management and scripts
 engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,    # Recycle connections after 1 hour
-    echo=False            # Set to True for SQL query logging
+    SYNC_DATABASE_URL,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=False
 )
 
 # Create session factory
@@ -31,8 +98,87 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+    """Bring the schema up to date by applying pending migrations.
+
+    Returns:
+        Names of the migrations applied
+    """
+    from app.migrations import run_migrations
+    return run_migrations(engine)
+
+
+# Whether this process, or the gunicorn master it was forked from, already
+# brought the schema up to date
+_schema_ready = False
+
+
+def schema_ready() -> bool:
+    """Whether ``ensure_schema()`` already succeeded in this process (or its parent)."""
+    return _schema_ready
+
+
+def ensure_schema():
+    """Run ``init_db()`` unless this process already did.
+
+    Returns:
+        Names of the migrations applied (empty if already done)
+    """
+    global _schema_ready
+    if _schema_ready:
+        return []
+    applied = init_db()
+    _schema_ready = True
+    return applied
+
+
+async def warm_pool(connections: int) -> int:
+    """Open pooled connections ahead of the first requests.
+
+    Must run on the event loop that will serve requests (the worker's, after
+    fork), since async driver connections cannot move between loops.
+
+    Args:
+        connections: Number of connections to open (capped at the pool size)
+
+    Returns:
+        Number of connections opened
+    """
+    connections = min(connections, async_engine.pool.size())
+
+    async def _open():
+        conn = await async_engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(*(_open() for _ in range(connections)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()  # Returns the connection to the pool
+    if len(opened) < len(results):
+        raise next(error for error in results if isinstance(error, BaseException))
+    return len(opened)
+
+
+def reset_after_fork():
+    """Drop pool connections inherited from a parent process without closing them.
+
+    The parent still owns those sockets; the child opens its own on demand.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in replica_engines:
+        replica.sync_engine.dispose(close=False)
 
 
+async def close_db():
+    """Dispose of the async engines' connection pools."""
+    await async_engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
@@ -1,26 +1,106 @@
-"""FastAPI application main entry point."""
-from fastapi import FastAPI
+"""FastAPI application main entry point.
+
+Importing this module has no side effects on the database: schema
+migrations and connection setup happen in the lifespan startup of each
+worker (or once in the gunicorn master, see gunicorn_config.py).
+"""
+from contextlib import asynccontextmanager
+# Imported first: the worker's startup clock starts when this module loads
+from app.utils.startup import FirstRequestMiddleware, startup_timer
+# Then logging, so records of the other modules' imports are JSON lines too
+from app.utils.json_logging import configure_logging
+configure_logging()
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from app.config import API_PREFIX, CORS_ORIGINS
-from app.database import init_db
-from app.views import leaderboard, auth
+from app.config import (
+    API_PREFIX, CORS_ORIGINS, DB_MIGRATE_ON_STARTUP, DB_POOL_WARMUP, RATE_LIMIT_ENABLED, READ_YOUR_WRITES_SECONDS,
+    SCORE_WAL_ENABLED,
+)
+from app.database import ensure_schema, schema_ready, close_db, warm_pool, async_engine, replica_engines
+from app.utils.metrics import instrument_engine, render_metrics
+from app.utils.tracing import HEADER as REQUEST_ID_HEADER, TracingMiddleware, trace_engine
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.read_your_writes import HEADER as READ_YOUR_WRITES_HEADER, ReadYourWritesMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.services.pool_metrics import pool_metrics
+from app.services.score_batcher import score_batcher
+from app.services.score_wal import score_wal
+from app.services.rank_index import rank_index
+from app.services.leaderboard_broadcaster import leaderboard_broadcaster
+from app.services.api_key_store import api_key_store
+from app.services.replica_router import replica_router
+from app.controllers.leaderboard_controller import LeaderboardController
+from app.views import leaderboard, auth, players, sessions
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan.
+    
+    Startup runs in timed phases: schema migrations (unless the gunicorn
+    master already ran them or DB_MIGRATE_ON_STARTUP is off), connection
+    pool warm-up, the read replica health check, API key loading, the
+    rank index and the score write-ahead log drainer. Shutdown ends live
+    leaderboard streams, stops a running rank index rebuild, flushes buffered
+    and logged scores and releases pooled DB connections.
+    """
+    if DB_MIGRATE_ON_STARTUP and not schema_ready():
+        with startup_timer.phase("migrations"):
+            try:
+                applied = ensure_schema()
+                logger.info(f"Database initialized successfully ({len(applied)} migrations applied)")
+            except Exception as e:
+                logger.error(f"Failed to initialize database: {str(e)}")
+                logger.warning("Application will start but database features may not work")
+    if DB_POOL_WARMUP > 0:
+        with startup_timer.phase("pool_warmup"):
+            try:
+                opened = await warm_pool(DB_POOL_WARMUP)
+                logger.info(f"Opened {opened} database connections")
+            except Exception as e:
+                logger.warning(f"Connection pool warm-up failed: {str(e)}")
+    if replica_engines:
+        with startup_timer.phase("replicas"):
+            await replica_router.start()
+    with startup_timer.phase("api_keys"):
+        logger.info(f"Loaded {await api_key_store.reload()} API keys")
+    with startup_timer.phase("rank_index"):
+        try:
+            await LeaderboardController.load_rank_index()
+        except Exception as e:
+            logger.warning(f"Rank index not built at startup, will retry on first lookup: {str(e)}")
+    if SCORE_WAL_ENABLED:
+        with startup_timer.phase("score_wal"):
+            await score_wal.start()
+    startup_timer.ready()
+    yield
+    await leaderboard_broadcaster.close()
+    await rank_index.close()
+    await score_batcher.close()
+    await score_wal.close()
+    await replica_router.close()
+    await close_db()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Shooting Game API",
     description="FastAPI backend for shooting game",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
 def custom_openapi():
-    """Custom OpenAPI schema with security scheme for token header."""
+    """Custom OpenAPI schema with security scheme for token header.
+    
+    Built on first use and kept on the app; with preload_app the gunicorn
+    master builds it before forking, so workers never walk the routes.
+    """
     if app.openapi_schema:
         return app.openapi_schema
     
@@ -50,7 +130,7 @@ def custom_openapi():
     # Apply security to paths that need authentication
     # Find all paths that have Security dependency in parameters
     # Also check leaderboard endpoints specifically
-    leaderboard_paths = ["/api/leaderboard"]
+    leaderboard_paths = ["/api/leaderboard", "/api/players", "/api/sessions"]
     
     for path, path_item in openapi_schema.get("paths", {}).items():
         for method, operation in path_item.items():
@@ -106,6 +186,15 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# Reads right after the client's own writes go to the primary
+if replica_engines and READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-client rate limits, checked before routing (added first so CORS
+# headers are still set on 429 responses)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -113,20 +202,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER.decode(), REQUEST_ID_HEADER.decode()],
 )
 
-# Initialize Database
-try:
-    init_db()
-    logger.info("Database initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize database: {str(e)}")
-    logger.warning("Application will start but database features may not work")
+# Request ids and sampled traces; wraps CORS so preflight answers carry the
+# id too, and every log record of the request below it
+app.add_middleware(TracingMiddleware)
+
+# Outermost: time to this worker's first response, whatever answers it
+app.add_middleware(FirstRequestMiddleware)
 
+# Count and time every query of the request path; add them to sampled
+# traces and log the slow ones
+instrument_engine(async_engine.sync_engine)
+trace_engine(async_engine)
+for replica in replica_engines:
+    instrument_engine(replica.sync_engine)
+    trace_engine(replica)
 
 # Register routers
 app.include_router(auth.router, prefix=API_PREFIX)
 app.include_router(leaderboard.router, prefix=API_PREFIX)
+app.include_router(players.router, prefix=API_PREFIX)
+app.include_router(sessions.router, prefix=API_PREFIX)
 
 
 @app.get("/")
@@ -145,6 +243,36 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of all workers."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/health/pool")
+async def pool_stats():
+    """Connection pool occupancy and checkout wait times of this worker."""
+    return pool_metrics.stats(async_engine.pool)
+
+
+@app.get("/health/replicas")
+async def replica_stats():
+    """Whether each read replica is in rotation, and why not."""
+    return replica_router.stats()
+
+
+@app.get("/health/wal")
+async def wal_stats():
+    """Backlog and drain rate of this worker's score write-ahead log."""
+    return score_wal.stats()
+
+
+@app.get("/health/startup")
+async def startup_stats():
+    """Startup phase durations and time to first request of this worker."""
+    return startup_timer.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
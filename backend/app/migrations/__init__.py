@@ -0,0 +1,90 @@
+"""Versioned schema migrations.
+
+Each ``vNNN_*`` module defines ``upgrade(connection)``. ``run_migrations``
+applies, in order, every migration not yet recorded in the
+schema_migrations table, each in its own transaction. MySQL commits DDL
+implicitly, so migrations must be safe to re-run after a partial failure
+(check what exists before creating or dropping).
+"""
+import time
+from contextlib import contextmanager
+from typing import List
+from sqlalchemy import BigInteger, Column, Integer, MetaData, String, Table, insert, select, text
+from sqlalchemy.engine import Engine
+from app.migrations import (
+    v001_baseline, v002_leaderboard_indexes, v003_game_sessions, v004_score_wal_checkpoints, v005_archive_keyset_index,
+)
+
+# (version, name, module) in the order they are applied
+MIGRATIONS = [
+    (1, "baseline", v001_baseline),
+    (2, "leaderboard_indexes", v002_leaderboard_indexes),
+    (3, "game_sessions", v003_game_sessions),
+    (4, "score_wal_checkpoints", v004_score_wal_checkpoints),
+    (5, "archive_keyset_index", v005_archive_keyset_index),
+]
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", BigInteger, nullable=False),  # milliseconds
+)
+
+
+# Advisory lock held while migrating, so hosts starting together migrate one at a time
+LOCK_NAME = "shooting_game_schema_migrations"
+LOCK_TIMEOUT = 300
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Hold a database-wide advisory lock (MySQL, PostgreSQL; no-op elsewhere)."""
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "mysql":
+            locked = connection.scalar(
+                text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT}
+            )
+            if locked != 1:
+                raise Exception(f"Timed out after {LOCK_TIMEOUT}s waiting for the migration lock")
+        elif dialect == "postgresql":
+            connection.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), {"name": LOCK_NAME})
+        try:
+            yield
+        finally:
+            if dialect == "mysql":
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+            elif dialect == "postgresql":
+                connection.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": LOCK_NAME})
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply every pending migration.
+
+    Runs under an advisory lock: a second caller waits, then finds the
+    migrations recorded and applies nothing.
+
+    Args:
+        engine: Blocking engine of the database to migrate
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    with _migration_lock(engine):
+        schema_migrations.create(bind=engine, checkfirst=True)
+        with engine.connect() as connection:
+            applied = set(connection.scalars(select(schema_migrations.c.version)))
+
+        done = []
+        for version, name, module in MIGRATIONS:
+            if version in applied:
+                continue
+            with engine.begin() as connection:
+                module.upgrade(connection)
+                connection.execute(
+                    insert(schema_migrations).values(version=version, name=name, applied_at=int(time.time() * 1000))
+                )
+            done.append(name)
+        return done
@@ -0,0 +1,117 @@
+"""Baseline: the tables and indexes as they stood before migrations existed.
+
+The DDL is spelled out here rather than taken from the models, so the
+baseline stays fixed as the models change; later changes are later
+migrations. Databases created before migrations existed already have most
+of these; ``checkfirst`` only adds what is missing. player_best is
+backfilled from the leaderboard when this creates it.
+"""
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, and_, event, func, insert, select,
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+leaderboard = Table(
+    "leaderboard",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(50), nullable=False),
+    Column("score", Integer, nullable=False),
+    Column("max_combo", Integer, nullable=False),
+    Column("timestamp", BigInteger, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("ix_leaderboard_id", leaderboard.c.id)
+Index("ix_leaderboard_name", leaderboard.c.name)
+Index("ix_leaderboard_score", leaderboard.c.score)
+Index("ix_leaderboard_timestamp", leaderboard.c.timestamp)
+Index("ix_leaderboard_score_id", leaderboard.c.score.desc(), leaderboard.c.id.desc())
+Index("ix_leaderboard_timestamp_score", leaderboard.c.timestamp, leaderboard.c.score)
+
+leaderboard_archive = Table(
+    "leaderboard_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(50), nullable=False),
+    Column("score", Integer, nullable=False),
+    Column("max_combo", Integer, nullable=False),
+    Column("timestamp", BigInteger, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+)
+Index("ix_leaderboard_archive_score", leaderboard_archive.c.score)
+
+player_best = Table(
+    "player_best",
+    metadata,
+    Column("name", String(50), primary_key=True),
+    Column("best_score", Integer, nullable=False),
+    Column("best_entry_id", Integer, nullable=False),
+    Column("best_timestamp", BigInteger, nullable=False),
+    Column("best_combo", Integer, nullable=False),
+    Column("games", Integer, nullable=False),
+    Column("last_timestamp", BigInteger, nullable=False),
+)
+Index("ix_player_best_score_entry", player_best.c.best_score.desc(), player_best.c.best_entry_id.desc())
+
+api_keys = Table(
+    "api_keys",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("client_id", String(50), nullable=False),
+    Column("key_hash", String(64), nullable=False, unique=True),
+    Column("active", Boolean, nullable=False),
+    Column("expires_at", BigInteger, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("ix_api_keys_client_id", api_keys.c.client_id)
+
+
+@event.listens_for(player_best, "after_create")
+def _backfill_player_best(target, connection, **kw):
+    """Fill a newly created player_best table from the existing leaderboard history."""
+    stats = (
+        select(
+            leaderboard.c.name,
+            func.max(leaderboard.c.score).label("best_score"),
+            func.max(leaderboard.c.max_combo).label("best_combo"),
+            func.count().label("games"),
+            func.max(leaderboard.c.timestamp).label("last_timestamp"),
+        )
+        .group_by(leaderboard.c.name)
+        .subquery()
+    )
+    # Earliest entry reaching each score, so ties keep the first game
+    first = (
+        select(leaderboard.c.name, leaderboard.c.score, func.min(leaderboard.c.id).label("id"))
+        .group_by(leaderboard.c.name, leaderboard.c.score)
+        .subquery()
+    )
+    best = leaderboard.alias("best")
+    rows = (
+        select(
+            stats.c.name,
+            stats.c.best_score,
+            first.c.id,
+            best.c.timestamp,
+            stats.c.best_combo,
+            stats.c.games,
+            stats.c.last_timestamp,
+        )
+        .join_from(stats, first, and_(first.c.name == stats.c.name, first.c.score == stats.c.best_score))
+        .join(best, best.c.id == first.c.id)
+    )
+    connection.execute(
+        insert(target).from_select(
+            ["name", "best_score", "best_entry_id", "best_timestamp", "best_combo", "games", "last_timestamp"],
+            rows
+        )
+    )
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(bind=connection)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
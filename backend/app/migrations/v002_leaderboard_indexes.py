@@ -0,0 +1,34 @@
+"""Replace the single-column leaderboard indexes with the composites the queries use.
+
+Top-N and keyset pages read ix_leaderboard_score_id (score DESC, id DESC);
+windowed pages and archival read ix_leaderboard_timestamp_score. The old
+indexes on id (duplicate of the primary key), score and timestamp (prefixes
+of the composites) only slowed down inserts. The name index stays: player
+aggregates are rebuilt by name when an entry is deleted.
+"""
+from sqlalchemy import BigInteger, Column, Index, Integer, MetaData, Table, inspect
+from sqlalchemy.engine import Connection
+from app.models.db_models import LeaderboardEntryDB
+
+# Detached copy of the columns, so the dropped indexes never join the model's metadata
+_legacy = Table(
+    "leaderboard",
+    MetaData(),
+    Column("id", Integer),
+    Column("score", Integer),
+    Column("timestamp", BigInteger),
+)
+REDUNDANT_INDEXES = {
+    "ix_leaderboard_id": "id",
+    "ix_leaderboard_score": "score",
+    "ix_leaderboard_timestamp": "timestamp",
+}
+
+
+def upgrade(connection: Connection) -> None:
+    for index in LeaderboardEntryDB.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+    existing = {index["name"] for index in inspect(connection).get_indexes("leaderboard")}
+    for name, column in REDUNDANT_INDEXES.items():
+        if name in existing:
+            Index(name, _legacy.c[column]).drop(bind=connection)
@@ -0,0 +1,10 @@
+"""Add the game_sessions table recording which signed game sessions were used."""
+from sqlalchemy.engine import Connection
+from app.models.db_models import GameSessionDB
+
+
+def upgrade(connection: Connection) -> None:
+    table = GameSessionDB.__table__
+    table.create(bind=connection, checkfirst=True)
+    for index in table.indexes:
+        index.create(bind=connection, checkfirst=True)
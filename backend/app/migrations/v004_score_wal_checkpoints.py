@@ -0,0 +1,7 @@
+"""Add the score_wal_checkpoints table tracking drained write-ahead log segments."""
+from sqlalchemy.engine import Connection
+from app.models.db_models import ScoreWalCheckpointDB
+
+
+def upgrade(connection: Connection) -> None:
+    ScoreWalCheckpointDB.__table__.create(bind=connection, checkfirst=True)
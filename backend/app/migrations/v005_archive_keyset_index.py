@@ -0,0 +1,21 @@
+"""Index leaderboard_archive like the hot table, so keyset pages can merge it.
+
+Keyset pages read both tables in (score DESC, id DESC) order. The
+composite replaces the score-only index, which is its prefix and served
+only the rank index counts.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, inspect
+from sqlalchemy.engine import Connection
+from app.models.db_models import LeaderboardArchiveDB
+
+# Detached copy of the column, so the dropped index never joins the model's metadata
+_legacy = Table("leaderboard_archive", MetaData(), Column("score", Integer))
+REDUNDANT_INDEX = "ix_leaderboard_archive_score"
+
+
+def upgrade(connection: Connection) -> None:
+    for index in LeaderboardArchiveDB.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+    existing = {index["name"] for index in inspect(connection).get_indexes("leaderboard_archive")}
+    if REDUNDANT_INDEX in existing:
+        Index(REDUNDANT_INDEX, _legacy.c.score).drop(bind=connection)
@@ -1,5 +1,5 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -8,14 +8,111 @@ class LeaderboardEntryDB(Base):
     """Leaderboard entry database model."""
     __tablename__ = "leaderboard"
     
-    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(50), nullable=False, index=True)
-    score = Column(Integer, nullable=False, index=True)
+    score = Column(Integer, nullable=False)
     max_combo = Column(Integer, nullable=False, default=0)
-    timestamp = Column(BigInteger, nullable=False, index=True)
+    timestamp = Column(BigInteger, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Indexes are changed through app/migrations; see v002_leaderboard_indexes
+    __table_args__ = (
+        # Top-N and keyset pagination: ORDER BY score DESC, id DESC
+        Index("ix_leaderboard_score_id", score.desc(), id.desc()),
+        # Windowed (day/week) top-N: WHERE timestamp >= ? ORDER BY score DESC
+        Index("ix_leaderboard_timestamp_score", timestamp, score),
+    )
+    
     def __repr__(self):
         return f"<LeaderboardEntryDB(id={self.id}, name='{self.name}', score={self.score})>"
 
 
+class LeaderboardArchiveDB(Base):
+    """Leaderboard entries moved out of the hot table by archive_leaderboard.py.
+    
+    Rows keep their original id. They still count towards ranks and appear
+    in keyset leaderboard pages, merged with the hot table.
+    """
+    __tablename__ = "leaderboard_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(50), nullable=False)
+    score = Column(Integer, nullable=False)
+    max_combo = Column(Integer, nullable=False, default=0)
+    timestamp = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # Keyset leaderboard pages; its score prefix serves the rank index counts
+        Index("ix_leaderboard_archive_score_id", score.desc(), id.desc()),
+    )
+    
+    def __repr__(self):
+        return f"<LeaderboardArchiveDB(id={self.id}, name='{self.name}', score={self.score})>"
+
+
+class PlayerBestDB(Base):
+    """Per-player aggregate of the leaderboard, maintained on every insert."""
+    __tablename__ = "player_best"
+    
+    name = Column(String(50), primary_key=True)
+    best_score = Column(Integer, nullable=False)
+    best_entry_id = Column(Integer, nullable=False)
+    best_timestamp = Column(BigInteger, nullable=False)
+    best_combo = Column(Integer, nullable=False, default=0)
+    games = Column(Integer, nullable=False, default=0)
+    last_timestamp = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        # One-row-per-player top-N and keyset pagination
+        Index("ix_player_best_score_entry", best_score.desc(), best_entry_id.desc()),
+    )
+    
+    def __repr__(self):
+        return f"<PlayerBestDB(name='{self.name}', best_score={self.best_score}, games={self.games})>"
+
+
+class ApiKeyDB(Base):
+    """Per-client API key; only the SHA-256 hex digest of the key is stored."""
+    __tablename__ = "api_keys"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    client_id = Column(String(50), nullable=False, index=True)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    active = Column(Boolean, nullable=False, default=True)
+    expires_at = Column(BigInteger, nullable=True)  # milliseconds, NULL = never
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ApiKeyDB(id={self.id}, client_id='{self.client_id}', active={self.active})>"
+
+
+class GameSessionDB(Base):
+    """Game session whose result was submitted; a session can be used once."""
+    __tablename__ = "game_sessions"
+    
+    id = Column(String(32), primary_key=True)  # nonce of the signed session id
+    client_id = Column(String(50), nullable=False)
+    issued_at = Column(BigInteger, nullable=False)  # milliseconds
+    consumed_at = Column(BigInteger, nullable=False)  # milliseconds
+    
+    __table_args__ = (
+        # Expired sessions are purged by issue time (archive_leaderboard.py)
+        Index("ix_game_sessions_issued_at", "issued_at"),
+    )
+    
+    def __repr__(self):
+        return f"<GameSessionDB(id='{self.id}', client_id='{self.client_id}')>"
+
+
+class ScoreWalCheckpointDB(Base):
+    """How far a score write-ahead log segment has been drained into the leaderboard."""
+    __tablename__ = "score_wal_checkpoints"
+    
+    segment = Column(String(100), primary_key=True)  # segment file name
+    drained_to = Column(BigInteger, nullable=False)  # byte offset of the next undrained record
+    updated_at = Column(BigInteger, nullable=False)  # milliseconds
+    
+    def __repr__(self):
+        return f"<ScoreWalCheckpointDB(segment='{self.segment}', drained_to={self.drained_to})>"
+
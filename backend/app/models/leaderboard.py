@@ -1,6 +1,15 @@
 """Leaderboard data models."""
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Literal
+
+# Time window of a leaderboard: today, this week, or all time
+LeaderboardWindow = Literal["day", "week", "all"]
+
+# Leaderboard deduplication: one entry (the best game) per player
+LeaderboardDistinct = Literal["players"]
+
+# Body format of a leaderboard export
+ExportFormat = Literal["ndjson", "csv", "parquet"]
 
 
 class LeaderboardEntry(BaseModel):
@@ -26,6 +35,7 @@ class LeaderboardResponse(BaseModel):
     """Response model for leaderboard list."""
     entries: list[LeaderboardEntry]
     total: int
+    nextCursor: Optional[str] = Field(None, description="Cursor for the next page; absent on a short (last) page")
 
 
 class AddScoreRequest(BaseModel):
@@ -34,3 +44,39 @@ class AddScoreRequest(BaseModel):
     score: int = Field(..., ge=0)
     maxCombo: int = Field(..., ge=0)
 
+
+class BatchScoreResult(BaseModel):
+    """Outcome of one item of a bulk score submission."""
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    id: Optional[str] = Field(None, description="Entry ID from database if the item was stored")
+    error: Optional[str] = Field(None, description="Why the item was rejected")
+
+
+class BatchScoreResponse(BaseModel):
+    """Response model for bulk score submission."""
+    results: list[BatchScoreResult]
+    inserted: int
+    failed: int
+
+
+class RankResponse(BaseModel):
+    """Response model for a rank lookup."""
+    rank: int = Field(..., description="1 + number of entries with a strictly higher score")
+    total: int = Field(..., description="Number of entries on the leaderboard")
+    score: int = Field(..., description="Score that was ranked")
+    id: Optional[str] = Field(None, description="Entry ID when ranking an existing entry")
+
+
+class CacheStatsResponse(BaseModel):
+    """Response model for leaderboard cache counters."""
+    window: str = Field(..., description="Leaderboard window the cache holds")
+    size: int = Field(..., description="Maximum number of cached entries")
+    ttl: float = Field(..., description="Seconds before the cache is reloaded")
+    shared: bool = Field(..., description="Whether the cache is shared by all workers on the host")
+    cached: int = Field(..., description="Number of entries currently cached")
+    hits: int = Field(..., description="Reads served from the cache")
+    misses: int = Field(..., description="Reads that found the cache cold or expired")
+    staleHits: int = Field(..., description="Expired reads served while another worker refreshed the cache")
+    hitRate: float = Field(..., description="hits / (hits + misses)")
+    invalidations: int = Field(..., description="Times the cache was dropped by a delete")
+    age: Optional[float] = Field(None, description="Seconds since the cache was loaded")
@@ -0,0 +1,13 @@
+"""Player data models."""
+from pydantic import BaseModel, Field
+
+
+class PlayerStatsResponse(BaseModel):
+    """Response model for a player's aggregate stats."""
+    name: str = Field(..., description="Player name")
+    bestScore: int = Field(..., description="Highest score over all games")
+    bestCombo: int = Field(..., description="Highest combo over all games")
+    games: int = Field(..., description="Number of games submitted")
+    bestEntryId: str = Field(..., description="Entry ID of the best game")
+    bestTimestamp: float = Field(..., description="Timestamp of the best game in milliseconds")
+    lastPlayed: float = Field(..., description="Timestamp of the latest game in milliseconds")
@@ -0,0 +1,44 @@
+"""Game session data models."""
+from pydantic import BaseModel, Field
+from typing import List
+from app.config import GAME_MAX_SHOTS
+from app.models.leaderboard import LeaderboardEntry
+
+
+class GameSessionResponse(BaseModel):
+    """Response model for a newly issued game session."""
+    sessionId: str = Field(..., description="Signed session id to submit the game result with")
+    issuedAt: int = Field(..., description="Issue time in milliseconds")
+    expiresAt: int = Field(..., description="Time in milliseconds after which the result is no longer accepted")
+
+
+class GameResultRequest(BaseModel):
+    """Request model for submitting a game's event log.
+
+    Times are milliseconds of wall-clock time since the game started (pauses
+    included, as in the game's combo timing). ``hits``, ``hitTimes`` and
+    ``swishes`` describe the scored balls in scoring order.
+    """
+    name: str = Field(..., min_length=1, max_length=50, description="Player name")
+    shots: List[int] = Field(..., max_length=GAME_MAX_SHOTS, description="Throw time of every ball, ascending")
+    hits: List[int] = Field(default_factory=list, max_length=GAME_MAX_SHOTS, description="Index in shots of each ball that scored")
+    hitTimes: List[int] = Field(default_factory=list, max_length=GAME_MAX_SHOTS, description="Time each ball scored")
+    swishes: List[bool] = Field(default_factory=list, max_length=GAME_MAX_SHOTS, description="Whether each score was a swish")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Player One",
+                "shots": [1200, 2900, 4100],
+                "hits": [0, 2],
+                "hitTimes": [2150, 5000],
+                "swishes": [True, False]
+            }
+        }
+
+
+class GameResultResponse(LeaderboardEntry):
+    """Leaderboard entry created from a replayed game."""
+    shotsTaken: int = Field(..., description="Number of balls thrown")
+    shotsMade: int = Field(..., description="Number of balls that scored")
+    accuracy: float = Field(..., description="shotsMade / shotsTaken")
@@ -0,0 +1,218 @@
+"""In-memory index of the API keys accepted by the token check."""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.config import (
+    API_TOKEN,
+    API_KEYS_FILE,
+    API_KEYS_FROM_DB,
+    API_KEYS_RELOAD_SECONDS,
+    API_KEYS_MISS_RELOAD_SECONDS,
+    API_KEYS_NEGATIVE_CACHE_SIZE,
+)
+from app.services.database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+# Seconds between warnings counting rejected tokens (never the tokens themselves)
+REJECTED_LOG_SECONDS = 60.0
+
+
+class ApiKey(NamedTuple):
+    """One accepted key: who it belongs to and when it stops being valid."""
+    client_id: str
+    digest: bytes
+    expires_at: Optional[int]  # milliseconds, None = never
+
+
+def hash_key(token: str) -> str:
+    """SHA-256 hex digest of a key, as stored in the api_keys table.
+
+    Args:
+        token: Plain API key
+
+    Returns:
+        64-character hex digest
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def read_key_file(path: str) -> List[Tuple[str, str, Optional[int]]]:
+    """Read ``client_id:token`` lines (blank lines and ``#`` comments skipped).
+
+    Args:
+        path: Key file path
+
+    Returns:
+        (client_id, key_hash, expires_at) tuples
+    """
+    keys = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            client_id, sep, token = line.partition(":")
+            if not sep or not token:
+                raise ValueError(f"Invalid line in {path}: expected 'client_id:token'")
+            keys.append((client_id.strip(), hash_key(token.strip()), None))
+    return keys
+
+
+class ApiKeyStore:
+    """Index of accepted API keys by SHA-256 digest, reloaded every ``ttl`` seconds.
+
+    A presented token is hashed and looked up in a dict, so checking it costs
+    the same whether there is one key or thousands and never touches the
+    database. Keys come from ``API_TOKEN`` (client "default"), the optional
+    key file and, with ``from_db``, the api_keys table; reloads run in the
+    background and swap the whole index at once.
+
+    Rejected digests go into a bounded negative cache until the next reload,
+    for at most ``miss_reload_interval`` seconds: a flood of one bad token
+    may trigger a reload once per interval, while a token not seen before
+    may trigger an early reload (at most every ``miss_reload_interval``
+    seconds) so newly issued keys work promptly, including a key first
+    presented just before it was issued.
+
+    Rejections are counted and logged as one warning at most every
+    ``log_interval`` seconds, so a flood of bad tokens neither floods the
+    log nor writes any part of a token to it.
+    """
+
+    def __init__(
+        self,
+        ttl: float = API_KEYS_RELOAD_SECONDS,
+        miss_reload_interval: float = API_KEYS_MISS_RELOAD_SECONDS,
+        negative_size: int = API_KEYS_NEGATIVE_CACHE_SIZE,
+        key_file: str = API_KEYS_FILE,
+        from_db: bool = API_KEYS_FROM_DB,
+        log_interval: float = REJECTED_LOG_SECONDS
+    ):
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self.negative_size = negative_size
+        self.key_file = key_file
+        self.from_db = from_db
+        self.log_interval = log_interval
+        self._negative: "OrderedDict[bytes, float]" = OrderedDict()  # digest -> rejected at
+        self._reload_task: Optional[asyncio.Task] = None
+        self._loaded_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.reloads = 0
+        # Rejections not logged yet, since the first of them
+        self._rejected = 0
+        self._rejected_since = 0.0
+        self._rejected_logged_at = float("-inf")
+        # Environment and file keys are usable before the first (async) reload
+        keys = [("default", hash_key(API_TOKEN), None)]
+        if key_file:
+            try:
+                keys.extend(read_key_file(key_file))
+            except Exception as e:
+                logger.warning(f"API key file not loaded: {str(e)}")
+        self._index = self._build(keys)
+
+    @staticmethod
+    def _build(keys: List[Tuple[str, str, Optional[int]]]) -> Dict[bytes, ApiKey]:
+        """Build the digest index from (client_id, key_hash, expires_at) tuples."""
+        index = {}
+        for client_id, key_hash, expires_at in keys:
+            digest = bytes.fromhex(key_hash)
+            index[digest] = ApiKey(client_id, digest, expires_at)
+        return index
+
+    def lookup(self, token: str) -> Optional[ApiKey]:
+        """Find the key matching ``token``.
+
+        Args:
+            token: Token presented by the client
+
+        Returns:
+            The matching ApiKey, or None if the token is unknown or expired
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.monotonic()
+        if now - self._loaded_at >= self.ttl:
+            self._schedule_reload()
+
+        rejected_at = self._negative.get(digest)
+        if rejected_at is not None and now - rejected_at < self.miss_reload_interval:
+            self.negative_hits += 1
+            self._log_rejected(now)
+            return None
+
+        # The dict compares digests, never the secret itself, so lookup timing
+        # reveals nothing about a valid key; the final check is constant-time
+        key = self._index.get(digest)
+        if key is not None and hmac.compare_digest(key.digest, digest):
+            if key.expires_at is None or key.expires_at > time.time() * 1000:
+                self.hits += 1
+                return key
+
+        self.misses += 1
+        self._negative[digest] = now
+        self._negative.move_to_end(digest)
+        if len(self._negative) > self.negative_size:
+            self._negative.popitem(last=False)
+        self._log_rejected(now)
+        if now - self._loaded_at >= self.miss_reload_interval:
+            self._schedule_reload()
+        return None
+
+    def _log_rejected(self, now: float) -> None:
+        """Count a rejected token; warn with the count at most every ``log_interval`` seconds."""
+        if not self._rejected:
+            self._rejected_since = now
+        self._rejected += 1
+        if now - self._rejected_logged_at < self.log_interval:
+            return
+        logger.warning(f"Rejected {self._rejected} API token(s) in the last {now - self._rejected_since:.0f}s")
+        self._rejected = 0
+        self._rejected_logged_at = now
+
+    def _schedule_reload(self) -> None:
+        """Start a background reload unless one is running (or no loop is)."""
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._reload_task = loop.create_task(self.reload())
+
+    async def reload(self) -> int:
+        """Reload every key source and swap in the new index.
+
+        A source that fails keeps the previous index; the next attempt waits
+        for the normal interval.
+
+        Returns:
+            Number of keys loaded
+        """
+        self._loaded_at = time.monotonic()
+        try:
+            keys = [("default", hash_key(API_TOKEN), None)]
+            if self.key_file:
+                keys.extend(read_key_file(self.key_file))
+            if self.from_db:
+                keys.extend(await DatabaseService.get_api_keys(int(time.time() * 1000)))
+        except Exception as e:
+            logger.warning(f"API keys not reloaded: {str(e)}")
+            return len(self._index)
+
+        self._index = self._build(keys)
+        self._negative.clear()
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+        return len(self._index)
+
+
+# Shared key store instance for this process
+api_key_store = ApiKeyStore()
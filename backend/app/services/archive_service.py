@@ -0,0 +1,250 @@
+"""Retention of the leaderboard table: archival of old rows and monthly partitions."""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, func, insert, inspect, select, text, tuple_
+from sqlalchemy.engine import Connection
+from app.config import LEADERBOARD_CACHE_SIZE
+from app.database import engine
+from app.models.db_models import LeaderboardEntryDB, LeaderboardArchiveDB, GameSessionDB
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+# Shortest retention that keeps every row of the week window in the hot table
+MIN_RETENTION_DAYS = 8
+ARCHIVED_COLUMNS = ["id", "name", "score", "max_combo", "timestamp", "created_at"]
+
+
+def _month_start(year: int, month: int) -> datetime:
+    """First instant of a UTC month, normalizing month overflow."""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _to_ms(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+
+class ArchiveService:
+    """Move old leaderboard rows to leaderboard_archive and manage partitions.
+
+    Runs from ``archive_leaderboard.py`` (cron) on the blocking engine. Each
+    batch is copied and deleted in one transaction, so a row is always in
+    exactly one of the two tables and rank counts (which include the
+    archive) never change.
+    """
+
+    @staticmethod
+    def _top_k_boundary(conn: Connection, top_k: int) -> Optional[Tuple[int, int]]:
+        """(score, id) of the K-th best entry, or None if there are fewer than K."""
+        table = LeaderboardEntryDB.__table__
+        row = conn.execute(
+            select(table.c.score, table.c.id)
+            .order_by(table.c.score.desc(), table.c.id.desc())
+            .offset(top_k - 1)
+            .limit(1)
+        ).first()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def archive_entries(
+        top_k: int,
+        retention_days: int,
+        batch_size: int,
+        dry_run: bool = False
+    ) -> int:
+        """Move entries outside the all-time top ``top_k`` and older than ``retention_days``.
+
+        Args:
+            top_k: Number of best entries that are never archived
+            retention_days: Age in days after which other entries are archived
+            batch_size: Rows moved per transaction
+            dry_run: Only count the rows that would be moved
+
+        Returns:
+            Number of rows archived (or that would be)
+
+        Raises:
+            ValueError: If the settings would archive rows the API still serves
+        """
+        if retention_days < MIN_RETENTION_DAYS:
+            raise ValueError(f"Retention must be at least {MIN_RETENTION_DAYS} days (week window)")
+        if top_k < LEADERBOARD_CACHE_SIZE:
+            raise ValueError(f"Top K must be at least LEADERBOARD_CACHE_SIZE ({LEADERBOARD_CACHE_SIZE})")
+
+        table = LeaderboardEntryDB.__table__
+        cutoff = int(time.time() * 1000) - retention_days * DAY_MS
+        with engine.connect() as conn:
+            boundary = ArchiveService._top_k_boundary(conn, top_k)
+            # Newest id that can qualify; bounds the id-ordered scan below
+            last_old_id = conn.scalar(select(func.max(table.c.id)).where(table.c.timestamp < cutoff))
+        if boundary is None or last_old_id is None:
+            return 0
+
+        candidates = (
+            (table.c.timestamp < cutoff)
+            & (tuple_(table.c.score, table.c.id) < tuple_(*boundary))
+        )
+        if dry_run:
+            with engine.connect() as conn:
+                return conn.scalar(
+                    select(func.count()).select_from(table).where(candidates, table.c.id <= last_old_id)
+                )
+
+        archive = LeaderboardArchiveDB.__table__
+        moved = 0
+        after_id = 0
+        while True:
+            with engine.begin() as conn:
+                ids = conn.scalars(
+                    select(table.c.id)
+                    .where(candidates, table.c.id > after_id, table.c.id <= last_old_id)
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not ids:
+                    break
+                conn.execute(
+                    insert(archive).from_select(
+                        ARCHIVED_COLUMNS,
+                        select(*(table.c[name] for name in ARCHIVED_COLUMNS)).where(table.c.id.in_(ids))
+                    )
+                )
+                conn.execute(delete(table).where(table.c.id.in_(ids)))
+            moved += len(ids)
+            after_id = ids[-1]
+            logger.info(f"Archived {moved} leaderboard rows (up to id {after_id})")
+        return moved
+
+    @staticmethod
+    def partition_statements(conn: Connection, months_ahead: int, retention_days: int) -> List[str]:
+        """Build the DDL that partitions the leaderboard table by month (MySQL).
+
+        An unpartitioned table gets a (id, timestamp) primary key (MySQL
+        requires the partition column in it) and one partition per month from
+        its oldest row (at most a year back) to ``months_ahead`` months ahead.
+        A partitioned table gets the missing future months split off ``pmax``,
+        and partitions emptied by archival are dropped.
+
+        Args:
+            conn: Connection to the MySQL database
+            months_ahead: Months after the current one that must have a partition
+            retention_days: Partitions ending before this age are dropped when empty
+
+        Returns:
+            Statements to run in order (empty if nothing to do)
+
+        Raises:
+            ValueError: If the database is not MySQL
+        """
+        if conn.dialect.name != "mysql":
+            raise ValueError("Partitioning is only supported on MySQL")
+
+        table = LeaderboardEntryDB.__tablename__
+        now = datetime.now(timezone.utc)
+        last_month = _month_start(now.year, now.month + months_ahead)
+        existing = [
+            name for (name,) in conn.execute(
+                text(
+                    "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+                    "ORDER BY PARTITION_ORDINAL_POSITION"
+                ),
+                {"table": table},
+            )
+        ]
+
+        def definition(month: datetime) -> str:
+            upper = _month_start(month.year, month.month + 1)
+            return f"PARTITION p{month:%Y%m} VALUES LESS THAN ({_to_ms(upper)})"
+
+        statements = []
+        if not existing:
+            oldest = conn.scalar(select(func.min(LeaderboardEntryDB.timestamp)))
+            first = datetime.fromtimestamp(oldest / 1000, timezone.utc) if oldest else now
+            first = max(first, _month_start(now.year - 1, now.month))
+            month = _month_start(first.year, first.month)
+            months = []
+            while month <= last_month:
+                months.append(month)
+                month = _month_start(month.year, month.month + 1)
+
+            if inspect(conn).get_pk_constraint(table)["constrained_columns"] != ["id", "timestamp"]:
+                statements.append(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)")
+            partitions = [definition(month) for month in months]
+            partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+            statements.append(f"ALTER TABLE {table} PARTITION BY RANGE (timestamp) ({', '.join(partitions)})")
+            return statements
+
+        monthly = [name for name in existing if name != "pmax"]
+        newest = datetime.strptime(monthly[-1][1:], "%Y%m").replace(tzinfo=timezone.utc)
+        month = _month_start(newest.year, newest.month + 1)
+        added = []
+        while month <= last_month:
+            added.append(definition(month))
+            month = _month_start(month.year, month.month + 1)
+        if added:
+            added.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+            statements.append(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(added)})")
+
+        cutoff = now.timestamp() * 1000 - retention_days * DAY_MS
+        for name in monthly[:-1]:
+            start = datetime.strptime(name[1:], "%Y%m").replace(tzinfo=timezone.utc)
+            end = _month_start(start.year, start.month + 1)
+            if _to_ms(end) <= cutoff and not conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {table} PARTITION ({name}))")):
+                statements.append(f"ALTER TABLE {table} DROP PARTITION {name}")
+        return statements
+
+    @staticmethod
+    def partition_table(months_ahead: int, retention_days: int, dry_run: bool = False) -> List[str]:
+        """Create or extend the monthly partitions of the leaderboard table.
+
+        Args:
+            months_ahead: Months after the current one that must have a partition
+            retention_days: Partitions ending before this age are dropped when empty
+            dry_run: Only return the statements
+
+        Returns:
+            Statements that were (or would be) run
+        """
+        with engine.connect() as conn:
+            statements = ArchiveService.partition_statements(conn, months_ahead, retention_days)
+            if not dry_run:
+                for statement in statements:
+                    logger.info(statement)
+                    conn.execute(text(statement))
+                conn.commit()
+        return statements
+
+    @staticmethod
+    def purge_game_sessions(ttl_seconds: int, batch_size: int, dry_run: bool = False) -> int:
+        """Delete used game sessions that have expired.
+
+        An expired session is rejected by its signature check anyway, so its
+        row is no longer needed to stop a second submission.
+
+        Args:
+            ttl_seconds: Session lifetime (GAME_SESSION_TTL_SECONDS)
+            batch_size: Rows deleted per transaction
+            dry_run: Only count the rows that would be deleted
+
+        Returns:
+            Number of rows deleted (or that would be)
+        """
+        table = GameSessionDB.__table__
+        expired = table.c.issued_at < int(time.time() * 1000) - ttl_seconds * 1000
+        if dry_run:
+            with engine.connect() as conn:
+                return conn.scalar(select(func.count()).select_from(table).where(expired))
+
+        deleted = 0
+        while True:
+            with engine.begin() as conn:
+                ids = conn.scalars(select(table.c.id).where(expired).limit(batch_size)).all()
+                if not ids:
+                    break
+                conn.execute(delete(table).where(table.c.id.in_(ids)))
+            deleted += len(ids)
+        return deleted
@@ -1,19 +1,39 @@
 """Authentication service for API token validation."""
-from app.config import API_TOKEN
+from app.services.api_key_store import api_key_store
+from app.utils.metrics import timed_layer
+from typing import Optional
 
 
 class AuthService:
     """Service for authentication operations."""
     
     @staticmethod
+    @timed_layer("auth")
     def verify_token(token: str) -> bool:
         """Verify API token.
         
+        Accepts API_TOKEN and every key of the key store (key file and
+        api_keys table), without a database round trip.
+        
         Args:
             token: API token string
             
         Returns:
             True if token is valid, False otherwise
         """
-        return token == API_TOKEN
-
+        return api_key_store.lookup(token) is not None
+    
+    @staticmethod
+    def get_client_id(token: Optional[str]) -> Optional[str]:
+        """Get the client a token belongs to.
+        
+        Args:
+            token: API token string, or None
+            
+        Returns:
+            Client id of the matching key, or None if the token is missing or invalid
+        """
+        if not token:
+            return None
+        key = api_key_store.lookup(token)
+        return key.client_id if key is not None else None
@@ -1,131 +1,746 @@
 """Database service for leaderboard operations."""
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.models.db_models import LeaderboardEntryDB
-from app.database import get_db
-from typing import List, Dict, Any, Optional
+from sqlalchemy import case, delete, desc, func, insert, select, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.models.db_models import LeaderboardEntryDB, LeaderboardArchiveDB, PlayerBestDB, ApiKeyDB, GameSessionDB, ScoreWalCheckpointDB
+from app.database import AsyncSessionLocal
+from app.services.leaderboard_cache import leaderboard_caches
+from app.services.rank_index import rank_index
+from app.services.replica_router import replica_router
+from app.utils.tracing import traced
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
+# Dialect-specific INSERT constructs that support upserts
+UPSERT_INSERTS = {
+    "mysql": mysql.insert,
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
+
+@traced
 class DatabaseService:
     """Service for database operations."""
-    
+
+    @staticmethod
+    def _entry_to_dict(entry: LeaderboardEntryDB) -> Dict[str, Any]:
+        """Convert a database row to the entry dict used by the API layer.
+
+        Keys follow the field order of LeaderboardEntry so the dict can be
+        encoded to JSON directly (see app.utils.json_encoding).
+        """
+        return {
+            "name": entry.name,
+            "score": entry.score,
+            "maxCombo": entry.max_combo,
+            "timestamp": float(entry.timestamp),
+            "id": str(entry.id)
+        }
+
+    @staticmethod
+    def _entry_query():
+        """SELECT of just the columns the API returns, in LeaderboardEntry order.
+
+        Plain rows are much cheaper to load than ORM instances.
+        """
+        return select(
+            LeaderboardEntryDB.name,
+            LeaderboardEntryDB.score,
+            LeaderboardEntryDB.max_combo,
+            LeaderboardEntryDB.timestamp,
+            LeaderboardEntryDB.id,
+        )
+
+    @staticmethod
+    def _rows_to_dicts(rows) -> List[Dict[str, Any]]:
+        """Convert rows of ``_entry_query()`` to entry dicts."""
+        return [
+            {"name": name, "score": score, "maxCombo": max_combo, "timestamp": float(timestamp), "id": str(entry_id)}
+            for name, score, max_combo, timestamp, entry_id in rows
+        ]
+
+    @staticmethod
+    def _write_through(entry: Dict[str, Any]) -> None:
+        """Apply a newly inserted entry to every leaderboard cache."""
+        for cache in leaderboard_caches.values():
+            cache.apply_insert(entry)
+
+    @staticmethod
+    def _player_best_rows(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Aggregate inserted rows (with ``id``, in id order) into one player_best row per name."""
+        players: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            player = players.get(entry["name"])
+            if player is None:
+                players[entry["name"]] = {
+                    "name": entry["name"],
+                    "best_score": entry["score"],
+                    "best_entry_id": entry["id"],
+                    "best_timestamp": entry["timestamp"],
+                    "best_combo": entry["max_combo"],
+                    "games": 1,
+                    "last_timestamp": entry["timestamp"],
+                }
+                continue
+            if entry["score"] > player["best_score"]:
+                player["best_score"] = entry["score"]
+                player["best_entry_id"] = entry["id"]
+                player["best_timestamp"] = entry["timestamp"]
+            player["best_combo"] = max(player["best_combo"], entry["max_combo"])
+            player["games"] += 1
+            player["last_timestamp"] = max(player["last_timestamp"], entry["timestamp"])
+        return list(players.values())
+
+    @staticmethod
+    async def _upsert_player_best(db, entries: List[Dict[str, Any]]) -> None:
+        """Fold newly inserted rows into player_best within the caller's transaction.
+
+        Args:
+            db: Session of the transaction that inserted the rows
+            entries: Inserted rows with id, name, score, max_combo, timestamp
+        """
+        dialect = db.bind.dialect.name
+        if dialect not in UPSERT_INSERTS:
+            raise Exception(f"player_best upsert is not supported on {dialect}")
+
+        table = PlayerBestDB.__table__
+        stmt = UPSERT_INSERTS[dialect](table).values(DatabaseService._player_best_rows(entries))
+        new = stmt.inserted if dialect == "mysql" else stmt.excluded
+        better = new.best_score > table.c.best_score
+        # MySQL applies assignments left to right, so best_score must come
+        # after the columns whose update compares against it
+        updates = [
+            ("best_entry_id", case((better, new.best_entry_id), else_=table.c.best_entry_id)),
+            ("best_timestamp", case((better, new.best_timestamp), else_=table.c.best_timestamp)),
+            ("best_combo", case((new.best_combo > table.c.best_combo, new.best_combo), else_=table.c.best_combo)),
+            ("games", table.c.games + new.games),
+            ("last_timestamp", case(
+                (new.last_timestamp > table.c.last_timestamp, new.last_timestamp),
+                else_=table.c.last_timestamp
+            )),
+            ("best_score", case((better, new.best_score), else_=table.c.best_score)),
+        ]
+        if dialect == "mysql":
+            stmt = stmt.on_duplicate_key_update(updates)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.name], set_=dict(updates))
+        await db.execute(stmt)
+
     @staticmethod
-    def get_leaderboard(limit: int = 10) -> List[Dict[str, Any]]:
+    async def _rebuild_player_best(db, name: str) -> None:
+        """Recompute one player's player_best row from their history (after a delete).
+
+        Archived games are part of the history, as in ``get_score_counts``.
+
+        Args:
+            db: Session of the transaction that deleted the row
+            name: Player name
+        """
+        await db.execute(delete(PlayerBestDB).where(PlayerBestDB.name == name))
+        history = union_all(*(
+            select(model.id, model.name, model.score, model.max_combo, model.timestamp).where(model.name == name)
+            for model in (LeaderboardEntryDB, LeaderboardArchiveDB)
+        )).subquery()
+        result = await db.execute(select(history).order_by(history.c.id))
+        rows = [dict(row._mapping) for row in result]
+        if rows:
+            await db.execute(insert(PlayerBestDB), DatabaseService._player_best_rows(rows))
+
+    @staticmethod
+    async def get_leaderboard(limit: int = 10, window: str = "all") -> List[Dict[str, Any]]:
         """Get top leaderboard entries sorted by score descending.
-        
+
+        Served from the in-memory top-N cache of the window; the database is
+        only queried when the cache is cold, expired or the window rolled over.
+
         Args:
             limit: Maximum number of entries to return (default: 10)
-            
+            window: "day", "week" or "all" (default: "all")
+
+        Returns:
+            List of leaderboard entries
+        """
+        return await leaderboard_caches[window].get_or_load(limit, DatabaseService._fetch_leaderboard)
+
+    @staticmethod
+    async def _fetch_leaderboard(limit: int, since: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Query the top leaderboard entries from the database.
+
+        Always reads the primary: this refills the caches, and a lagging
+        replica would drop scores already written through to them.
+
+        Args:
+            limit: Maximum number of entries to return
+            since: Only include entries with a timestamp at or after this (epoch ms)
+
+        Returns:
+            List of leaderboard entries
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                query = DatabaseService._entry_query()
+                if since is not None:
+                    query = query.where(LeaderboardEntryDB.timestamp >= since)
+                result = await db.execute(
+                    query
+                    .order_by(desc(LeaderboardEntryDB.score), desc(LeaderboardEntryDB.id))
+                    .limit(limit)
+                )
+                return DatabaseService._rows_to_dicts(result)
+            except Exception as e:
+                raise Exception(f"Error fetching leaderboard: {str(e)}")
+
+    @staticmethod
+    async def get_leaderboard_after(
+        score: int,
+        entry_id: int,
+        limit: int,
+        since: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the leaderboard page following the entry (score, entry_id).
+
+        Keyset pagination over the (score DESC, id DESC) index: the cost of a
+        page does not depend on how deep it is. Archived entries keep their
+        ranks, so the page is the next ``limit`` rows of both tables merged
+        (one index range scan per table).
+
+        Args:
+            score: Score of the last entry of the previous page
+            entry_id: ID of the last entry of the previous page
+            limit: Maximum number of entries to return
+            since: Only include entries with a timestamp at or after this (epoch ms)
+
         Returns:
             List of leaderboard entries
         """
-        db: Session = next(get_db())
-        try:
-            entries = db.query(LeaderboardEntryDB)\
-                .order_by(desc(LeaderboardEntryDB.score))\
-                .limit(limit)\
-                .all()
-            
-            result = []
-            for entry in entries:
-                result.append({
-                    "id": str(entry.id),
-                    "name": entry.name,
-                    "score": entry.score,
-                    "maxCombo": entry.max_combo,
-                    "timestamp": float(entry.timestamp)
-                })
-            
-            return result
-        except Exception as e:
-            raise Exception(f"Error fetching leaderboard: {str(e)}")
-        finally:
-            db.close()
-    
-    @staticmethod
-    def add_leaderboard_entry(entry: Dict[str, Any]) -> str:
+        def rows_after(model):
+            query = select(model.name, model.score, model.max_combo, model.timestamp, model.id).where(
+                tuple_(model.score, model.id) < tuple_(score, entry_id)
+            )
+            if since is not None:
+                query = query.where(model.timestamp >= since)
+            return query.order_by(desc(model.score), desc(model.id)).limit(limit)
+
+        async with replica_router.session() as db:
+            try:
+                merged = union_all(
+                    select(rows_after(LeaderboardEntryDB).subquery()),
+                    select(rows_after(LeaderboardArchiveDB).subquery()),
+                ).subquery()
+                result = await db.execute(
+                    select(merged).order_by(desc(merged.c.score), desc(merged.c.id)).limit(limit)
+                )
+                return DatabaseService._rows_to_dicts(result)
+            except Exception as e:
+                raise Exception(f"Error fetching leaderboard page: {str(e)}")
+
+    @staticmethod
+    async def stream_leaderboard_rows(
+        after: int = 0,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        chunk_size: int = 2000,
+        include_archive: bool = True
+    ) -> AsyncIterator[List[Tuple[int, str, int, int, int]]]:
+        """Stream leaderboard rows in id order, ``chunk_size`` rows at a time.
+
+        Only one chunk is held at a time, however large the tables; the
+        session (on a replica when available) stays open until the iterator
+        is exhausted or closed. The leaderboard table alone is read from a
+        server-side cursor. With the archive, each chunk is the next
+        ``chunk_size`` ids of both tables merged (one primary key range scan
+        per table), since archived rows keep their original ids and
+        interleave with the rows still in the leaderboard table.
+
+        Args:
+            after: Only include entries with a greater id (resume point)
+            since: Only include entries with a timestamp at or after this (epoch ms)
+            until: Only include entries with a timestamp before this (epoch ms)
+            chunk_size: Rows fetched per round trip
+            include_archive: Also include entries moved to leaderboard_archive
+
+        Yields:
+            Lists of (id, name, score, max_combo, timestamp) rows
+        """
+        def rows_after(model, last_id: int):
+            query = select(
+                model.id, model.name, model.score, model.max_combo, model.timestamp
+            ).where(model.id > last_id).order_by(model.id)
+            if since is not None:
+                query = query.where(model.timestamp >= since)
+            if until is not None:
+                query = query.where(model.timestamp < until)
+            return query
+
+        async with replica_router.session() as db:
+            try:
+                if not include_archive:
+                    result = await db.stream(rows_after(LeaderboardEntryDB, after).execution_options(yield_per=chunk_size))
+                    async for rows in result.partitions():
+                        yield rows
+                    return
+                last_id = after
+                while True:
+                    merged = union_all(
+                        select(rows_after(LeaderboardEntryDB, last_id).limit(chunk_size).subquery()),
+                        select(rows_after(LeaderboardArchiveDB, last_id).limit(chunk_size).subquery()),
+                    ).subquery()
+                    rows = (await db.execute(
+                        select(merged).order_by(merged.c.id).limit(chunk_size)
+                    )).all()
+                    if not rows:
+                        return
+                    yield rows
+                    last_id = rows[-1][0]
+            except Exception as e:
+                raise Exception(f"Error exporting leaderboard: {str(e)}")
+
+    @staticmethod
+    async def add_leaderboard_entry(entry: Dict[str, Any]) -> str:
         """Add a new leaderboard entry.
-        
+
         Args:
             entry: Dictionary containing name, score, maxCombo, timestamp
-            
+
         Returns:
             ID of the created entry
         """
-        db: Session = next(get_db())
-        try:
-            # Add timestamp if not present
-            if "timestamp" not in entry:
-                entry["timestamp"] = int(datetime.now().timestamp() * 1000)  # milliseconds
-            
-            db_entry = LeaderboardEntryDB(
-                name=entry["name"],
-                score=entry["score"],
-                max_combo=entry.get("maxCombo", 0),
-                timestamp=entry["timestamp"]
+        async with AsyncSessionLocal() as db:
+            try:
+                # Add timestamp if not present
+                if "timestamp" not in entry:
+                    entry["timestamp"] = int(datetime.now().timestamp() * 1000)  # milliseconds
+
+                db_entry = LeaderboardEntryDB(
+                    name=entry["name"],
+                    score=entry["score"],
+                    max_combo=entry.get("maxCombo", 0),
+                    timestamp=int(entry["timestamp"])
+                )
+
+                db.add(db_entry)
+                # The primary key is assigned on flush; no refresh round trip needed
+                await db.flush()
+                await DatabaseService._upsert_player_best(db, [{
+                    "id": db_entry.id,
+                    "name": db_entry.name,
+                    "score": db_entry.score,
+                    "max_combo": db_entry.max_combo,
+                    "timestamp": db_entry.timestamp,
+                }])
+                rank_index.begin_inserts([db_entry.id])
+                await db.commit()
+
+                DatabaseService._write_through(DatabaseService._entry_to_dict(db_entry))
+                rank_index.record_insert(db_entry.id, db_entry.score)
+                return str(db_entry.id)
+            except Exception as e:
+                await db.rollback()
+                rank_index.cancel_inserts([db_entry.id])
+                raise Exception(f"Error adding leaderboard entry: {str(e)}")
+
+    @staticmethod
+    def _entry_rows(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convert entry dicts (API field names) to leaderboard table rows."""
+        now = int(datetime.now().timestamp() * 1000)  # milliseconds
+        return [
+            {
+                "name": entry["name"],
+                "score": entry["score"],
+                "max_combo": entry.get("maxCombo", 0),
+                "timestamp": int(entry.get("timestamp", now)),
+            }
+            for entry in entries
+        ]
+
+    @staticmethod
+    async def _insert_rows(db, rows: List[Dict[str, Any]]) -> List[int]:
+        """Insert leaderboard rows with one multi-row INSERT (no commit).
+
+        The ids are registered with the rank index before the caller commits;
+        on failure the caller cancels them.
+
+        On dialects with INSERT ... RETURNING the ids come back with the rows.
+        On MySQL they are derived from LAST_INSERT_ID(), which InnoDB assigns
+        consecutively to the rows of a single INSERT when
+        ``innodb_autoinc_lock_mode`` is 0 or 1.
+
+        Returns:
+            IDs of the inserted rows, in the same order as ``rows``
+        """
+        table = LeaderboardEntryDB.__table__
+        if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                rows
             )
-            
-            db.add(db_entry)
-            db.commit()
-            db.refresh(db_entry)
-            
-            return str(db_entry.id)
-        except Exception as e:
-            db.rollback()
-            raise Exception(f"Error adding leaderboard entry: {str(e)}")
-        finally:
-            db.close()
-    
-    @staticmethod
-    def get_entry_by_id(entry_id: int) -> Optional[Dict[str, Any]]:
-        """Get a leaderboard entry by ID.
-        
+            ids = list(result.scalars())
+        else:
+            result = await db.execute(insert(table).values(rows))
+            first_id = result.lastrowid
+            ids = list(range(first_id, first_id + len(rows)))
+        rank_index.begin_inserts(ids)
+        await DatabaseService._upsert_player_best(
+            db, [dict(row, id=entry_id) for entry_id, row in zip(ids, rows)]
+        )
+        return ids
+
+    @staticmethod
+    def _record_inserted(ids: List[int], rows: List[Dict[str, Any]]) -> None:
+        """Add committed rows to the leaderboard caches and the rank index."""
+        for entry_id, row in zip(ids, rows):
+            DatabaseService._write_through({
+                "name": row["name"],
+                "score": row["score"],
+                "maxCombo": row["max_combo"],
+                "timestamp": float(row["timestamp"]),
+                "id": str(entry_id)
+            })
+            rank_index.record_insert(entry_id, row["score"])
+
+    @staticmethod
+    async def add_leaderboard_entries(entries: List[Dict[str, Any]]) -> List[str]:
+        """Add several leaderboard entries with one multi-row INSERT and commit.
+
+        Args:
+            entries: List of dictionaries containing name, score, maxCombo, timestamp
+
+        Returns:
+            IDs of the created entries, in the same order as ``entries``
+        """
+        if not entries:
+            return []
+
+        rows = DatabaseService._entry_rows(entries)
+        ids = []
+        async with AsyncSessionLocal() as db:
+            try:
+                ids = await DatabaseService._insert_rows(db, rows)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                rank_index.cancel_inserts(ids)
+                raise Exception(f"Error adding leaderboard entries: {str(e)}")
+
+        DatabaseService._record_inserted(ids, rows)
+        return [str(entry_id) for entry_id in ids]
+
+    @staticmethod
+    async def get_entry_by_id(entry_id: int) -> Optional[Dict[str, Any]]:
+        """Get a leaderboard entry by ID, including archived entries.
+
         Args:
             entry_id: Entry ID
-            
+
         Returns:
             Entry data or None if not found
         """
-        db: Session = next(get_db())
-        try:
-            entry = db.query(LeaderboardEntryDB).filter(LeaderboardEntryDB.id == entry_id).first()
-            if entry:
-                return {
-                    "id": str(entry.id),
-                    "name": entry.name,
-                    "score": entry.score,
-                    "maxCombo": entry.max_combo,
-                    "timestamp": float(entry.timestamp)
-                }
-            return None
-        except Exception as e:
-            raise Exception(f"Error getting entry: {str(e)}")
-        finally:
-            db.close()
-    
+        async with replica_router.session() as db:
+            try:
+                entry = await db.get(LeaderboardEntryDB, entry_id)
+                if entry is None:
+                    entry = await db.get(LeaderboardArchiveDB, entry_id)
+                if entry:
+                    return DatabaseService._entry_to_dict(entry)
+                return None
+            except Exception as e:
+                raise Exception(f"Error getting entry: {str(e)}")
+
     @staticmethod
-    def delete_entry(entry_id: int) -> bool:
-        """Delete a leaderboard entry.
-        
+    async def delete_entry(entry_id: int) -> bool:
+        """Delete a leaderboard entry, including archived entries.
+
         Args:
             entry_id: Entry ID
-            
+
         Returns:
             True if successful
         """
-        db: Session = next(get_db())
-        try:
-            entry = db.query(LeaderboardEntryDB).filter(LeaderboardEntryDB.id == entry_id).first()
-            if entry:
-                db.delete(entry)
-                db.commit()
+        async with AsyncSessionLocal() as db:
+            try:
+                entry = await db.get(LeaderboardEntryDB, entry_id)
+                if entry is None:
+                    entry = await db.get(LeaderboardArchiveDB, entry_id)
+                if entry:
+                    await db.delete(entry)
+                    await db.flush()
+                    await DatabaseService._rebuild_player_best(db, entry.name)
+                    await db.commit()
+                    for cache in leaderboard_caches.values():
+                        cache.invalidate()
+                    rank_index.record_delete(entry.id, entry.score)
+                    return True
+                return False
+            except Exception as e:
+                await db.rollback()
+                raise Exception(f"Error deleting entry: {str(e)}")
+
+    @staticmethod
+    async def get_player_leaderboard(
+        limit: int = 10,
+        after: Optional[Tuple[int, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the leaderboard with one entry (the best game) per player.
+
+        Reads only the player_best table along its (best_score DESC,
+        best_entry_id DESC) index; the history is never grouped.
+
+        Args:
+            limit: Maximum number of entries to return (default: 10)
+            after: (best score, best entry ID) of the last entry of the previous page
+
+        Returns:
+            List of leaderboard entries (maxCombo is the player's best combo)
+        """
+        async with replica_router.session() as db:
+            try:
+                query = select(
+                    PlayerBestDB.name,
+                    PlayerBestDB.best_score,
+                    PlayerBestDB.best_combo,
+                    PlayerBestDB.best_timestamp,
+                    PlayerBestDB.best_entry_id,
+                )
+                if after is not None:
+                    query = query.where(
+                        tuple_(PlayerBestDB.best_score, PlayerBestDB.best_entry_id) < tuple_(*after)
+                    )
+                result = await db.execute(
+                    query
+                    .order_by(desc(PlayerBestDB.best_score), desc(PlayerBestDB.best_entry_id))
+                    .limit(limit)
+                )
+                return DatabaseService._rows_to_dicts(result)
+            except Exception as e:
+                raise Exception(f"Error fetching player leaderboard: {str(e)}")
+
+    @staticmethod
+    async def get_player_stats(name: str) -> Optional[Dict[str, Any]]:
+        """Get a player's aggregate stats.
+
+        Args:
+            name: Player name
+
+        Returns:
+            Stats data or None if the player has no games
+        """
+        async with replica_router.session() as db:
+            try:
+                player = await db.get(PlayerBestDB, name)
+                if player is None:
+                    return None
+                return {
+                    "name": player.name,
+                    "bestScore": player.best_score,
+                    "bestCombo": player.best_combo,
+                    "games": player.games,
+                    "bestEntryId": str(player.best_entry_id),
+                    "bestTimestamp": float(player.best_timestamp),
+                    "lastPlayed": float(player.last_timestamp)
+                }
+            except Exception as e:
+                raise Exception(f"Error getting player stats: {str(e)}")
+
+    @staticmethod
+    async def get_score_counts() -> Tuple[List[Tuple[int, int]], int]:
+        """Get the number of entries per score, for building the rank index.
+
+        Archived entries are included, so archiving never changes a rank.
+
+        Returns:
+            Tuple of ([(score, count)], highest entry id) read in one transaction
+        """
+        async with replica_router.session() as db:
+            try:
+                counts = []
+                for model in (LeaderboardEntryDB, LeaderboardArchiveDB):
+                    result = await db.execute(select(model.score, func.count()).group_by(model.score))
+                    counts.extend((score, count) for score, count in result)
+                max_id = await db.scalar(select(func.max(LeaderboardEntryDB.id)))
+                return counts, max_id or 0
+            except Exception as e:
+                raise Exception(f"Error counting scores: {str(e)}")
+
+    @staticmethod
+    async def get_scores_since(last_id: int) -> List[Tuple[int, int]]:
+        """Get the scores of entries inserted after ``last_id``.
+
+        Args:
+            last_id: Highest entry id already seen
+
+        Returns:
+            List of (id, score) ordered by id
+        """
+        async with replica_router.session() as db:
+            try:
+                result = await db.execute(
+                    select(LeaderboardEntryDB.id, LeaderboardEntryDB.score)
+                    .where(LeaderboardEntryDB.id > last_id)
+                    .order_by(LeaderboardEntryDB.id)
+                )
+                return [(entry_id, score) for entry_id, score in result]
+            except Exception as e:
+                raise Exception(f"Error fetching new scores: {str(e)}")
+
+    @staticmethod
+    async def get_api_keys(now: int) -> List[Tuple[str, str, Optional[int]]]:
+        """Get every active, unexpired API key.
+
+        Args:
+            now: Current time in milliseconds
+
+        Returns:
+            (client_id, key_hash, expires_at) tuples
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                query = select(ApiKeyDB.client_id, ApiKeyDB.key_hash, ApiKeyDB.expires_at).where(
+                    ApiKeyDB.active.is_(True),
+                    (ApiKeyDB.expires_at.is_(None)) | (ApiKeyDB.expires_at > now),
+                )
+                result = await db.execute(query)
+                return [tuple(row) for row in result.all()]
+            except Exception as e:
+                raise Exception(f"Error getting API keys: {str(e)}")
+
+    @staticmethod
+    async def consume_game_session(session_id: str, client_id: str, issued_at: int, now: int) -> bool:
+        """Mark a game session as used, unless it already is.
+
+        The primary key makes concurrent submissions of the same session
+        (other workers or hosts included) race on one INSERT: exactly one wins.
+
+        Args:
+            session_id: Nonce of the session
+            client_id: API client that submitted the result
+            issued_at: Issue time of the session in milliseconds
+            now: Current time in milliseconds
+
+        Returns:
+            True if the session was unused, False if a result was already submitted
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(insert(GameSessionDB).values(
+                    id=session_id, client_id=client_id, issued_at=issued_at, consumed_at=now
+                ))
+                await db.commit()
                 return True
-            return False
-        except Exception as e:
-            db.rollback()
-            raise Exception(f"Error deleting entry: {str(e)}")
-        finally:
-            db.close()
+            except IntegrityError:
+                await db.rollback()
+                return False
+            except Exception as e:
+                await db.rollback()
+                raise Exception(f"Error consuming game session: {str(e)}")
 
+    @staticmethod
+    async def release_game_session(session_id: str) -> None:
+        """Make a consumed game session usable again (its score could not be stored).
 
+        Args:
+            session_id: Nonce of the session
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(delete(GameSessionDB).where(GameSessionDB.id == session_id))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                raise Exception(f"Error releasing game session: {str(e)}")
+
+    @staticmethod
+    async def get_wal_checkpoint(segment: str) -> Optional[int]:
+        """Get how far a write-ahead log segment has been drained.
+
+        Args:
+            segment: Segment file name
+
+        Returns:
+            Byte offset of the segment's next undrained record, or None if
+            nothing was drained from it yet
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                return await db.scalar(
+                    select(ScoreWalCheckpointDB.drained_to).where(ScoreWalCheckpointDB.segment == segment)
+                )
+            except Exception as e:
+                raise Exception(f"Error getting WAL checkpoint: {str(e)}")
+
+    @staticmethod
+    async def add_wal_entries(
+        segment: str,
+        start: Optional[int],
+        end: int,
+        entries: List[Dict[str, Any]]
+    ) -> Optional[List[str]]:
+        """Insert the records of a write-ahead log segment and advance its checkpoint.
+
+        The rows and the checkpoint move from ``start`` to ``end`` commit in
+        one transaction, and the move only applies if the checkpoint is still
+        at ``start``. A record range is therefore inserted exactly once, even
+        if a worker dies mid-drain or two workers drain the same segment.
+
+        Args:
+            segment: Segment file name
+            start: Current checkpoint (byte offset of the first record), or
+                None for the segment's first drain
+            end: Byte offset after the last record
+            entries: Dictionaries containing name, score, maxCombo, timestamp
+
+        Returns:
+            IDs of the created entries, or None if the checkpoint was not at
+            ``start`` (the range was already drained elsewhere)
+
+        Raises:
+            Exception: If the database rejected the rows or is unavailable
+        """
+        rows = DatabaseService._entry_rows(entries)
+        now = int(datetime.now().timestamp() * 1000)  # milliseconds
+        ids = []
+        async with AsyncSessionLocal() as db:
+            try:
+                table = ScoreWalCheckpointDB.__table__
+                if start is None:
+                    try:
+                        await db.execute(insert(table).values(segment=segment, drained_to=end, updated_at=now))
+                    except IntegrityError:
+                        await db.rollback()
+                        # Only a lost race if another drainer's checkpoint is there now
+                        if await db.scalar(select(table.c.drained_to).where(table.c.segment == segment)) is None:
+                            raise
+                        return None
+                else:
+                    result = await db.execute(
+                        update(table)
+                        .where(table.c.segment == segment, table.c.drained_to == start)
+                        .values(drained_to=end, updated_at=now)
+                    )
+                    if result.rowcount != 1:
+                        await db.rollback()
+                        return None
+                ids = await DatabaseService._insert_rows(db, rows) if rows else []
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                rank_index.cancel_inserts(ids)
+                raise Exception(f"Error draining WAL entries: {str(e)}")
+
+        DatabaseService._record_inserted(ids, rows)
+        return [str(entry_id) for entry_id in ids]
+
+    @staticmethod
+    async def delete_wal_checkpoint(segment: str) -> None:
+        """Forget a write-ahead log segment that was drained and deleted.
+
+        Args:
+            segment: Segment file name
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(delete(ScoreWalCheckpointDB).where(ScoreWalCheckpointDB.segment == segment))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                raise Exception(f"Error deleting WAL checkpoint: {str(e)}")
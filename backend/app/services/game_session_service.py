@@ -0,0 +1,84 @@
+"""Signed game sessions: issue session ids and verify them on submission."""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+from typing import Any, Dict, Tuple
+from app.config import GAME_SESSION_SECRET, GAME_SESSION_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+if GAME_SESSION_SECRET:
+    _secret = GAME_SESSION_SECRET.encode()
+else:
+    _secret = os.urandom(32)
+    logger.warning("GAME_SESSION_SECRET is not set; game sessions are signed with a per-process random key")
+
+
+class InvalidSessionError(ValueError):
+    """The session id is malformed, forged, expired or belongs to another client."""
+
+
+class SessionUsedError(ValueError):
+    """A result was already submitted for the session."""
+
+
+class GameSessionService:
+    """Issue and verify stateless, HMAC-signed game session ids.
+
+    A session id is ``<issued ms>.<nonce>.<signature>``, the signature
+    covering the issue time, the nonce and the API client it was issued to,
+    so issuing one needs no database write. Only the submission stores the
+    nonce (game_sessions table), which makes each session single-use.
+    """
+
+    @staticmethod
+    def _sign(payload: str, client_id: str) -> str:
+        digest = hmac.new(_secret, f"{payload}.{client_id}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+    @staticmethod
+    def issue(client_id: str, now: int) -> Dict[str, Any]:
+        """Issue a new session id.
+
+        Args:
+            client_id: API client the session belongs to
+            now: Current time in milliseconds
+
+        Returns:
+            Dictionary with sessionId, issuedAt and expiresAt (milliseconds)
+        """
+        payload = f"{now}.{os.urandom(16).hex()}"
+        return {
+            "sessionId": f"{payload}.{GameSessionService._sign(payload, client_id)}",
+            "issuedAt": now,
+            "expiresAt": now + GAME_SESSION_TTL_SECONDS * 1000,
+        }
+
+    @staticmethod
+    def verify(session_id: str, client_id: str, now: int) -> Tuple[str, int]:
+        """Check a session id's signature, owner and age.
+
+        Args:
+            session_id: Session id from ``issue``
+            client_id: API client submitting the result
+            now: Current time in milliseconds
+
+        Returns:
+            Tuple of (nonce, issue time in milliseconds)
+
+        Raises:
+            InvalidSessionError: If the session id is not valid for this client now
+        """
+        payload, _, signature = session_id.rpartition(".")
+        issued, _, nonce = payload.partition(".")
+        if not issued.isdigit() or len(nonce) != 32:
+            raise InvalidSessionError("Malformed session id")
+        if not hmac.compare_digest(signature, GameSessionService._sign(payload, client_id)):
+            raise InvalidSessionError("Invalid session id")
+        issued_at = int(issued)
+        if issued_at > now or now - issued_at > GAME_SESSION_TTL_SECONDS * 1000:
+            raise InvalidSessionError("Session expired")
+        return nonce, issued_at
+
@@ -0,0 +1,254 @@
+"""Per-worker fan-out of top-N leaderboard changes to streaming subscribers."""
+import asyncio
+import logging
+import os
+import time
+import weakref
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Deque, AsyncIterator
+import orjson
+from app.config import (
+    LEADERBOARD_CACHE_SIZE,
+    LEADERBOARD_STREAM_COALESCE_MS,
+    LEADERBOARD_STREAM_POLL_SECONDS,
+    LEADERBOARD_STREAM_HEARTBEAT_SECONDS,
+    LEADERBOARD_STREAM_MAX_SUBSCRIBERS,
+    LEADERBOARD_STREAM_MAX_SECONDS,
+)
+from app.services.database_service import DatabaseService
+from app.services.leaderboard_cache import leaderboard_cache
+
+logger = logging.getLogger(__name__)
+
+# Boards kept for computing diffs; subscribers further behind get a snapshot
+HISTORY_SIZE = 32
+KEEPALIVE = b": keepalive\n\n"
+
+
+class SubscriberLimitError(Exception):
+    """Raised when a worker already serves its maximum number of subscribers."""
+
+
+class Subscriber:
+    """One streaming client: its page size and the board version it last received.
+
+    Holds no queue: a slow client that misses versions gets a single diff
+    from its last version to the current one when it catches up.
+    """
+
+    __slots__ = ("limit", "version", "wakeup", "__weakref__")
+
+    def __init__(self, limit: int, version: int):
+        self.limit = limit
+        self.version = version
+        self.wakeup = asyncio.Event()
+
+
+class LeaderboardBroadcaster:
+    """Track the top ``size`` entries and push their changes to subscribers.
+
+    One background task per worker reloads the board (through the leaderboard
+    cache) when ``notify`` is called or ``poll_interval`` passes, waiting
+    ``coalesce`` seconds first so a burst of writes becomes one update. Each
+    change gets a new version; every subscriber is woken and sent a diff from
+    the version it last received, encoded once per (version, limit) pair.
+    Idle subscribers get a keepalive comment every ``heartbeat`` seconds,
+    and every stream ends after ``max_lifetime`` seconds (checked on wakeup).
+    """
+
+    def __init__(
+        self,
+        size: int = LEADERBOARD_CACHE_SIZE,
+        coalesce: float = LEADERBOARD_STREAM_COALESCE_MS / 1000,
+        poll_interval: float = LEADERBOARD_STREAM_POLL_SECONDS,
+        heartbeat: float = LEADERBOARD_STREAM_HEARTBEAT_SECONDS,
+        max_subscribers: int = LEADERBOARD_STREAM_MAX_SUBSCRIBERS,
+        max_lifetime: float = LEADERBOARD_STREAM_MAX_SECONDS
+    ):
+        self.size = size
+        self.coalesce = coalesce
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.max_lifetime = max_lifetime
+        # Weak, so a stream dropped before it ever started cannot leak its slot
+        self._subscribers: "weakref.WeakSet[Subscriber]" = weakref.WeakSet()
+        self._history: Deque[Tuple[int, List[Dict[str, Any]]]] = deque(maxlen=HISTORY_SIZE)
+        self._version = 0
+        self._token: Optional[str] = None
+        # Versions only mean something to the worker that issued them
+        self._nonce = os.urandom(4).hex()
+        self._payloads: Dict[Tuple[int, int], Optional[bytes]] = {}
+        self._dirty: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.updates = 0
+
+    def notify(self) -> None:
+        """Signal that the board may have changed (called after local writes)."""
+        if self._dirty is not None:
+            self._dirty.set()
+
+    async def subscribe(self, limit: int, last_event_id: Optional[str] = None) -> Subscriber:
+        """Register a subscriber for the top ``limit`` entries.
+
+        Args:
+            limit: Number of top entries the subscriber follows
+            last_event_id: SSE Last-Event-ID of a reconnecting client; if it
+                is still in this worker's history the client only gets a diff
+
+        Returns:
+            Subscriber to pass to ``events``
+
+        Raises:
+            SubscriberLimitError: If this worker is at max_subscribers
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            raise SubscriberLimitError(f"Too many leaderboard subscribers ({self.max_subscribers})")
+        if self._task is None:
+            self._dirty = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+        if self._version == 0:
+            await self._refresh()
+
+        subscriber = Subscriber(limit, self._resume_version(last_event_id))
+        self._subscribers.add(subscriber)
+        subscriber.wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Forget a subscriber (idempotent)."""
+        self._subscribers.discard(subscriber)
+
+    async def events(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Yield the SSE frames for one subscriber until it disconnects, expires or the worker stops.
+
+        Args:
+            subscriber: Subscriber returned by ``subscribe``
+
+        Yields:
+            Encoded ``snapshot``/``diff`` events and keepalive comments
+        """
+        deadline = time.monotonic() + self.max_lifetime
+        try:
+            while not self._closing:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                if self._closing or time.monotonic() >= deadline:
+                    break
+                if subscriber.version == self._version:
+                    yield KEEPALIVE
+                    continue
+                payload = self._payload(subscriber.version, subscriber.limit)
+                subscriber.version = self._version
+                if payload is not None:
+                    yield payload
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _resume_version(self, last_event_id: Optional[str]) -> int:
+        """Map a Last-Event-ID back to a version still held in history, or 0."""
+        if not last_event_id:
+            return 0
+        nonce, _, version = last_event_id.partition("-")
+        if nonce != self._nonce or not version.isdigit():
+            return 0
+        version = int(version)
+        return version if any(held == version for held, _ in self._history) else 0
+
+    def _payload(self, since: int, limit: int) -> Optional[bytes]:
+        """Encode the event taking a ``limit`` view from version ``since`` to now.
+
+        Returns None if nothing in the top ``limit`` changed.
+        """
+        key = (since, limit)
+        if key in self._payloads:
+            return self._payloads[key]
+
+        current = self._history[-1][1][:limit]
+        previous = next((entries for version, entries in self._history if version == since), None)
+        event_id = f"{self._nonce}-{self._version}"
+        if previous is None:
+            data = {"version": event_id, "entries": current}
+            payload = _encode_event("snapshot", event_id, data)
+        else:
+            previous = previous[:limit]
+            previous_ids = {entry["id"] for entry in previous}
+            current_ids = {entry["id"] for entry in current}
+            added = [entry for entry in current if entry["id"] not in previous_ids]
+            removed = [entry["id"] for entry in previous if entry["id"] not in current_ids]
+            payload = None
+            if added or removed:
+                data = {"version": event_id, "added": added, "removed": removed}
+                payload = _encode_event("diff", event_id, data)
+
+        self._payloads[key] = payload
+        return payload
+
+    async def _refresh(self) -> bool:
+        """Reload the board and start a new version if its entries changed."""
+        async with self._lock:
+            token = leaderboard_cache.version_token(self.size)
+            if token is not None and token == self._token:
+                return False
+            entries = await DatabaseService.get_leaderboard(self.size)
+            self._token = leaderboard_cache.version_token(self.size)
+
+            if self._history:
+                current = self._history[-1][1]
+                if [entry["id"] for entry in current] == [entry["id"] for entry in entries]:
+                    return False
+            self._version += 1
+            self._history.append((self._version, entries))
+            self._payloads = {}
+            self.updates += 1
+            return True
+
+    async def _run(self) -> None:
+        """Update loop: wait for a notification or the poll interval, coalesce, publish."""
+        last_beat = time.monotonic()
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=self.poll_interval)
+                await asyncio.sleep(self.coalesce)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            if self._closing:
+                break
+            if not self._subscribers:
+                continue
+
+            try:
+                changed = await self._refresh()
+            except Exception as e:
+                logger.warning(f"Leaderboard stream refresh failed: {str(e)}")
+                changed = False
+
+            now = time.monotonic()
+            if changed or now - last_beat >= self.heartbeat:
+                last_beat = now
+                for subscriber in self._subscribers:
+                    subscriber.wakeup.set()
+
+    async def close(self) -> None:
+        """End every subscriber's stream and stop the update loop."""
+        self._closing = True
+        for subscriber in self._subscribers:
+            subscriber.wakeup.set()
+        if self._task is None:
+            return
+        self._dirty.set()
+        await self._task
+        self._task = None
+
+
+def _encode_event(event: str, event_id: str, data: Dict[str, Any]) -> bytes:
+    """Encode one Server-Sent Event (orjson output never contains newlines)."""
+    return b"event: %s\nid: %s\ndata: %s\n\n" % (event.encode(), event_id.encode(), orjson.dumps(data))
+
+
+# Shared broadcaster instance for this process
+leaderboard_broadcaster = LeaderboardBroadcaster()
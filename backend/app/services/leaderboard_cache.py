@@ -0,0 +1,306 @@
+"""In-memory cache of the top leaderboard entries."""
+import asyncio
+import bisect
+import time
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from app.config import (
+    LEADERBOARD_CACHE_SIZE,
+    LEADERBOARD_CACHE_TTL,
+    LEADERBOARD_SNAPSHOT_PATH,
+    LEADERBOARD_SNAPSHOT_SIZE,
+)
+from app.services.shared_snapshot import SharedSnapshot
+from app.utils.windows import WINDOWS, window_start
+
+
+def sort_key(entry: Dict[str, Any]) -> tuple:
+    """Sort key matching the database ordering (score DESC, id DESC)."""
+    return (-entry["score"], -int(entry["id"]))
+
+
+class LeaderboardCache:
+    """Cache holding the top ``size`` entries, sorted by score descending.
+
+    Any ``limit`` up to ``size`` is served by slicing the cached list. Writes
+    made through this process update the cache in place; writes made by other
+    processes are picked up once ``ttl`` seconds have passed.
+
+    A windowed cache (``window`` "day" or "week") only holds entries from
+    the current window and expires when the window rolls over.
+
+    When a ``SharedSnapshot`` is given, the list lives in a memory-mapped file
+    shared by every worker on the host: writes from any worker are visible to
+    all of them immediately, and only one worker per ``ttl`` reloads it from
+    the database.
+    """
+
+    def __init__(
+        self,
+        size: int = LEADERBOARD_CACHE_SIZE,
+        ttl: float = LEADERBOARD_CACHE_TTL,
+        shared: Optional[SharedSnapshot] = None,
+        window: str = "all"
+    ):
+        self.size = size
+        self.ttl = ttl
+        self.shared = shared
+        self.window = window
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        self._loaded_at = 0.0
+        self._bucket: Optional[int] = None
+        # Snapshot version when shared; otherwise a local change counter
+        self._version = 0
+        self._generation = 0
+        self._loading_inserts: Optional[List[Dict[str, Any]]] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+
+    def _sync(self) -> None:
+        """Adopt the shared snapshot if another worker changed it."""
+        if self.shared is None or self.shared.version() == self._version:
+            return
+        snapshot = self.shared.read()
+        if snapshot is not None:
+            self._version = snapshot.version
+            self._generation = snapshot.generation
+            self._entries = snapshot.entries
+            self._loaded_at = snapshot.loaded_at
+            self._bucket = snapshot.bucket
+
+    def _slice(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the first ``limit`` entries, or None if the cache is cold or expired."""
+        self._sync()
+        if self._entries is None or limit > self.size:
+            return None
+        if time.time() - self._loaded_at >= self.ttl:
+            return None
+        if self._bucket != window_start(self.window):
+            return None
+        return self._entries[:limit]
+
+    def peek(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Get the first ``limit`` cached entries without loading or counting a lookup.
+
+        Args:
+            limit: Number of entries the read asks for
+
+        Returns:
+            Entries a read would be served now, or None if it would not be
+            served from the cache
+        """
+        return self._slice(limit)
+
+    def version_token(self, limit: int) -> Optional[str]:
+        """Identify the state of the cached list a read of ``limit`` entries would see.
+
+        The token changes on every insert, invalidation and reload of this
+        cache, so it can key values derived from the entries (such as the
+        ETag of the page). It is only meaningful within this process. Costs
+        one header read of the shared snapshot.
+
+        Args:
+            limit: Number of entries the read asks for
+
+        Returns:
+            Opaque token, or None if the read would not be served from the cache
+        """
+        if self._slice(limit) is None:
+            return None
+        return f"{self._generation}.{self._version}"
+
+    def _merge(self, *lists: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge entry lists by id and keep the top ``size``."""
+        by_id = {}
+        for entries in lists:
+            for entry in entries:
+                by_id[entry["id"]] = entry
+        return sorted(by_id.values(), key=sort_key)[:self.size]
+
+    async def get_or_load(
+        self,
+        limit: int,
+        loader: Callable[[int, Optional[int]], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Get the top ``limit`` entries, loading the cache on a miss.
+
+        Concurrent misses share a single load instead of each querying the
+        database. With a shared snapshot, workers that lose the refresh
+        election keep serving the expired list until the winner publishes.
+
+        Args:
+            limit: Maximum number of entries to return
+            loader: Coroutine function returning the top N entries from the
+                database with a timestamp at or after the second argument
+                (None for no lower bound)
+
+        Returns:
+            List of leaderboard entries sorted by score descending
+        """
+        entries = self._slice(limit)
+        if entries is not None:
+            self.hits += 1
+            return entries
+
+        self.misses += 1
+        if limit > self.size:
+            return await loader(limit, window_start(self.window))
+
+        async with self._lock:
+            entries = self._slice(limit)
+            if entries is not None:
+                return entries
+
+            if self.shared is None:
+                return (await self._refresh(loader))[:limit]
+
+            if not self.shared.try_acquire_refresh():
+                if self._entries is not None and self._bucket == window_start(self.window):
+                    self.stale_hits += 1
+                    return self._entries[:limit]
+                return await loader(limit, window_start(self.window))
+            try:
+                return (await self._refresh(loader))[:limit]
+            finally:
+                self.shared.release_refresh()
+
+    async def _refresh(
+        self,
+        loader: Callable[[int, Optional[int]], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Reload the top-N from the database and publish it.
+
+        Entries written through while the query runs are merged into the
+        result so a steady stream of inserts cannot keep the cache cold. The
+        result is not cached if the cache was invalidated in the meantime.
+        """
+        generation = self._generation
+        loaded_at = time.time()
+        bucket = window_start(self.window)
+        self._loading_inserts = []
+        try:
+            loaded = await loader(self.size, bucket)
+            inserted = self._loading_inserts
+        finally:
+            self._loading_inserts = None
+
+        if self.shared is None:
+            if self._generation != generation:
+                return loaded
+            entries = self._merge(loaded, inserted)
+            self._publish(entries, generation, loaded_at, bucket)
+            return entries
+
+        with self.shared.lock():
+            snapshot = self.shared.read()
+            if snapshot is not None and snapshot.generation != generation:
+                return loaded
+            current = []
+            if snapshot is not None and snapshot.entries and snapshot.bucket == bucket:
+                current = snapshot.entries
+            entries = self._merge(loaded, current, inserted)
+            self._publish(entries, generation, loaded_at, bucket)
+            return entries
+
+    def _publish(
+        self,
+        entries: Optional[List[Dict[str, Any]]],
+        generation: int,
+        loaded_at: float,
+        bucket: Optional[int]
+    ) -> None:
+        """Store entries locally and, if shared, in the snapshot (lock held)."""
+        self._entries = entries
+        self._generation = generation
+        self._loaded_at = loaded_at
+        self._bucket = bucket
+        if self.shared is not None:
+            self._version = self.shared.write(entries, generation, loaded_at, bucket)
+        else:
+            self._version += 1
+
+    def apply_insert(self, entry: Dict[str, Any]) -> None:
+        """Write a newly inserted entry through to the cache.
+
+        Args:
+            entry: Entry dict in the same shape as returned by get_or_load
+        """
+        bucket = window_start(self.window)
+        if bucket is not None and entry["timestamp"] < bucket:
+            return
+        if self._loading_inserts is not None:
+            self._loading_inserts.append(entry)
+
+        if self.shared is None:
+            if self._bucket == bucket:
+                self._insert_local(entry)
+                self._version += 1
+            return
+
+        with self.shared.lock():
+            self._version = 0
+            self._sync()
+            if self._entries is not None and self._bucket == bucket:
+                self._insert_local(entry)
+                self._publish(self._entries, self._generation, self._loaded_at, self._bucket)
+
+    def _insert_local(self, entry: Dict[str, Any]) -> None:
+        """Insert an entry into the locally held list at its sorted position."""
+        if self._entries is None:
+            return
+        position = bisect.bisect_left(self._entries, sort_key(entry), key=sort_key)
+        if position < self.size:
+            self._entries.insert(position, entry)
+            del self._entries[self.size:]
+
+    def invalidate(self) -> None:
+        """Drop the cached entries so the next read reloads from the database."""
+        self.invalidations += 1
+        if self.shared is None:
+            self._publish(None, self._generation + 1, 0.0, None)
+            return
+
+        with self.shared.lock():
+            self._version = 0
+            self._sync()
+            self._publish(None, self._generation + 1, 0.0, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters.
+
+        Returns:
+            Dictionary with window, size, ttl, whether the cache is shared across
+            workers, cached entry count, hits, misses, stale hits, hit rate,
+            invalidations and age of the cached list in seconds
+        """
+        self._sync()
+        lookups = self.hits + self.misses
+        return {
+            "window": self.window,
+            "size": self.size,
+            "ttl": self.ttl,
+            "shared": self.shared is not None,
+            "cached": len(self._entries) if self._entries is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "staleHits": self.stale_hits,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "age": time.time() - self._loaded_at if self._entries is not None else None,
+        }
+
+
+def _create_cache(window: str) -> LeaderboardCache:
+    """Create the cache of one window, shared across workers if configured."""
+    shared = None
+    if LEADERBOARD_SNAPSHOT_PATH:
+        path = LEADERBOARD_SNAPSHOT_PATH if window == "all" else f"{LEADERBOARD_SNAPSHOT_PATH}.{window}"
+        shared = SharedSnapshot(path, LEADERBOARD_SNAPSHOT_SIZE)
+    return LeaderboardCache(shared=shared, window=window)
+
+
+# Shared cache instances for this process, one per window
+leaderboard_caches = {window: _create_cache(window) for window in WINDOWS}
+leaderboard_cache = leaderboard_caches["all"]
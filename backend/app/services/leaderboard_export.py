@@ -0,0 +1,267 @@
+"""Streaming export of the whole leaderboard table as NDJSON, CSV or Parquet."""
+import asyncio
+import csv
+import io
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence
+import orjson
+from app.config import EXPORT_CHUNK_ROWS, EXPORT_PARQUET_ROW_GROUP_ROWS, EXPORT_MAX_CONCURRENT
+from app.services.database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+# Column names of every format, in LeaderboardEntry field names
+COLUMNS = ("id", "name", "score", "maxCombo", "timestamp")
+
+
+class ExportLimitError(Exception):
+    """Raised when a worker already runs its maximum number of exports."""
+
+
+class ExportUnavailableError(Exception):
+    """Raised when a format needs an optional dependency that is not installed."""
+
+
+class Export(NamedTuple):
+    """An export ready to be sent: its content type, file extension and body."""
+    media_type: str
+    extension: str
+    chunks: AsyncIterator[bytes]
+
+
+class NdjsonEncoder:
+    """One JSON object per row and line."""
+
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def start(self) -> bytes:
+        return b""
+
+    async def encode(self, rows: Sequence) -> bytes:
+        return b"".join(
+            orjson.dumps(
+                {"id": entry_id, "name": name, "score": score, "maxCombo": max_combo, "timestamp": timestamp},
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
+            for entry_id, name, score, max_combo, timestamp in rows
+        )
+
+    async def finish(self) -> bytes:
+        return b""
+
+
+class CsvEncoder:
+    """RFC 4180 CSV with a header row."""
+
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def start(self) -> bytes:
+        self._writer.writerow(COLUMNS)
+        return self._take()
+
+    async def encode(self, rows: Sequence) -> bytes:
+        self._writer.writerows(rows)
+        return self._take()
+
+    async def finish(self) -> bytes:
+        return b""
+
+
+class _DrainableSink:
+    """Write-only file object whose contents are taken out as they are written.
+
+    Keeps its own position, since the Parquet writer records absolute file
+    offsets of the row groups.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+class ParquetEncoder:
+    """Parquet file written row group by row group (needs pyarrow).
+
+    Chunks are converted to Arrow record batches as they arrive; every
+    ``row_group_rows`` rows they are written out as one row group in a
+    worker thread, so compression never blocks the event loop.
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, row_group_rows: int = EXPORT_PARQUET_ROW_GROUP_ROWS):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportUnavailableError("Parquet export needs pyarrow (install the backend's \"export\" extra)")
+        self._pa = pyarrow
+        self.schema = pyarrow.schema([
+            ("id", pyarrow.int64()),
+            ("name", pyarrow.string()),
+            ("score", pyarrow.int32()),
+            ("maxCombo", pyarrow.int32()),
+            ("timestamp", pyarrow.int64()),
+        ])
+        self.row_group_rows = row_group_rows
+        self._sink = _DrainableSink()
+        self._writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(self._sink, mode="w"), self.schema)
+        self._batches = []
+        self._pending = 0
+
+    def start(self) -> bytes:
+        return b""
+
+    def _write_group(self) -> bytes:
+        if self._batches:
+            table = self._pa.Table.from_batches(self._batches, self.schema)
+            self._writer.write_table(table, row_group_size=table.num_rows)
+            self._batches = []
+            self._pending = 0
+        return self._sink.take()
+
+    def _close(self) -> bytes:
+        data = self._write_group()
+        self._writer.close()
+        return data + self._sink.take()
+
+    async def encode(self, rows: Sequence) -> bytes:
+        columns = list(zip(*rows))
+        self._batches.append(self._pa.record_batch(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        self._pending += len(rows)
+        if self._pending < self.row_group_rows:
+            return b""
+        return await asyncio.to_thread(self._write_group)
+
+    async def finish(self) -> bytes:
+        return await asyncio.to_thread(self._close)
+
+
+# Encoder factory per ``format`` query value
+ENCODERS: Dict[str, Callable] = {
+    "ndjson": NdjsonEncoder,
+    "csv": CsvEncoder,
+    "parquet": ParquetEncoder,
+}
+
+
+class LeaderboardExporter:
+    """Stream the leaderboard and its archive in id order, a chunk at a time.
+
+    Rows come from ``DatabaseService.stream_leaderboard_rows`` and each chunk
+    is encoded and sent before the next is fetched, so memory stays constant
+    however many rows are exported, and a slow client slows the reads down
+    instead of buffering rows. Every export holds a pooled
+    connection until it ends, hence the per-worker limit.
+    """
+
+    def __init__(self, max_concurrent: int = EXPORT_MAX_CONCURRENT, chunk_rows: int = EXPORT_CHUNK_ROWS):
+        self.max_concurrent = max_concurrent
+        self.chunk_rows = chunk_rows
+        self.active = 0
+
+    def open(
+        self,
+        format: str,
+        after: int = 0,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        include_archive: bool = True
+    ) -> Export:
+        """Start an export.
+
+        Args:
+            format: "ndjson", "csv" or "parquet"
+            after: Only export entries with a greater id (to resume an export)
+            since: Only export entries with a timestamp at or after this (epoch ms)
+            until: Only export entries with a timestamp before this (epoch ms)
+            include_archive: Also export entries moved to leaderboard_archive
+
+        Returns:
+            Export whose chunks form the body
+
+        Raises:
+            ExportLimitError: If this worker is at max_concurrent exports
+            ExportUnavailableError: If the format's dependency is missing
+        """
+        # Only a check: the slot is taken when the body starts streaming, and
+        # an export whose body is never iterated (the client left before the
+        # first chunk) holds none
+        if self.active >= self.max_concurrent:
+            raise ExportLimitError(f"Too many leaderboard exports running ({self.max_concurrent})")
+        encoder = ENCODERS[format]()
+        return Export(
+            encoder.media_type, encoder.extension, self._chunks(encoder, after, since, until, include_archive)
+        )
+
+    async def _chunks(
+        self,
+        encoder,
+        after: int,
+        since: Optional[int],
+        until: Optional[int],
+        include_archive: bool
+    ) -> AsyncIterator[bytes]:
+        last_id = after
+        self.active += 1
+        try:
+            start = encoder.start()
+            if start:
+                yield start
+            rows = DatabaseService.stream_leaderboard_rows(after, since, until, self.chunk_rows, include_archive)
+            async with aclosing(rows):
+                async for chunk in rows:
+                    data = await encoder.encode(chunk)
+                    last_id = chunk[-1][0]
+                    if data:
+                        yield data
+            yield await encoder.finish()
+        except Exception as e:
+            logger.error(f"Leaderboard export failed after id {last_id}: {str(e)}")
+            raise
+        finally:
+            self.active -= 1
+
+
+# Shared exporter instance for this process
+leaderboard_exporter = LeaderboardExporter()
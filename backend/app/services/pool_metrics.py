@@ -0,0 +1,89 @@
+"""Connection pool usage counters for sizing workers against the database.
+
+``/health/pool`` reports this worker's counters; the same checkouts and
+occupancy go to Prometheus, where they add up over all workers.
+"""
+import os
+import time
+from typing import Dict, Any
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from app.utils.metrics import DB_POOL_IN_USE, DB_POOL_OVERFLOW, DB_POOL_WAIT
+
+
+class PoolMetrics:
+    """Checkout counts and wait times of this process's connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe_checkout(self, wait: float, timed_out: bool = False) -> None:
+        """Record one checkout attempt and how long it waited for a connection."""
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        DB_POOL_WAIT.labels("timeout" if timed_out else "acquired").observe(wait)
+
+    @staticmethod
+    def observe_occupancy(pool: Pool) -> None:
+        """Publish how many connections are checked out and open beyond the pool size."""
+        DB_POOL_IN_USE.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    def stats(self, pool: Pool) -> Dict[str, Any]:
+        """Get pool counters.
+
+        Args:
+            pool: Pool whose current occupancy to report
+
+        Returns:
+            Dictionary of pool settings, occupancy and checkout wait times
+        """
+        attempts = self.checkouts + self.timeouts
+        size = pool.size() if hasattr(pool, "size") else 0
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        return {
+            "pid": os.getpid(),
+            "size": size,
+            "maxOverflow": max_overflow,
+            "maxConnections": size + max(max_overflow, 0),
+            "checkedOut": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+            "checkedIn": pool.checkedin() if hasattr(pool, "checkedin") else 0,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "waitAvgMs": self.wait_total / attempts * 1000 if attempts else 0.0,
+            "waitMaxMs": self.wait_max * 1000,
+        }
+
+
+# Pool counters for this process
+pool_metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout waits and occupancy."""
+
+    # Log under sqlalchemy.pool like the stock pools (WARNING by default)
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.observe_checkout(time.perf_counter() - start)
+        pool_metrics.observe_occupancy(self)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        pool_metrics.observe_occupancy(self)
@@ -0,0 +1,330 @@
+"""In-memory order-statistics index over leaderboard scores."""
+import asyncio
+import bisect
+import logging
+import operator
+import time
+from array import array
+from typing import Iterable, List, Optional, Tuple, Callable, Awaitable, Set
+from app.config import (
+    RANK_INDEX_MAX_SCORE, RANK_INDEX_SYNC_SECONDS, RANK_INDEX_REBUILD_SECONDS, RANK_INDEX_GAP_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _fenwick_from_raw(tree: array) -> array:
+    """Turn per-score counts (``tree[score + 1]``, ``tree[0]`` unused) into a Fenwick tree in place.
+
+    Every node with lowest set bit ``step`` adds itself to its parent
+    ``index + step``; a level at a time, each level as one C-level pass.
+    """
+    step = 1
+    while 2 * step < len(tree):
+        tree[2 * step::2 * step] = array("q", map(operator.add, tree[2 * step::2 * step], tree[step::2 * step]))
+        step *= 2
+    return tree
+
+
+class ScoreHistogram:
+    """Count of entries per score with O(log n) "how many score higher" queries.
+
+    Scores up to ``max_score`` live in a Fenwick tree whose size grows to the
+    highest score seen (8 bytes per score value). Outliers above
+    ``max_score`` are kept in a sorted list instead, so one absurd score
+    cannot blow up memory.
+    """
+
+    def __init__(self, max_score: int = RANK_INDEX_MAX_SCORE):
+        self.max_score = max_score
+        self._tree = array("q", [0] * 2)
+        self._tree_total = 0
+        self._overflow: List[int] = []
+
+    @classmethod
+    def from_counts(cls, counts: Iterable[Tuple[int, int]], max_score: int = RANK_INDEX_MAX_SCORE) -> "ScoreHistogram":
+        """Build a histogram from (score, count) pairs in O(highest score + pairs).
+
+        The tree is sized once to the highest score and filled in one pass,
+        instead of adding the pairs one by one.
+
+        Args:
+            counts: (score, count) pairs; a score may appear more than once
+            max_score: Highest score kept in the tree
+
+        Returns:
+            ScoreHistogram counting every pair
+        """
+        histogram = cls(max_score)
+        counts = list(counts)
+        highest = max((score for score, _ in counts if score <= max_score), default=0)
+        raw = array("q", [0]) * (highest + 2)
+        for score, count in counts:
+            if score > max_score:
+                histogram._overflow.extend([score] * count)
+            else:
+                raw[score + 1] += count
+                histogram._tree_total += count
+        histogram._overflow.sort()
+        histogram._tree = _fenwick_from_raw(raw)
+        return histogram
+
+    @property
+    def total(self) -> int:
+        """Number of entries counted."""
+        return self._tree_total + len(self._overflow)
+
+    def _grow(self, score: int) -> None:
+        """Resize the tree so ``score`` fits in O(size).
+
+        A node's count covers a fixed range of scores whatever the tree
+        size, so the existing nodes are copied as they are; of the new
+        nodes, only those whose range reaches back into the old scores
+        (O(log size) of them) are non-zero.
+        """
+        size = len(self._tree) - 1
+        capacity = size
+        while capacity <= score:
+            capacity *= 2
+        capacity = min(capacity, self.max_score + 1)
+
+        tree = self._tree + array("q", [0]) * (capacity - size)
+        index = size + (size & -size)
+        while index <= capacity:
+            start = index - (index & -index)  # Node covers scores start..index - 1
+            tree[index] = self._tree_total - (self._prefix(start - 1) if start > 0 else 0)
+            index += index & -index
+        self._tree = tree
+
+    def _prefix(self, score: int) -> int:
+        """Number of tree entries with a score <= ``score``."""
+        index = min(score, len(self._tree) - 2) + 1
+        count = 0
+        while index > 0:
+            count += self._tree[index]
+            index -= index & -index
+        return count
+
+    def add(self, score: int, delta: int = 1) -> None:
+        """Add ``delta`` entries (negative to remove) with the given score."""
+        if score > self.max_score:
+            position = bisect.bisect_left(self._overflow, score)
+            if delta > 0:
+                self._overflow[position:position] = [score] * delta
+            else:
+                end = bisect.bisect_right(self._overflow, score, position)
+                del self._overflow[position:min(end, position - delta)]
+            return
+
+        if score >= len(self._tree) - 1:
+            self._grow(score)
+        index = score + 1
+        size = len(self._tree) - 1
+        while index <= size:
+            self._tree[index] += delta
+            index += index & -index
+        self._tree_total += delta
+
+    def count_above(self, score: int) -> int:
+        """Number of entries with a score strictly greater than ``score``."""
+        above_overflow = len(self._overflow) - bisect.bisect_right(self._overflow, score)
+        if score >= len(self._tree) - 1:
+            return above_overflow
+        return self._tree_total - self._prefix(score) + above_overflow
+
+
+class RankIndex:
+    """Score histogram of the whole leaderboard table kept in sync with it.
+
+    Built once from ``SELECT score, COUNT(*) ... GROUP BY score``, updated in
+    place on inserts and deletes made by this process, and caught up with
+    rows inserted by other processes through a primary-key range scan at
+    most every ``sync_interval`` seconds. A full rebuild every
+    ``rebuild_interval`` seconds picks up deletes made elsewhere; it runs in
+    a background task (the tree is built in a worker thread) while lookups
+    keep using the current histogram.
+
+    Ids do not become visible in order: a lower id can commit after a higher
+    one, and a replica can lag. The scan therefore restarts from the highest
+    id below which every row was seen, skipping rows above it already
+    counted, and only gives up on a missing id after ``gap_interval``
+    seconds (a rolled-back or deleted row). This process's own inserts are
+    registered before their commit, so the scan never counts them a second
+    time.
+    """
+
+    def __init__(
+        self,
+        max_score: int = RANK_INDEX_MAX_SCORE,
+        sync_interval: float = RANK_INDEX_SYNC_SECONDS,
+        rebuild_interval: float = RANK_INDEX_REBUILD_SECONDS,
+        gap_interval: float = RANK_INDEX_GAP_SECONDS
+    ):
+        self.max_score = max_score
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.gap_interval = gap_interval
+        self._histogram = ScoreHistogram(max_score)
+        # Every row with an id up to _last_id is counted; above it, only _seen
+        self._last_id = 0
+        self._seen: Set[int] = set()
+        # Ids this process inserted whose commit has not been recorded yet
+        self._pending: Set[int] = set()
+        self._gap_since: Optional[float] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the index has been built."""
+        return self._built_at > 0
+
+    @property
+    def total(self) -> int:
+        """Number of entries in the index."""
+        return self._histogram.total
+
+    async def ensure_fresh(
+        self,
+        load_counts: Callable[[], Awaitable[Tuple[List[Tuple[int, int]], int]]],
+        load_since: Callable[[int], Awaitable[List[Tuple[int, int]]]]
+    ) -> None:
+        """Build, rebuild or catch up the index if it is due.
+
+        Args:
+            load_counts: Coroutine function returning ([(score, count)], max_id)
+            load_since: Coroutine function returning [(id, score)] for ids above the argument
+        """
+        now = time.monotonic()
+        rebuild_due = now - self._built_at >= self.rebuild_interval and self._rebuild_task is None
+        if self.ready and not rebuild_due and now - self._synced_at < self.sync_interval:
+            return
+
+        async with self._lock:
+            if not self.ready:
+                await self._rebuild(load_counts)
+                return
+            now = time.monotonic()
+            if now - self._built_at >= self.rebuild_interval and self._rebuild_task is None:
+                self._rebuild_task = asyncio.create_task(self._rebuild_in_background(load_counts))
+            if now - self._synced_at >= self.sync_interval:
+                await self._catch_up(load_since)
+
+    async def _rebuild(self, load_counts: Callable[[], Awaitable[Tuple[List[Tuple[int, int]], int]]]) -> None:
+        """Replace the histogram with a fresh one built from the table (caller holds the lock)."""
+        counts, max_id = await load_counts()
+        histogram = await asyncio.to_thread(ScoreHistogram.from_counts, counts, self.max_score)
+        self._swap(histogram, max_id)
+
+    def _swap(self, histogram: ScoreHistogram, max_id: int) -> None:
+        """Start using a histogram of every row up to ``max_id``.
+
+        Pending inserts up to ``max_id`` are taken as committed before the
+        snapshot (it is counted there); one that was not is missing until
+        the next rebuild.
+        """
+        self._histogram = histogram
+        self._last_id = max_id
+        self._seen.clear()
+        self._pending = {entry_id for entry_id in self._pending if entry_id > max_id}
+        self._gap_since = None
+        self._built_at = self._synced_at = time.monotonic()
+
+    async def _rebuild_in_background(self, load_counts: Callable[[], Awaitable[Tuple[List[Tuple[int, int]], int]]]) -> None:
+        """Periodic rebuild; only the swap waits for the lock.
+
+        Rows with ids above the snapshot's ``max_id`` that were counted in
+        the meantime are counted again by the next catch-up, since the swap
+        moves ``_last_id`` back to ``max_id``.
+        """
+        try:
+            counts, max_id = await load_counts()
+            histogram = await asyncio.to_thread(ScoreHistogram.from_counts, counts, self.max_score)
+            async with self._lock:
+                self._swap(histogram, max_id)
+        except Exception as e:
+            logger.warning(f"Rank index rebuild failed, keeping the current index: {str(e)}")
+        finally:
+            self._rebuild_task = None
+
+    async def close(self) -> None:
+        """Cancel a running background rebuild."""
+        if self._rebuild_task is not None:
+            self._rebuild_task.cancel()
+            try:
+                await self._rebuild_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _catch_up(self, load_since: Callable[[int], Awaitable[List[Tuple[int, int]]]]) -> None:
+        """Add rows other processes inserted since the last sync."""
+        for entry_id, score in await load_since(self._last_id):
+            if entry_id > self._last_id and entry_id not in self._seen and entry_id not in self._pending:
+                self._histogram.add(score)
+                self._seen.add(entry_id)
+        self._advance()
+        self._synced_at = time.monotonic()
+
+    def _advance(self) -> None:
+        """Move ``_last_id`` up past every id seen without a gap below it.
+
+        A gap that stays open for ``gap_interval`` seconds is skipped; a row
+        committing into it after that is missing until the next rebuild.
+        """
+        while self._last_id + 1 in self._seen:
+            self._last_id += 1
+            self._seen.discard(self._last_id)
+        if not self._seen:
+            self._gap_since = None
+            return
+        now = time.monotonic()
+        if self._gap_since is None:
+            self._gap_since = now
+        elif now - self._gap_since >= self.gap_interval:
+            self._last_id = min(self._seen) - 1
+            self._gap_since = None
+            self._advance()
+
+    def begin_inserts(self, entry_ids: Iterable[int]) -> None:
+        """Register ids this process is about to commit, before other readers can see them."""
+        if self.ready:
+            self._pending.update(entry_ids)
+
+    def cancel_inserts(self, entry_ids: Iterable[int]) -> None:
+        """Forget registered ids whose commit failed."""
+        self._pending.difference_update(entry_ids)
+
+    def record_insert(self, entry_id: int, score: int) -> None:
+        """Count a committed entry registered with ``begin_inserts``.
+
+        Entries not registered (the index was not built yet) are left to the
+        build or a catch-up.
+        """
+        if entry_id not in self._pending:
+            return
+        self._pending.discard(entry_id)
+        self._histogram.add(score)
+        if entry_id > self._last_id:
+            self._seen.add(entry_id)
+            self._advance()
+
+    def record_delete(self, entry_id: int, score: int) -> None:
+        """Uncount an entry deleted by this process."""
+        if not self.ready:
+            return
+        if entry_id > self._last_id and entry_id not in self._seen:
+            # Inserted elsewhere and not synced yet; catch-up will never see it
+            self._seen.add(entry_id)
+            self._advance()
+            return
+        self._histogram.add(score, -1)
+
+    def rank(self, score: int) -> int:
+        """Rank a score would have: 1 + number of entries with a higher score."""
+        return self._histogram.count_above(score) + 1
+
+
+# Shared rank index for this process
+rank_index = RankIndex()
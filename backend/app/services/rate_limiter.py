@@ -0,0 +1,185 @@
+"""Token-bucket rate limiter for API clients."""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from app.config import (
+    RATE_LIMIT_READ_PER_SECOND,
+    RATE_LIMIT_READ_BURST,
+    RATE_LIMIT_WRITE_PER_SECOND,
+    RATE_LIMIT_WRITE_BURST,
+    RATE_LIMIT_IDLE_SECONDS,
+    RATE_LIMIT_SHARED_PATH,
+    RATE_LIMIT_SHARED_SLOTS,
+)
+
+# key hash, tokens, last update (epoch seconds)
+SLOT = struct.Struct("<Qdd")
+# Slots per lock stripe; a key can live in any slot of its group
+GROUP_SIZE = 8
+
+
+def _take(tokens: float, last: float, now: float, rate: float, burst: float) -> tuple:
+    """Refill a bucket up to ``now`` and try to take one token.
+
+    Returns:
+        (tokens left, seconds to wait; 0.0 if the token was taken)
+    """
+    tokens = min(burst, tokens + (now - last) * rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / rate
+
+
+class SharedBuckets:
+    """Fixed-size table of token buckets in a memory-mapped file.
+
+    Every worker of the host maps the same file, so a client's budget is
+    shared however its requests are spread over workers. Slots are grouped
+    in sets of ``GROUP_SIZE``; a key hashes to one group, and only that
+    group's byte range is locked (``lockf``) while its bucket is updated. A
+    full group reuses an idle slot, or failing that its least recently used
+    one, so the table never grows.
+    """
+
+    def __init__(self, path: str, slots: int, idle: float):
+        self.path = path
+        self.groups = max(1, slots // GROUP_SIZE)
+        self.size = self.groups * GROUP_SIZE * SLOT.size
+        self.idle = idle
+        self._pid = None
+        self._fd = None
+        self._mm = None
+
+    def _open(self) -> mmap.mmap:
+        """Map the table, reopening after a fork so locks are per process."""
+        if self._pid == os.getpid():
+            return self._mm
+        # Never through a symlink planted where the table is expected
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        if os.fstat(fd).st_size < self.size:
+            os.ftruncate(fd, self.size)
+        self._mm = mmap.mmap(fd, self.size)
+        # Kept open: closing any descriptor of the file drops this process's locks
+        self._fd = fd
+        self._pid = os.getpid()
+        return self._mm
+
+    def take(self, key: str, now: float, rate: float, burst: float) -> float:
+        """Take one token from ``key``'s bucket.
+
+        Args:
+            key: Bucket key
+            now: Current epoch seconds
+            rate: Tokens added per second
+            burst: Bucket capacity
+
+        Returns:
+            0.0 if allowed, otherwise seconds until a token is available
+        """
+        mm = self._open()
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        start = (key_hash % self.groups) * GROUP_SIZE * SLOT.size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, GROUP_SIZE * SLOT.size, start)
+        try:
+            slot = None
+            oldest = None
+            for offset in range(start, start + GROUP_SIZE * SLOT.size, SLOT.size):
+                stored_hash, tokens, last = SLOT.unpack_from(mm, offset)
+                if stored_hash == key_hash:
+                    slot = (offset, tokens, last)
+                    break
+                if stored_hash == 0 or now - last > self.idle:
+                    if slot is None:
+                        slot = (offset, burst, now)
+                elif oldest is None or last < oldest[2]:
+                    oldest = (offset, burst, now)
+            offset, tokens, last = slot or oldest
+            tokens, wait = _take(tokens, last, now, rate, burst)
+            SLOT.pack_into(mm, offset, key_hash, tokens, now)
+            return wait
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, GROUP_SIZE * SLOT.size, start)
+
+
+class RateLimiter:
+    """Token buckets with separate read and write budgets per client key.
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate`` per
+    second; a request takes one token. Per-worker buckets live in an
+    insertion-ordered dict refreshed on every use, so buckets idle for
+    ``idle`` seconds are evicted from its front in O(1) per request. A bucket
+    is full again long before it is evicted, so eviction never changes an
+    outcome. With ``shared``, buckets live in the host-wide table instead.
+    """
+
+    def __init__(
+        self,
+        read_rate: float = RATE_LIMIT_READ_PER_SECOND,
+        read_burst: float = RATE_LIMIT_READ_BURST,
+        write_rate: float = RATE_LIMIT_WRITE_PER_SECOND,
+        write_burst: float = RATE_LIMIT_WRITE_BURST,
+        idle: float = RATE_LIMIT_IDLE_SECONDS,
+        shared: Optional[SharedBuckets] = None
+    ):
+        self.read_rate = read_rate
+        self.read_burst = read_burst
+        self.write_rate = write_rate
+        self.write_burst = write_burst
+        self.idle = idle
+        self.shared = shared
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def acquire(self, key: str, write: bool) -> float:
+        """Take one request from the client's read or write budget.
+
+        Args:
+            key: Client key (API key client and IP address)
+            write: True for the write budget, False for the read budget
+
+        Returns:
+            0.0 if the request may proceed, otherwise seconds to wait
+        """
+        if write:
+            key, rate, burst = "w:" + key, self.write_rate, self.write_burst
+        else:
+            key, rate, burst = "r:" + key, self.read_rate, self.read_burst
+        now = time.time()
+        if self.shared is not None:
+            return self.shared.take(key, now, rate, burst)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            self._buckets.move_to_end(key)
+        bucket[0], wait = _take(bucket[0], bucket[1], now, rate, burst)
+        bucket[1] = now
+
+        # Least recently used first: stop at the first bucket still in use
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if now - oldest[1] <= self.idle:
+                break
+            self._buckets.popitem(last=False)
+        return wait
+
+    def active_clients(self) -> int:
+        """Number of per-worker buckets currently held (0 in shared mode)."""
+        return len(self._buckets)
+
+
+def _create_limiter() -> RateLimiter:
+    """Build the process-wide limiter, host-shared when a table path is configured."""
+    shared = None
+    if RATE_LIMIT_SHARED_PATH:
+        shared = SharedBuckets(RATE_LIMIT_SHARED_PATH, RATE_LIMIT_SHARED_SLOTS, RATE_LIMIT_IDLE_SECONDS)
+    return RateLimiter(shared=shared)
+
+
+# Shared limiter instance for this process
+rate_limiter = _create_limiter()
@@ -0,0 +1,118 @@
+"""Replay of a game's event log: recompute score and combo from shots and hits.
+
+The rules mirror ``frontend/components/ArcadeCanvas.tsx``: a made shot is
+worth 2 points, 1 more for a swish, plus ``combo - 1`` bonus points; the
+combo continues while consecutive scores are less than 2.5 s apart and
+restarts at 1 otherwise. Like the game screen, the reported max combo only
+counts streaks of at least 2.
+"""
+from operator import sub
+from typing import List, NamedTuple
+
+BASE_POINTS = 2
+SWISH_POINTS = 1
+# Scores closer together than this continue the combo
+COMBO_WINDOW_MS = 2500
+# A thrown ball is removed 4 s after its throw
+BALL_LIFETIME_MS = 4000
+# Plausibility bounds: physics advances per frame, so flights get shorter on
+# high refresh rate screens; these stay below a 240 Hz display
+MIN_FLIGHT_MS = 50
+MIN_SHOT_INTERVAL_MS = 50
+# Allowance for the client's clock running faster than the server's
+CLOCK_SLACK_MS = 2000
+
+
+class ReplayError(ValueError):
+    """The event log is inconsistent with the game rules."""
+
+
+class ReplayResult(NamedTuple):
+    """Outcome of a replayed game."""
+    score: int
+    max_combo: int
+    shots_taken: int
+    shots_made: int
+
+
+def replay(
+    shots: List[int],
+    hits: List[int],
+    hit_times: List[int],
+    swishes: List[bool],
+    elapsed_ms: int
+) -> ReplayResult:
+    """Validate an event log and recompute the game's score and max combo.
+
+    Every check is a whole-column pass (``map``/``min``/``max``/``sum`` over
+    the lists, running in C) rather than a Python loop per event; only the
+    combo streak boundaries are found with a comprehension.
+
+    Args:
+        shots: Throw times in ms since the game started, ascending
+        hits: Index in ``shots`` of each ball that scored, in scoring order
+        hit_times: Time of each score in ms since the game started
+        swishes: Whether each score was a swish
+        elapsed_ms: Time since the session was issued; no event can be later
+
+    Returns:
+        ReplayResult with the recomputed score and max combo
+
+    Raises:
+        ReplayError: If the log breaks the game rules
+    """
+    made = len(hits)
+    if len(hit_times) != made or len(swishes) != made:
+        raise ReplayError("hits, hitTimes and swishes must have the same length")
+    if made > len(shots):
+        raise ReplayError("More scores than shots")
+
+    if shots:
+        if shots[0] < 0:
+            raise ReplayError("Shot times must not be negative")
+        if max(shots[-1], max(hit_times, default=0)) > elapsed_ms + CLOCK_SLACK_MS:
+            raise ReplayError("Events are later than the session allows")
+        if len(shots) > 1 and min(map(sub, shots[1:], shots)) < MIN_SHOT_INTERVAL_MS:
+            raise ReplayError(f"Shots must be at least {MIN_SHOT_INTERVAL_MS} ms apart and in order")
+    if not made:
+        return ReplayResult(0, 0, len(shots), 0)
+
+    if min(hits) < 0 or max(hits) >= len(shots):
+        raise ReplayError("Score refers to a shot that was not taken")
+    if len(set(hits)) != made:
+        raise ReplayError("A ball can only score once")
+    flights = list(map(sub, hit_times, map(shots.__getitem__, hits)))
+    if min(flights) < MIN_FLIGHT_MS or max(flights) >= BALL_LIFETIME_MS:
+        raise ReplayError(f"Scores must happen {MIN_FLIGHT_MS}-{BALL_LIFETIME_MS} ms after their shot")
+
+    gaps = list(map(sub, hit_times[1:], hit_times))
+    if gaps and min(gaps) < 0:
+        raise ReplayError("Scores must be in time order")
+
+    # Streaks end where consecutive scores are too far apart; a streak of L
+    # scores earns bonuses 0 + 1 + ... + (L - 1)
+    breaks = [0, *(index for index, gap in enumerate(gaps, 1) if gap >= COMBO_WINDOW_MS), made]
+    streaks = list(map(sub, breaks[1:], breaks))
+    bonus = sum(length * (length - 1) // 2 for length in streaks)
+    longest = max(streaks)
+    score = BASE_POINTS * made + SWISH_POINTS * sum(swishes) + bonus
+    return ReplayResult(score, longest if longest > 1 else 0, len(shots), made)
+
+
+def replay_loop(shots: List[int], hits: List[int], hit_times: List[int], swishes: List[bool]) -> ReplayResult:
+    """Event-by-event replay, as the game computes it; reference for ``replay``.
+
+    Does not validate the log. Used by benchmarks/bench_replay.py to check
+    that both give the same result.
+    """
+    combo = 0
+    max_combo = 0
+    last = None
+    score = 0
+    for time, swish in zip(hit_times, swishes):
+        combo = combo + 1 if last is not None and time - last < COMBO_WINDOW_MS else 1
+        last = time
+        score += BASE_POINTS + (SWISH_POINTS if swish else 0) + max(0, combo - 1)
+        if combo > 1:
+            max_combo = max(max_combo, combo)
+    return ReplayResult(score, max_combo, len(shots), len(hit_times))
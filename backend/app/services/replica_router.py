@@ -0,0 +1,173 @@
+"""Routing of read-only queries to health-checked read replicas."""
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from app.config import DB_REPLICA_CHECK_SECONDS, DB_REPLICA_CHECK_TIMEOUT, DB_REPLICA_MAX_LAG_SECONDS
+from app.database import AsyncSessionLocal, replica_engines
+from app.utils.metrics import DB_READS
+
+logger = logging.getLogger(__name__)
+
+# Set for requests whose reads must see the primary (their own recent writes)
+primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+class ReplicaRouter:
+    """Hand out read sessions round robin over the healthy replicas.
+
+    A replica is taken out of rotation as soon as one of its queries fails
+    with a connection (operational) error, and by the periodic health check
+    when ``SELECT 1`` fails, times out or, with ``max_lag`` set, a MySQL
+    replica falls too far behind; the health check also puts it back. With
+    no healthy replica, or when the request asked for read-your-writes,
+    reads use the primary. Writes never go through the router.
+    """
+
+    def __init__(
+        self,
+        engines: List[AsyncEngine] = replica_engines,
+        check_interval: float = DB_REPLICA_CHECK_SECONDS,
+        check_timeout: float = DB_REPLICA_CHECK_TIMEOUT,
+        max_lag: float = DB_REPLICA_MAX_LAG_SECONDS
+    ):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_lag = max_lag
+        self.names = [f"replica{index}" for index in range(len(engines))]
+        self._sessions = [
+            async_sessionmaker(bind=replica, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for replica in engines
+        ]
+        self._healthy = [True] * len(engines)
+        self._errors: List[Optional[str]] = [None] * len(engines)
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+        for index, replica in enumerate(engines):
+            event.listen(replica.sync_engine, "handle_error", self._error_listener(index))
+
+    def _error_listener(self, index: int):
+        """Build the handle_error hook that marks replica ``index`` down."""
+        def on_error(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+                self._set_health(index, False, str(context.original_exception))
+        return on_error
+
+    def session(self) -> AsyncSession:
+        """Open a session for read-only queries.
+
+        Returns:
+            Session on the next healthy replica, or on the primary
+        """
+        count = len(self._sessions)
+        if count and not primary_reads.get():
+            for _ in range(count):
+                index = self._next
+                self._next = (index + 1) % count
+                if self._healthy[index]:
+                    DB_READS.labels(self.names[index]).inc()
+                    return self._sessions[index]()
+        DB_READS.labels("primary").inc()
+        return AsyncSessionLocal()
+
+    def _set_health(self, index: int, healthy: bool, error: Optional[str] = None) -> None:
+        """Record a replica's state, logging transitions."""
+        if healthy != self._healthy[index]:
+            url = self.engines[index].url.render_as_string()
+            if healthy:
+                logger.info(f"Read replica {self.names[index]} ({url}) is back in rotation")
+            else:
+                logger.warning(f"Read replica {self.names[index]} ({url}) taken out of rotation: {error}")
+        self._healthy[index] = healthy
+        self._errors[index] = error
+
+    async def _lag(self, conn) -> Optional[float]:
+        """Seconds a MySQL replica is behind its source (None if not replicating)."""
+        try:
+            result = await conn.exec_driver_sql("SHOW REPLICA STATUS")
+            column = "Seconds_Behind_Source"
+        except DBAPIError:
+            # MySQL before 8.0.22
+            await conn.rollback()
+            result = await conn.exec_driver_sql("SHOW SLAVE STATUS")
+            column = "Seconds_Behind_Master"
+        row = result.mappings().first()
+        if row is None or row[column] is None:
+            return None
+        return float(row[column])
+
+    async def _probe(self, replica: AsyncEngine) -> None:
+        """Run the health check queries on one replica.
+
+        Raises:
+            Exception: If the replica cannot serve reads
+        """
+        async with replica.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            if self.max_lag > 0 and conn.dialect.name == "mysql":
+                lag = await self._lag(conn)
+                if lag is None:
+                    raise Exception("replication is not running")
+                if lag > self.max_lag:
+                    raise Exception(f"{lag:.0f}s behind the primary")
+
+    async def check(self) -> List[bool]:
+        """Health check every replica once.
+
+        Returns:
+            Health of each replica after the check
+        """
+        async def _check(index: int) -> None:
+            try:
+                await asyncio.wait_for(self._probe(self.engines[index]), self.check_timeout)
+                self._set_health(index, True)
+            except asyncio.TimeoutError:
+                self._set_health(index, False, f"no answer within {self.check_timeout}s")
+            except Exception as e:
+                self._set_health(index, False, str(e))
+
+        await asyncio.gather(*(_check(index) for index in range(len(self.engines))))
+        return list(self._healthy)
+
+    async def _run(self) -> None:
+        """Health check the replicas every ``check_interval`` seconds."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    async def start(self) -> None:
+        """Check the replicas and start the periodic health check (no-op without replicas)."""
+        if not self.engines or self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the periodic health check."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Rotation state of each replica, for the health endpoint."""
+        return [
+            {
+                "replica": self.names[index],
+                "url": self.engines[index].url.render_as_string(),
+                "healthy": self._healthy[index],
+                "lastError": self._errors[index],
+            }
+            for index in range(len(self.engines))
+        ]
+
+
+# Shared replica router instance for this process
+replica_router = ReplicaRouter()
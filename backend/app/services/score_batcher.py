@@ -0,0 +1,100 @@
+"""Write-coalescing queue for leaderboard score submissions."""
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from app.config import SCORE_BATCH_MAX_SIZE, SCORE_BATCH_MAX_DELAY_MS
+from app.services.database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreBatcher:
+    """Buffer concurrent score submissions and write them in grouped commits.
+
+    Each submission waits at most ``max_delay`` seconds (or until
+    ``max_size`` rows are buffered) and is then written together with the
+    others in one multi-row INSERT. Every caller still receives the id of
+    its own row, or the exception raised for the batch.
+    """
+
+    def __init__(self, max_size: int = SCORE_BATCH_MAX_SIZE, max_delay: float = SCORE_BATCH_MAX_DELAY_MS / 1000):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, entry: Dict[str, Any]) -> str:
+        """Queue an entry for the next grouped commit.
+
+        Args:
+            entry: Dictionary containing name, score, maxCombo, timestamp
+
+        Returns:
+            ID of the created entry
+        """
+        if self._closing:
+            return await DatabaseService.add_leaderboard_entry(entry)
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((entry, future))
+        self._wakeup.set()
+        return await future
+
+    async def _run(self) -> None:
+        """Flush loop: wait for the first row, give others time to join, write."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                if self._closing:
+                    return
+                continue
+
+            if len(self._pending) < self.max_size and not self._closing:
+                await asyncio.sleep(self.max_delay)
+
+            while self._pending:
+                batch = self._pending[:self.max_size]
+                del self._pending[:self.max_size]
+                await self._flush(batch)
+
+            if self._closing:
+                return
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Write one batch and resolve its callers' futures."""
+        try:
+            ids = await DatabaseService.add_leaderboard_entries([entry for entry, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for entry_id, (_, future) in zip(ids, batch):
+            if not future.done():
+                future.set_result(entry_id)
+
+    async def close(self) -> None:
+        """Stop accepting rows and flush everything still buffered."""
+        self._closing = True
+        if self._task is None:
+            return
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        logger.info(f"Score batcher flushed {self.rows} rows in {self.batches} batches")
+
+
+# Shared batcher instance for this process
+score_batcher = ScoreBatcher()
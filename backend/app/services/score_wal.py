@@ -0,0 +1,617 @@
+"""Write-ahead log of score submissions, drained into the leaderboard table."""
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import socket
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import orjson
+from app.config import (
+    SCORE_WAL_DIR,
+    SCORE_WAL_SEGMENT_BYTES,
+    SCORE_WAL_SYNC_DELAY_MS,
+    SCORE_WAL_DRAIN_BATCH,
+    SCORE_WAL_ADOPT_SECONDS,
+    SCORE_WAL_RETRY_MAX_SECONDS,
+    SCORE_WAL_QUARANTINE_ATTEMPTS,
+)
+from app.services.database_service import DatabaseService
+from app.services.leaderboard_broadcaster import leaderboard_broadcaster
+from app.utils.metrics import WAL_APPEND_LATENCY, WAL_BACKLOG, WAL_RECORDS
+
+logger = logging.getLogger(__name__)
+
+# Segment file header: magic, format version, padding to 16 bytes
+FILE_HEADER = struct.Struct("<4sI8x")
+MAGIC = b"SWL1"
+FORMAT_VERSION = 1
+# Record header: payload length, CRC-32 of the payload. Segments are
+# preallocated with zeros, so a zero length marks the end of the records
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".wal"
+# Records the database keeps rejecting, one JSON object per line
+DEAD_LETTER_SUFFIX = ".dead"
+# Window of the drain rate reported by stats()
+RATE_WINDOW_SECONDS = 60
+# Fill level of the active segment at which the next one is created
+SPARE_SEGMENT_FILL = 0.75
+
+
+class WalSyncError(Exception):
+    """A record was written to the log but the sync covering it failed.
+
+    The record stays in its segment and is drained once a later sync
+    succeeds, so the score must not be stored any other way.
+    """
+
+
+class WalSegment:
+    """One memory-mapped segment file and its write, sync and drain positions.
+
+    The file descriptor holds an exclusive ``flock`` for as long as a worker
+    owns the segment, which is how other workers tell a live segment from
+    one left behind by a worker that exited.
+    """
+
+    def __init__(self, path: str, mm: mmap.mmap, fd: int, end: int, drained: int, pending: int):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.mm = mm
+        self.fd = fd
+        self.end = end  # offset after the last record written
+        self.synced = end  # records before this offset are on disk
+        self.drained = drained  # offset of the first record not yet in the database
+        self.checkpointed = False  # whether the database has a checkpoint for it
+        self.pending = pending  # records between drained and end
+        self.sealed = False  # full, or adopted: no more appends
+        self.suspect_until = 0  # drain one record at a time up to this offset
+        self.failures = 0  # consecutive rejections of the record at drained
+
+    def close(self) -> None:
+        """Unmap the file and release its lock."""
+        self.mm.close()
+        os.close(self.fd)
+
+
+class ScoreWal:
+    """Append-only, fsync-batched log of score submissions.
+
+    ``append`` writes the entry into the worker's current memory-mapped
+    segment and returns once an ``msync`` covering it completed; appends
+    made while a sync runs share the next one (group commit), so the cost
+    of a sync is spread over every concurrent submission. Segments are
+    preallocated so writes through the map never fault on a full disk; the
+    next one is created in a thread once the active one is
+    ``SPARE_SEGMENT_FILL`` full, so a rollover does not block the loop.
+
+    A drainer task inserts the records into the leaderboard table in bulk,
+    advancing a per-segment checkpoint in the same transaction
+    (``DatabaseService.add_wal_entries``), so each record is inserted exactly
+    once. Failed drains are retried with backoff while appends carry on.
+    Segments of workers that exited are adopted and drained by the others;
+    drained segments are deleted.
+
+    Segments are drained independently, so a batch the database rejects
+    only holds up its own segment. While the database still answers, the
+    batch is retried one record at a time, and a record rejected
+    ``quarantine_attempts`` times is moved to a dead-letter file next to
+    the segment.
+    """
+
+    def __init__(
+        self,
+        directory: str = SCORE_WAL_DIR,
+        segment_bytes: int = SCORE_WAL_SEGMENT_BYTES,
+        sync_delay: float = SCORE_WAL_SYNC_DELAY_MS / 1000,
+        batch_size: int = SCORE_WAL_DRAIN_BATCH,
+        adopt_interval: float = SCORE_WAL_ADOPT_SECONDS,
+        retry_max: float = SCORE_WAL_RETRY_MAX_SECONDS,
+        quarantine_attempts: int = SCORE_WAL_QUARANTINE_ATTEMPTS
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sync_delay = sync_delay
+        self.batch_size = batch_size
+        self.adopt_interval = adopt_interval
+        self.retry_max = retry_max
+        self.quarantine_attempts = quarantine_attempts
+        self._pid = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._segments: List[WalSegment] = []
+        self._active: Optional[WalSegment] = None
+        self._spare: Optional[WalSegment] = None
+        self._spare_task: Optional[asyncio.Task] = None
+        self._sequence = 0
+        self._sync_future: Optional[asyncio.Future] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_tasks = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rate: Deque[Tuple[float, int]] = deque()
+        self.appended = 0
+        self.drained = 0
+        self.drain_errors = 0
+        self.quarantined = 0
+        self.last_error: Optional[str] = None
+
+    def _open(self) -> None:
+        """Set up this process's state (again after a fork)."""
+        if self._pid == os.getpid():
+            return
+        self._reset()
+        os.makedirs(self.directory, exist_ok=True)
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._pid = os.getpid()
+
+    def _fsync_directory(self) -> None:
+        """Make a created or deleted segment file name durable."""
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _create_segment(self) -> WalSegment:
+        """Create, preallocate, lock and map a new segment for this worker (runs in a thread)."""
+        self._sequence += 1
+        host = socket.gethostname()[:40]
+        name = f"{host}-{os.getpid()}-{int(time.time() * 1000)}-{self._sequence}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if hasattr(os, "posix_fallocate"):
+                # Reserve the blocks: a write through the map to a sparse
+                # file on a full disk would kill the worker with SIGBUS
+                os.posix_fallocate(fd, 0, self.segment_bytes)
+            else:
+                os.ftruncate(fd, self.segment_bytes)
+            mm = mmap.mmap(fd, self.segment_bytes)
+            FILE_HEADER.pack_into(mm, 0, MAGIC, FORMAT_VERSION)
+            os.fsync(fd)
+            self._fsync_directory()
+        except Exception:
+            os.close(fd)
+            os.unlink(path)
+            raise
+        return WalSegment(path, mm, fd, FILE_HEADER.size, FILE_HEADER.size, 0)
+
+    def _start_spare(self) -> asyncio.Task:
+        """Start creating the next segment unless that is already under way."""
+        if self._spare_task is None:
+            self._spare_task = asyncio.get_running_loop().create_task(self._create_spare())
+            # Failures are reported to the appends waiting for the segment
+            self._spare_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._spare_task
+
+    async def _create_spare(self) -> None:
+        try:
+            segment = await asyncio.to_thread(self._create_segment)
+        finally:
+            self._spare_task = None
+        self._segments.append(segment)
+        self._spare = segment
+
+    async def _reserve(self, size: int) -> None:
+        """Make the active segment one with room for a record of ``size`` bytes."""
+        if FILE_HEADER.size + size > self.segment_bytes:
+            raise ValueError(f"Record of {size} bytes does not fit in a segment")
+        while self._active is None or self._active.end + size > self.segment_bytes:
+            if self._spare is None:
+                await asyncio.shield(self._start_spare())
+                continue
+            if self._active is not None:
+                self._active.sealed = True
+            self._active, self._spare = self._spare, None
+
+    def _write(self, payload: bytes) -> None:
+        """Copy one record into the active segment (``_reserve`` made room for it)."""
+        size = RECORD_HEADER.size + len(payload)
+        segment = self._active
+        position = segment.end
+        segment.mm[position + RECORD_HEADER.size:position + size] = payload
+        RECORD_HEADER.pack_into(segment.mm, position, len(payload), zlib.crc32(payload))
+        segment.end = position + size
+        segment.pending += 1
+        if self._spare is None and segment.end >= self.segment_bytes * SPARE_SEGMENT_FILL:
+            self._start_spare()
+
+    async def append(self, entry: Dict[str, Any]) -> None:
+        """Durably log a score submission.
+
+        Args:
+            entry: Dictionary containing name, score, maxCombo, timestamp
+
+        Raises:
+            WalSyncError: If the record was written but not synced; it is
+                still inserted once a later sync succeeds
+            Exception: If the record could not be written (it is not logged)
+        """
+        start = time.perf_counter()
+        self._open()
+        payload = orjson.dumps(entry)
+        await self._reserve(RECORD_HEADER.size + len(payload))
+        self._write(payload)
+        self.appended += 1
+        WAL_RECORDS.labels("appended").inc()
+        WAL_BACKLOG.inc()
+        try:
+            await self._sync()
+        except Exception as e:
+            raise WalSyncError(f"Score WAL sync failed: {str(e)}") from e
+        WAL_APPEND_LATENCY.observe(time.perf_counter() - start)
+        self._wakeup.set()
+
+    async def _sync(self) -> None:
+        """Wait for a sync that covers every record written so far."""
+        if self._sync_future is None:
+            self._sync_future = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        await asyncio.shield(self._sync_future)
+
+    async def _flush(self) -> None:
+        """Sync the records written since the last sync and wake their writers.
+
+        Syncs run one at a time; the future is detached when the sync starts,
+        so records written while it runs wait for the next one.
+        """
+        if self.sync_delay > 0:
+            await asyncio.sleep(self.sync_delay)
+        async with self._flush_lock:
+            future, self._sync_future = self._sync_future, None
+            dirty = [(segment, segment.synced, segment.end) for segment in self._segments if segment.end > segment.synced]
+            try:
+                await asyncio.to_thread(self._msync, [(segment.mm, start, end) for segment, start, end in dirty])
+            except Exception as e:
+                future.set_exception(e)
+                return
+            for segment, _, end in dirty:
+                segment.synced = max(segment.synced, end)
+            future.set_result(None)
+
+    @staticmethod
+    def _msync(ranges: List[Tuple[mmap.mmap, int, int]]) -> None:
+        """Flush byte ranges of mapped segments to disk (runs in a thread)."""
+        for mm, start, end in ranges:
+            start -= start % mmap.ALLOCATIONGRANULARITY
+            mm.flush(start, end - start)
+
+    @staticmethod
+    def _records(mm: mmap.mmap, start: int, limit: int) -> Iterator[Tuple[bytes, int]]:
+        """Yield each intact record between two offsets with the offset after it."""
+        position = start
+        while position + RECORD_HEADER.size <= limit:
+            length, crc = RECORD_HEADER.unpack_from(mm, position)
+            end = position + RECORD_HEADER.size + length
+            if length == 0 or end > limit:
+                return
+            payload = mm[position + RECORD_HEADER.size:end]
+            if zlib.crc32(payload) != crc:
+                # A write cut short by a crash; nothing after it was acknowledged
+                return
+            yield payload, end
+            position = end
+
+    async def _adopt(self) -> None:
+        """Take over the segments of workers that exited (their lock is free)."""
+        owned = {segment.name for segment in self._segments}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(SEGMENT_SUFFIX) or name in owned:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                size = os.fstat(fd).st_size
+                # Deleted by its drainer between listdir and flock
+                if os.fstat(fd).st_nlink == 0 or size < FILE_HEADER.size:
+                    os.close(fd)
+                    continue
+                mm = mmap.mmap(fd, size)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            except Exception:
+                os.close(fd)
+                raise
+            if FILE_HEADER.unpack_from(mm, 0) != (MAGIC, FORMAT_VERSION):
+                logger.error(f"Ignoring {path}: not a score WAL segment")
+                mm.close()
+                os.close(fd)
+                continue
+            try:
+                checkpoint = await DatabaseService.get_wal_checkpoint(name)
+            except Exception:
+                mm.close()
+                os.close(fd)
+                raise
+
+            drained = checkpoint if checkpoint is not None else FILE_HEADER.size
+            pending = 0
+            end = drained
+            for _, end in self._records(mm, drained, size):
+                pending += 1
+            segment = WalSegment(path, mm, fd, end, drained, pending)
+            segment.checkpointed = checkpoint is not None
+            segment.sealed = True
+            self._segments.append(segment)
+            WAL_BACKLOG.inc(pending)
+            logger.info(f"Adopted score WAL segment {name} with {pending} undrained scores")
+
+    async def drain(self) -> int:
+        """Insert up to one batch of synced records from every segment.
+
+        Returns:
+            Number of scores inserted into the leaderboard table
+
+        Raises:
+            Exception: If a segment's batch failed and no segment made
+                progress (the records stay in the log)
+        """
+        inserted = 0
+        error = None
+        for segment in list(self._segments):
+            try:
+                inserted += await self._drain_segment(segment)
+            except Exception as e:
+                error = e
+                continue
+            if segment.sealed and segment.drained >= segment.end:
+                await self._remove(segment)
+
+        if inserted:
+            self.drained += inserted
+            self._rate.append((time.monotonic(), inserted))
+            WAL_RECORDS.labels("drained").inc(inserted)
+            leaderboard_broadcaster.notify()
+        elif error is not None:
+            raise error
+        return inserted
+
+    async def _drain_segment(self, segment: WalSegment) -> int:
+        """Insert the next batch of one segment's synced records.
+
+        Returns:
+            Number of scores inserted
+
+        Raises:
+            Exception: If the batch failed and was not quarantined
+        """
+        if segment.drained >= segment.synced:
+            return 0
+        limit = 1 if segment.drained < segment.suspect_until else self.batch_size
+        payloads = []
+        end = segment.drained
+        for payload, end in self._records(segment.mm, segment.drained, segment.synced):
+            payloads.append(payload)
+            if len(payloads) >= limit:
+                break
+        if not payloads:
+            return 0
+
+        start = segment.drained if segment.checkpointed else None
+        if start is None and os.fstat(segment.fd).st_nlink == 0:
+            await self._resume(segment)
+            return 0
+        try:
+            ids = await DatabaseService.add_wal_entries(
+                segment.name, start, end, [orjson.loads(payload) for payload in payloads]
+            )
+        except Exception as e:
+            self.drain_errors += 1
+            self.last_error = str(e)
+            if not await self._rejected(segment, start, end, payloads, e):
+                raise
+            return 0
+
+        segment.failures = 0
+        if ids is None:
+            await self._resume(segment)
+            return 0
+        self._advance(segment, end, segment.pending - len(payloads))
+        return len(ids)
+
+    async def _resume(self, segment: WalSegment) -> None:
+        """Continue from the database's checkpoint (the range was drained elsewhere)."""
+        checkpoint = await DatabaseService.get_wal_checkpoint(segment.name)
+        if checkpoint is None and os.fstat(segment.fd).st_nlink == 0:
+            # The other worker drained it to the end and removed it
+            segment.sealed = True
+            self._advance(segment, segment.end, 0)
+            return
+        drained = checkpoint if checkpoint is not None else FILE_HEADER.size
+        self._advance(segment, drained, sum(1 for _ in self._records(segment.mm, drained, segment.end)))
+        segment.checkpointed = checkpoint is not None
+
+    async def _rejected(
+        self,
+        segment: WalSegment,
+        start: Optional[int],
+        end: int,
+        payloads: List[bytes],
+        error: Exception
+    ) -> bool:
+        """Handle a failed batch; quarantine its record once it is clearly the record's fault.
+
+        A failure only counts against the records if the database answers a
+        read right after it; otherwise it is an outage and the batch is
+        simply retried. A rejected batch is retried one record at a time so
+        the records before the bad one still go in.
+
+        Returns:
+            True if the record was moved to the dead-letter file
+        """
+        try:
+            await DatabaseService.get_wal_checkpoint(segment.name)
+        except Exception:
+            return False
+        if len(payloads) > 1:
+            segment.suspect_until = end
+            return False
+        segment.failures += 1
+        if segment.failures < self.quarantine_attempts:
+            return False
+
+        path = segment.path[:-len(SEGMENT_SUFFIX)] + DEAD_LETTER_SUFFIX
+        line = orjson.dumps(
+            {"segment": segment.name, "offset": segment.drained, "error": str(error), "record": payloads[0].decode(errors="replace")},
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        await asyncio.to_thread(self._append_durably, path, line)
+        segment.failures = 0
+        logger.error(
+            f"Moved a score rejected {self.quarantine_attempts} times from {segment.name} "
+            f"(offset {segment.drained}) to {os.path.basename(path)}: {str(error)}"
+        )
+        if await DatabaseService.add_wal_entries(segment.name, start, end, []) is None:
+            await self._resume(segment)
+        else:
+            self._advance(segment, end, segment.pending - 1)
+        self.quarantined += 1
+        return True
+
+    def _append_durably(self, path: str, data: bytes) -> None:
+        """Append to a file, fsync it and its directory entry (runs in a thread)."""
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._fsync_directory()
+
+    def _advance(self, segment: WalSegment, drained: int, pending: int) -> None:
+        """Move a segment's drain position and its count of records still to insert."""
+        WAL_BACKLOG.dec(segment.pending - pending)
+        segment.pending = pending
+        segment.drained = drained
+        segment.checkpointed = True
+
+    async def _remove(self, segment: WalSegment) -> None:
+        """Delete a fully drained, sealed segment."""
+        self._segments.remove(segment)
+        # Unlinked while still locked, so a worker about to adopt it sees it gone
+        try:
+            os.unlink(segment.path)
+        except FileNotFoundError:
+            pass  # Also drained (and removed) by another worker
+        self._fsync_directory()
+        segment.close()
+        try:
+            await DatabaseService.delete_wal_checkpoint(segment.name)
+        except Exception as e:
+            logger.warning(f"Could not delete the checkpoint of score WAL segment {segment.name}: {str(e)}")
+
+    async def _run(self) -> None:
+        """Drain continuously, backing off while the database fails."""
+        failures = 0
+        next_adopt = 0.0
+        while True:
+            self._wakeup.clear()
+            try:
+                if time.monotonic() >= next_adopt:
+                    next_adopt = time.monotonic() + self.adopt_interval
+                    await self._adopt()
+                inserted = await self.drain()
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                if failures == 1:
+                    logger.warning(f"Score WAL drain failing, {self.backlog()} scores waiting: {str(e)}")
+                await asyncio.sleep(min(self.retry_max, 0.05 * 2 ** failures))
+                continue
+
+            if failures:
+                logger.info(f"Score WAL drain recovered after {failures} failed attempts")
+                failures = 0
+            if inserted:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_adopt - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start the drainer (it first adopts segments left by exited workers)."""
+        self._open()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Stop the drainer, drain what the database takes within ``timeout``, release the segments.
+
+        Records left over stay on disk and are adopted by the next worker.
+        """
+        if self._pid != os.getpid():
+            return
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._spare_task is not None:
+            try:
+                await self._spare_task
+            except Exception:
+                pass
+
+        async def drain_all():
+            async with self._flush_lock:
+                pass
+            for segment in self._segments:
+                segment.sealed = True
+            while await self.drain():
+                pass
+
+        try:
+            await asyncio.wait_for(drain_all(), timeout)
+        except Exception as e:
+            logger.warning(f"{self.backlog()} scores left in the WAL for the next worker to drain: {str(e) or type(e).__name__}")
+
+        for segment in self._segments:
+            WAL_BACKLOG.dec(segment.pending)
+            segment.close()
+        self._pid = None
+        self._reset()
+
+    def backlog(self) -> int:
+        """Number of logged scores not yet in the leaderboard table."""
+        return sum(segment.pending for segment in self._segments)
+
+    def stats(self) -> Dict[str, Any]:
+        """Backlog, throughput and drain state of this worker's log."""
+        now = time.monotonic()
+        while self._rate and self._rate[0][0] < now - RATE_WINDOW_SECONDS:
+            self._rate.popleft()
+        return {
+            "pid": os.getpid(),
+            "directory": os.path.abspath(self.directory),
+            "segments": len(self._segments),
+            "backlogRecords": self.backlog(),
+            "backlogBytes": sum(segment.end - segment.drained for segment in self._segments),
+            "appended": self.appended,
+            "drained": self.drained,
+            "drainRate": round(sum(count for _, count in self._rate) / RATE_WINDOW_SECONDS, 2),
+            "drainErrors": self.drain_errors,
+            "quarantined": self.quarantined,
+            "lastError": self.last_error,
+        }
+
+
+# Shared write-ahead log instance for this process
+score_wal = ScoreWal()
@@ -0,0 +1,149 @@
+"""Memory-mapped leaderboard snapshot shared by the worker processes of one host."""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# magic, version, generation, loaded_at (epoch seconds), payload length
+HEADER = struct.Struct("<4sQQdI")
+MAGIC = b"LBS1"
+VERSION_OFFSET = 4
+READ_RETRIES = 3
+
+
+@dataclass
+class Snapshot:
+    """Decoded contents of the shared snapshot file."""
+    version: int
+    generation: int
+    loaded_at: float
+    entries: Optional[List[Dict[str, Any]]]
+    bucket: Optional[int] = None
+
+
+class SharedSnapshot:
+    """Top-N leaderboard snapshot stored in a memory-mapped file.
+
+    Readers never lock: the version counter works as a seqlock (odd while a
+    write is in progress), so checking for changes is a single header read.
+    Writers serialize on an exclusive ``flock`` held only while copying the
+    payload. A separate refresh lock elects the one worker that reloads the
+    snapshot from the database when it expires.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        self._pid = None
+        self._mm = None
+        self._lock_fd = None
+        self._refresh_fd = None
+
+    def _open(self) -> mmap.mmap:
+        """Map the snapshot file, reopening after a fork so locks are per process."""
+        if self._pid == os.getpid():
+            return self._mm
+
+        # Never through a symlink planted where the snapshot is expected
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            if os.fstat(fd).st_size < self.capacity:
+                os.ftruncate(fd, self.capacity)
+            self._mm = mmap.mmap(fd, self.capacity)
+        finally:
+            os.close(fd)
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        self._refresh_fd = os.open(self.path + ".refresh", os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        self._pid = os.getpid()
+        return self._mm
+
+    def version(self) -> int:
+        """Get the current snapshot version without decoding the payload."""
+        mm = self._open()
+        if mm[:4] != MAGIC:
+            return 0
+        return struct.unpack_from("<Q", mm, VERSION_OFFSET)[0]
+
+    def read(self) -> Optional[Snapshot]:
+        """Read a consistent copy of the snapshot.
+
+        Returns:
+            Decoded snapshot, or None if the file is empty or a writer kept
+            it busy for every retry
+        """
+        mm = self._open()
+        for _ in range(READ_RETRIES):
+            magic, version, generation, loaded_at, length = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                return None
+            if version % 2:
+                continue
+            payload = mm[HEADER.size:HEADER.size + length]
+            if struct.unpack_from("<Q", mm, VERSION_OFFSET)[0] != version:
+                continue
+            data = json.loads(payload)
+            return Snapshot(version, generation, loaded_at, data["entries"], data.get("bucket"))
+        return None
+
+    def write(
+        self,
+        entries: Optional[List[Dict[str, Any]]],
+        generation: int,
+        loaded_at: float,
+        bucket: Optional[int] = None
+    ) -> int:
+        """Replace the snapshot. Must be called while holding ``lock()``.
+
+        Args:
+            entries: Top-N entries, or None to mark the snapshot invalid
+            generation: Invalidation generation the entries belong to
+            loaded_at: Epoch seconds when the entries were read from the database
+            bucket: Start of the time window the entries cover, if windowed
+
+        Returns:
+            New snapshot version (an oversized payload is stored as invalid)
+        """
+        mm = self._open()
+        payload = json.dumps({"entries": entries, "bucket": bucket}, separators=(",", ":")).encode()
+        if HEADER.size + len(payload) > self.capacity:
+            logger.warning(
+                f"Leaderboard snapshot of {len(payload)} bytes exceeds LEADERBOARD_SNAPSHOT_SIZE"
+            )
+            payload = b'{"entries":null}'
+
+        version = self.version()
+        version += 1 if version % 2 == 0 else 2
+        struct.pack_into("<Q", mm, VERSION_OFFSET, version)
+        mm[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(mm, 0, MAGIC, version + 1, generation, loaded_at, len(payload))
+        return version + 1
+
+    @contextmanager
+    def lock(self):
+        """Hold the exclusive write lock for a read-modify-write of the snapshot."""
+        self._open()
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def try_acquire_refresh(self) -> bool:
+        """Try to become the worker that reloads the snapshot from the database."""
+        self._open()
+        try:
+            fcntl.flock(self._refresh_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def release_refresh(self) -> None:
+        """Release the refresh lock taken by try_acquire_refresh."""
+        fcntl.flock(self._refresh_fd, fcntl.LOCK_UN)
@@ -1,5 +1,5 @@
 """Authentication dependency for protecting API endpoints."""
-from fastapi import Depends, HTTPException, status, Security
+from fastapi import Depends, HTTPException, Query, status, Security
 from fastapi.security import APIKeyHeader
 from app.services.auth_service import AuthService
 import logging
@@ -9,6 +9,7 @@ logger = logging.getLogger(__name__)
 # Use APIKeyHeader with name "token" for authentication
 # This will show up in Swagger UI as a parameter
 from app.config import API_TOKEN
+from typing import Optional
 
 api_key_header = APIKeyHeader(
     name="token",
@@ -38,8 +39,8 @@ async def verify_token(
             detail="Missing token. Please provide 'token' header with API token",
         )
     
+    # Rejected tokens are counted by the key store, which logs the count periodically
     if not AuthService.verify_token(token):
-        logger.warning(f"Invalid token provided: {token[:10]}...")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
@@ -47,3 +48,21 @@ async def verify_token(
     
     return token
 
+
+async def verify_token_or_query(
+    token: str = Security(api_key_header),
+    token_query: Optional[str] = Query(None, alias="token", description="API token, for EventSource clients that cannot send headers")
+) -> str:
+    """Dependency to verify an API token sent as header or query parameter.
+    
+    Args:
+        token: API token from "token" header
+        token_query: API token from the "token" query parameter
+        
+    Returns:
+        The verified token
+        
+    Raises:
+        HTTPException: If token is invalid or missing
+    """
+    return await verify_token(token or token_query)
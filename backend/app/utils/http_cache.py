@@ -0,0 +1,48 @@
+"""HTTP conditional request and caching headers."""
+from typing import Dict, Optional
+from app.config import LEADERBOARD_HTTP_MAX_AGE
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match: Header value: "*" or a comma-separated list of entity tags
+        etag: Current strong ETag, including quotes
+
+    Returns:
+        True if the client's cached copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def leaderboard_cache_headers(etag: Optional[str] = None) -> Dict[str, str]:
+    """Caching headers for leaderboard reads.
+
+    Responses vary by the token header so a shared cache never answers an
+    unauthenticated request with a stored body.
+
+    Args:
+        etag: ETag of the response, if known
+
+    Returns:
+        Header dictionary
+    """
+    if LEADERBOARD_HTTP_MAX_AGE > 0:
+        cache_control = f"public, max-age={LEADERBOARD_HTTP_MAX_AGE}"
+    else:
+        cache_control = "no-cache"
+    headers = {"Cache-Control": cache_control, "Vary": "token"}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
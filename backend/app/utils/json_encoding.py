@@ -0,0 +1,20 @@
+"""Direct JSON encoding for read endpoints that skip response-model validation."""
+from typing import List, Dict, Any, Optional
+import orjson
+
+
+def encode_leaderboard(entries: List[Dict[str, Any]], next_cursor: Optional[str]) -> bytes:
+    """Encode a leaderboard page exactly as FastAPI renders LeaderboardResponse.
+
+    The entry dicts must already carry the LeaderboardEntry fields in model
+    order (name, score, maxCombo, timestamp, id), as DatabaseService builds
+    them; they are written out as-is without building pydantic models.
+
+    Args:
+        entries: Leaderboard entries from DatabaseService
+        next_cursor: Cursor of the next page, or None
+
+    Returns:
+        UTF-8 JSON body
+    """
+    return orjson.dumps({"entries": entries, "total": len(entries), "nextCursor": next_cursor})
@@ -0,0 +1,147 @@
+"""Application logging: JSON lines written by a background thread.
+
+``configure_logging`` puts a queue handler on the root logger. A log call
+only renders the message and hands the record to a bounded queue; a
+writer thread formats and writes it. When the writer falls behind (a slow
+disk or a blocked pipe) records are dropped and counted in
+``log_records_dropped_total`` instead of stalling the event loop.
+"""
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Optional
+import orjson
+from app.config import LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_QUEUE_SIZE
+from app.utils.metrics import LOG_RECORDS_DROPPED
+from app.utils.tracing import current_request_id
+
+# Attributes every LogRecord has; any other attribute came from ``extra=``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one line of JSON.
+
+    Keys: time (UTC, ISO 8601), level, logger, pid, message, requestId when
+    logged during a request, the ``extra=`` fields and the exception
+    traceback, if any.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                fields[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields["exception"] = record.exc_text
+        if record.stack_info:
+            fields["stack"] = record.stack_info
+        return orjson.dumps(fields, default=str).decode()
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full.
+
+    The message is rendered and the traceback formatted in the calling
+    thread (their arguments may change afterwards), and the current request
+    id is attached; the rest of the formatting happens in the writer thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "requestId"):
+            record.requestId = current_request_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class LogQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop waits for room in a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+# The root logger's queue handler and the writer thread of this process
+_handler: Optional[LogQueueHandler] = None
+_listener: Optional[LogQueueListener] = None
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    format: str = LOG_FORMAT,
+    path: str = LOG_FILE,
+    queue_size: int = LOG_QUEUE_SIZE,
+) -> None:
+    """Send the root logger's records through a queue to a writer thread.
+
+    Does nothing if already configured in this process. The writer is
+    restarted in forked children (gunicorn workers of a preloaded app) and
+    drained at exit.
+
+    Args:
+        level: Root log level
+        format: "json" or "text"
+        path: File to append to (empty: stderr)
+        queue_size: Records the writer may fall behind before dropping
+    """
+    global _handler
+    if _handler is not None:
+        return
+    output = logging.FileHandler(path) if path else logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if format == "json" else logging.Formatter(logging.BASIC_FORMAT))
+    _handler = LogQueueHandler(queue.Queue(queue_size))
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level)
+    _start_listener(output)
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _start_listener(output: logging.Handler) -> None:
+    global _listener
+    _listener = LogQueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def _restart_after_fork() -> None:
+    # The writer thread does not survive a fork, and records still queued
+    # belong to the parent (which writes them itself)
+    if _listener is None:
+        return
+    _handler.queue = queue.Queue(_handler.queue.maxsize)
+    _start_listener(*_listener.handlers)
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
@@ -0,0 +1,262 @@
+"""Prometheus metrics: per-route request latency and a per-layer time breakdown.
+
+With PROMETHEUS_MULTIPROC_DIR set (gunicorn_config.py does), every worker
+writes its samples to memory-mapped files in that directory and
+``render_metrics`` aggregates all of them, so any worker can answer a scrape.
+"""
+import asyncio
+import functools
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import API_PREFIX
+from app.utils.tracing import span
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STARTUP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Statement types reported separately; anything else is counted as OTHER
+DB_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests handled, by route template and status code",
+    ["method", "route", "status"],
+)
+LAYER_LATENCY = Histogram(
+    "app_layer_duration_seconds",
+    "Time spent per layer: auth (token check), controller (endpoint function, "
+    "including its DB queries) and serialization (request parsing, "
+    "dependencies and response validation/rendering)",
+    ["layer"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time per database statement; _count is the number of queries",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time a request waited for a connection from the primary's pool, by "
+    "result (acquired or timeout)",
+    ["result"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections of the primary's pool checked out by requests, summed over live workers",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond DB_POOL_SIZE, summed over live workers",
+    multiprocess_mode="livesum",
+)
+DB_READS = Counter(
+    "db_read_sessions_total",
+    "Read-only sessions opened, by target (primary or replicaN)",
+    ["target"],
+)
+ERRORS = Counter(
+    "app_errors_total",
+    "Exceptions raised while handling a request, by root exception type",
+    ["route", "exception"],
+)
+STARTUP_LATENCY = Histogram(
+    "app_startup_duration_seconds",
+    "Worker startup time per lifespan phase; phase=ready is worker start to "
+    "startup complete, phase=first_request worker start to its first response",
+    ["phase"],
+    buckets=STARTUP_BUCKETS,
+)
+RATE_LIMITED = Counter(
+    "http_rate_limited_total",
+    "Requests rejected with 429 before reaching a route, by budget",
+    ["kind"],
+)
+WAL_APPEND_LATENCY = Histogram(
+    "score_wal_append_duration_seconds",
+    "Time to append a score to the write-ahead log, including the wait for its fsync",
+    buckets=LATENCY_BUCKETS,
+)
+WAL_RECORDS = Counter(
+    "score_wal_records_total",
+    "Scores appended to or drained from the write-ahead log; the drain rate "
+    "is rate(score_wal_records_total{event=\"drained\"})",
+    ["event"],
+)
+WAL_BACKLOG = Gauge(
+    "score_wal_backlog_records",
+    "Scores in the write-ahead log not yet inserted into the leaderboard table",
+    multiprocess_mode="livesum",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records discarded because the log writer thread fell LOG_QUEUE_SIZE records behind",
+)
+
+# Endpoint-function time of the current request, read back by MetricsRoute
+_endpoint_time: ContextVar[Optional[List[float]]] = ContextVar("endpoint_time", default=None)
+
+
+def timed_layer(layer: str) -> Callable:
+    """Decorator recording the wall time of each call under ``layer``.
+
+    Args:
+        layer: Value of the ``layer`` label
+
+    Returns:
+        Decorator for sync or async functions
+    """
+    histogram = LAYER_LATENCY.labels(layer)
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+def _root_exception(exc: BaseException) -> BaseException:
+    """Follow the ``raise ... from``/``except`` chain to the original exception.
+
+    Controllers and views re-raise failures as generic ``Exception`` or
+    ``HTTPException``; the root keeps the useful type (e.g. OperationalError).
+    """
+    seen = set()
+    while id(exc) not in seen:
+        seen.add(id(exc))
+        cause = exc.__cause__ or exc.__context__
+        if cause is None:
+            break
+        exc = cause
+    return exc
+
+
+class MetricsRoute(APIRoute):
+    """APIRoute that records request latency, errors and the per-layer split.
+
+    Used by the routers mounted under API_PREFIX; the route label is the full
+    path template whether or not FastAPI applied the include prefix to the
+    route object.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        controller = LAYER_LATENCY.labels("controller")
+
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                controller.observe(elapsed)
+                spent = _endpoint_time.get()
+                if spent is not None:
+                    spent[0] += elapsed
+
+        super().__init__(
+            path,
+            timed_endpoint if asyncio.iscoroutinefunction(endpoint) else endpoint,
+            **kwargs
+        )
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path_format
+        if not route.startswith(API_PREFIX + "/"):
+            route = API_PREFIX + route
+        serialization = LAYER_LATENCY.labels("serialization")
+
+        async def metered_handler(request):
+            with span("handler", route=route):
+                return await timed_handler(request)
+
+        async def timed_handler(request):
+            spent = [0.0]
+            token = _endpoint_time.set(spent)
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except Exception as e:
+                if isinstance(e, HTTPException):
+                    status = e.status_code
+                ERRORS.labels(route, type(_root_exception(e)).__name__).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                _endpoint_time.reset(token)
+                REQUEST_LATENCY.labels(request.method, route).observe(elapsed)
+                REQUESTS.labels(request.method, route, str(status)).inc()
+                if spent[0]:
+                    serialization.observe(max(elapsed - spent[0], 0.0))
+
+        return metered_handler
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the count and duration of every statement run on ``engine``.
+
+    Args:
+        engine: Sync engine (``async_engine.sync_engine`` for the async one)
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        operation = statement.lstrip()[:6].upper()
+        if operation not in DB_OPERATIONS:
+            operation = "OTHER"
+        DB_QUERY_LATENCY.labels(operation).observe(elapsed)
+
+
+def render_metrics() -> bytes:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        Samples of every worker when multiprocess collection is enabled,
+        otherwise those of this process
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,67 @@
+"""ASGI middleware applying the per-client rate limits."""
+import math
+from urllib.parse import parse_qs
+from typing import Optional
+from app.config import API_PREFIX
+from app.services.auth_service import AuthService
+from app.services.rate_limiter import RateLimiter, rate_limiter
+from app.utils.metrics import RATE_LIMITED
+
+READ_METHODS = ("GET", "HEAD")
+REJECTED_BODY = b'{"detail":"Too many requests"}'
+
+
+def _request_token(scope) -> Optional[str]:
+    """Token from the "token" header, or the "token" query parameter (EventSource)."""
+    for name, value in scope["headers"]:
+        if name == b"token":
+            return value.decode("latin-1")
+    query = scope.get("query_string", b"")
+    if b"token=" in query:
+        values = parse_qs(query.decode("latin-1")).get("token")
+        if values:
+            return values[0]
+    return None
+
+
+class RateLimitMiddleware:
+    """Reject /api requests over the client's read or write budget with 429.
+
+    A client is the API key's client id (or "anonymous" for missing and
+    invalid tokens) together with the connection's IP address; behind a
+    proxy, trust its X-Forwarded-For header (``--forwarded-allow-ips``,
+    FORWARDED_ALLOW_IPS in gunicorn_config.py) so that is the real client IP.
+    The check runs before routing, so rejected requests never open a
+    database session. CORS preflight requests are not counted.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter, prefix: str = API_PREFIX):
+        self.app = app
+        self.limiter = limiter
+        self.prefix = prefix + "/"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix) or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        client_id = AuthService.get_client_id(_request_token(scope)) or "anonymous"
+        client = scope.get("client")
+        key = f"{client_id}|{client[0] if client else '-'}"
+        write = scope["method"] not in READ_METHODS
+        wait = self.limiter.acquire(key, write)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.labels("write" if write else "read").inc()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(REJECTED_BODY)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": REJECTED_BODY})
@@ -0,0 +1,62 @@
+"""ASGI middleware sending a client's reads to the primary right after it writes."""
+import time
+from typing import Optional
+from app.config import API_PREFIX, READ_YOUR_WRITES_SECONDS
+from app.services.replica_router import primary_reads
+
+HEADER = b"x-read-your-writes"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _deadline(scope) -> Optional[int]:
+    """Value of the X-Read-Your-Writes request header (epoch ms), if valid."""
+    for name, value in scope["headers"]:
+        if name == HEADER:
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client's reads to the primary for a while after it writes.
+
+    Successful /api writes answer with ``X-Read-Your-Writes: <deadline>``
+    (epoch ms, ``window`` seconds ahead). A client that sends the header back
+    has its reads served by the primary until the deadline, so a score it
+    just submitted is visible even while the replicas lag; it works whichever
+    worker or host serves the next request. Deadlines further ahead than
+    ``window`` are ignored. Reads made while handling a write also use the
+    primary.
+    """
+
+    def __init__(self, app, window: float = READ_YOUR_WRITES_SECONDS, prefix: str = API_PREFIX):
+        self.app = app
+        self.window_ms = window * 1000
+        self.prefix = prefix + "/"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        write = scope["method"] not in READ_METHODS
+        if not write:
+            deadline = _deadline(scope)
+            now = time.time() * 1000
+            if deadline is None or not now < deadline <= now + self.window_ms:
+                await self.app(scope, receive, send)
+                return
+
+        async def send_with_deadline(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                deadline = str(int(time.time() * 1000 + self.window_ms)).encode()
+                message["headers"] = list(message.get("headers", [])) + [(HEADER, deadline)]
+            await send(message)
+
+        token = primary_reads.set(True)
+        try:
+            await self.app(scope, receive, send_with_deadline if write else send)
+        finally:
+            primary_reads.reset(token)
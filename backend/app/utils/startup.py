@@ -0,0 +1,92 @@
+"""Startup phase timing and time-to-first-request of this worker."""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Time a worker's startup phases and its first response.
+
+    The clock starts when this module is imported (first thing app.main
+    does, so the framework imports are included), or again in
+    ``gunicorn_config.post_fork`` when the app was preloaded in the master,
+    so every duration is measured from the start of this worker.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.first_request: Optional[float] = None
+
+    def restart(self) -> None:
+        """Start counting again (in a worker forked from a preloaded master)."""
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.first_request = None
+
+    def _record(self, name: str, seconds: float) -> None:
+        # Imported here so the clock starts before FastAPI and Prometheus load
+        from app.utils.metrics import STARTUP_LATENCY
+        self.phases[name] = seconds
+        STARTUP_LATENCY.labels(name).observe(seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the body of the ``with`` block as startup phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(name, elapsed)
+            logger.info(f"Startup phase {name}: {elapsed * 1000:.0f} ms")
+
+    def ready(self) -> None:
+        """Record the end of startup: time since the worker started."""
+        elapsed = time.perf_counter() - self.started
+        self._record("ready", elapsed)
+        logger.info(f"Worker {os.getpid()} ready {elapsed * 1000:.0f} ms after start")
+
+    def request_done(self) -> None:
+        """Record the first response sent by this worker (later calls do nothing)."""
+        if self.first_request is not None:
+            return
+        self.first_request = time.perf_counter() - self.started
+        self._record("first_request", self.first_request)
+        logger.info(f"Worker {os.getpid()} sent its first response {self.first_request * 1000:.0f} ms after start")
+
+    def stats(self) -> Dict[str, Any]:
+        """Phase durations and time to first request in milliseconds."""
+        return {
+            "pid": os.getpid(),
+            "phases": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "timeToFirstRequest": round(self.first_request * 1000, 1) if self.first_request is not None else None,
+        }
+
+
+class FirstRequestMiddleware:
+    """Report the worker's first response to the startup timer, then step aside."""
+
+    def __init__(self, app, timer: Optional[StartupTimer] = None):
+        self.app = app
+        self.timer = timer or startup_timer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.timer.first_request is not None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_record(message):
+            await send(message)
+            if message["type"] == "http.response.start":
+                self.timer.request_done()
+
+        await self.app(scope, receive, send_and_record)
+
+
+# Shared startup timer instance for this process
+startup_timer = StartupTimer()
@@ -0,0 +1,345 @@
+"""Request ids, sampled request tracing and the slow-query log.
+
+Every request gets an id (the client's ``X-Request-ID`` if it sends a
+usable one), returned in the response header and attached to every log
+record written while handling it. ``TRACE_SAMPLE_RATE`` of the requests
+are also traced: spans opened with ``span()``, the methods of ``@traced``
+classes and the SQL statements of ``trace_engine`` engines are collected
+and logged as a single ``trace`` record once the request is done. Outside
+a sampled request each of them costs one context variable lookup.
+
+Independently of sampling, statements slower than ``SLOW_QUERY_MS`` are
+logged with their bound parameters and EXPLAIN plan. The plan is fetched
+by a background task on another pooled connection, so the request that ran
+the slow statement never waits for it.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import TRACE_SAMPLE_RATE, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN, SLOW_QUERY_EXPLAIN_TTL_SECONDS
+
+HEADER = b"x-request-id"
+# Client request ids are kept only if they are short and header-safe
+REQUEST_ID_PATTERN = re.compile(rb"[A-Za-z0-9._:-]{1,64}")
+# Spans kept per trace (a bulk insert can run thousands of statements)
+MAX_SPANS = 500
+# Statement text kept in SQL spans and in the slow-query log
+SPAN_STATEMENT_CHARS = 200
+SLOW_STATEMENT_CHARS = 4000
+# Longest string parameter logged as is
+PARAMETER_CHARS = 200
+# Statement types EXPLAIN accepts on both MySQL and SQLite
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+EXPLAIN_TIMEOUT_SECONDS = 5.0
+# Distinct statements whose plans are kept
+MAX_PLANS = 256
+
+trace_logger = logging.getLogger("app.trace")
+slow_query_logger = logging.getLogger("app.slow_query")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+# Index of the innermost open span of the current trace (-1: the request)
+_parent: ContextVar[int] = ContextVar("trace_parent", default=-1)
+
+_NO_SPAN = nullcontext()
+
+
+def current_request_id() -> Optional[str]:
+    """Id of the request being handled, if any."""
+    return _request_id.get()
+
+
+class Trace:
+    """Spans of one sampled request, in the order they started.
+
+    Each span is a dict with its name, the index of its parent span (-1 for
+    the request itself), and its start offset from the request start and
+    duration in milliseconds; SQL spans also carry the statement.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+
+    def _open(self, name: str, start: float, **fields) -> Optional[Dict[str, Any]]:
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = {"name": name, "parent": _parent.get(), "startMs": round((start - self.start) * 1000, 3), **fields}
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Record the body of the ``with`` block as span ``name``."""
+        start = time.perf_counter()
+        span = self._open(name, start, **fields)
+        if span is None:
+            yield
+            return
+        token = _parent.set(len(self.spans) - 1)
+        try:
+            yield
+        finally:
+            _parent.reset(token)
+            span["durationMs"] = round((time.perf_counter() - start) * 1000, 3)
+
+    def add(self, name: str, start: float, end: float, **fields) -> None:
+        """Record an already finished span (SQL statements)."""
+        span = self._open(name, start, **fields)
+        if span is not None:
+            span["durationMs"] = round((end - start) * 1000, 3)
+
+
+def span(name: str, **fields):
+    """Context manager recording a span if the current request is traced.
+
+    Args:
+        name: Span name
+        **fields: Extra attributes of the span
+
+    Returns:
+        The span's context manager, or a no-op one outside sampled requests
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name, **fields)
+
+
+def _traced_function(func: Callable, name: str) -> Callable:
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            with trace.span(name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _trace.get()
+        if trace is None:
+            return func(*args, **kwargs)
+        with trace.span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def traced(cls: type) -> type:
+    """Class decorator: trace every public static method as "Class.method".
+
+    Async generators (streams) are left alone, since their span would only
+    cover creating the generator.
+
+    Args:
+        cls: Class of static methods (a controller or service)
+
+    Returns:
+        The same class
+    """
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attribute, staticmethod):
+            continue
+        func = attribute.__func__
+        if inspect.isasyncgenfunction(func):
+            continue
+        setattr(cls, name, staticmethod(_traced_function(func, f"{cls.__name__}.{name}")))
+    return cls
+
+
+def _incoming_request_id(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == HEADER:
+            if REQUEST_ID_PATTERN.fullmatch(value):
+                return value.decode()
+            return None
+    return None
+
+
+class TracingMiddleware:
+    """Assign request ids and trace a sample of the requests.
+
+    Sampled requests are logged by the "app.trace" logger as one record
+    with the method, path, status, total duration and the list of spans.
+    """
+
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _incoming_request_id(scope) or os.urandom(8).hex()
+        header = (HEADER, request_id.encode())
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        trace = Trace() if self.sample_rate > 0 and random.random() < self.sample_rate else None
+        id_token = _request_id.set(request_id)
+        trace_token = _trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _trace.reset(trace_token)
+            if trace is not None:
+                trace_logger.info("request traced", extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "durationMs": round((time.perf_counter() - trace.start) * 1000, 3),
+                    "spans": trace.spans,
+                    "droppedSpans": trace.dropped,
+                })
+            _request_id.reset(id_token)
+
+
+def _loggable(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > PARAMETER_CHARS:
+        return value[:PARAMETER_CHARS] + f"...({len(value)} chars)"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    return value
+
+
+def _loggable_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: _loggable(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_loggable(value) for value in parameters]
+    return parameters
+
+
+class SlowQueryLog:
+    """Log slow statements with their parameters and query plan.
+
+    Records of a statement whose plan is being fetched wait for it; plans
+    are reused for ``plan_ttl`` seconds, so a statement that is slow on
+    every request runs at most one EXPLAIN per period.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        plan_ttl: float = SLOW_QUERY_EXPLAIN_TTL_SECONDS,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.plan_ttl = plan_ttl
+        self._plans: Dict[str, tuple] = {}
+        self._waiting: Dict[str, List[Dict[str, Any]]] = {}
+        self._tasks = set()
+
+    def record(self, engine: AsyncEngine, statement: str, parameters: Any, executemany: bool, seconds: float) -> None:
+        """Log one slow statement (called from the engine's execute event).
+
+        Args:
+            engine: Engine that ran the statement, used for EXPLAIN
+            statement: SQL as sent to the driver
+            parameters: Bound parameters (a list of them for executemany)
+            executemany: Whether the statement ran once per parameter set
+            seconds: Execution time
+        """
+        fields = {
+            "durationMs": round(seconds * 1000, 3),
+            "database": engine.url.render_as_string(hide_password=True),
+            "statement": statement[:SLOW_STATEMENT_CHARS],
+        }
+        if executemany:
+            fields["executions"] = len(parameters)
+            parameters = parameters[0] if parameters else None
+        fields["parameters"] = _loggable_parameters(parameters)
+
+        if not self.explain or not statement.lstrip()[:6].upper().startswith(EXPLAINABLE):
+            slow_query_logger.warning("slow query", extra=fields)
+            return
+        plan = self._plans.get(statement)
+        if plan is not None and time.monotonic() - plan[0] < self.plan_ttl:
+            fields["plan"] = plan[1]
+            slow_query_logger.warning("slow query", extra=fields)
+            return
+        waiting = self._waiting.get(statement)
+        if waiting is not None:
+            waiting.append(fields)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            slow_query_logger.warning("slow query", extra=fields)
+            return
+        self._waiting[statement] = [fields]
+        task = loop.create_task(self._explain(engine, statement, parameters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_plan(self, engine: AsyncEngine, statement: str, parameters: Any) -> List[Dict[str, Any]]:
+        prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+        async with engine.connect() as conn:
+            result = await conn.exec_driver_sql(f"{prefix} {statement}", parameters or None)
+            return [dict(row._mapping) for row in result]
+
+    async def _explain(self, engine: AsyncEngine, statement: str, parameters: Any) -> None:
+        extra = {}
+        try:
+            plan = await asyncio.wait_for(self._fetch_plan(engine, statement, parameters), EXPLAIN_TIMEOUT_SECONDS)
+            if len(self._plans) >= MAX_PLANS:
+                self._plans.pop(next(iter(self._plans)))
+            self._plans[statement] = (time.monotonic(), plan)
+            extra["plan"] = plan
+        except Exception as e:
+            extra["explainError"] = f"{type(e).__name__}: {str(e)}"
+        for fields in self._waiting.pop(statement, []):
+            slow_query_logger.warning("slow query", extra={**fields, **extra})
+
+
+def trace_engine(engine: AsyncEngine, slow_queries: Optional[SlowQueryLog] = None) -> None:
+    """Add ``engine``'s statements to sampled traces and to the slow-query log.
+
+    Args:
+        engine: Async engine (the primary or a replica)
+        slow_queries: Slow-query log (the shared one by default)
+    """
+    slow_queries = slow_queries or slow_query_log
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        end = time.perf_counter()
+        start = conn.info["trace_start_time"].pop()
+        trace = _trace.get()
+        if trace is not None:
+            trace.add("sql", start, end, statement=statement[:SPAN_STATEMENT_CHARS])
+        if slow_queries.threshold and end - start >= slow_queries.threshold and not statement.startswith("EXPLAIN"):
+            slow_queries.record(engine, statement, parameters, executemany, end - start)
+
+
+# Shared slow-query log instance for this process
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,38 @@
+"""Time windows for windowed leaderboards."""
+import time
+from typing import Optional
+from app.config import LEADERBOARD_WINDOW_UTC_OFFSET_MINUTES
+
+WINDOWS = ("day", "week", "all")
+
+DAY_MS = 24 * 60 * 60 * 1000
+WEEK_MS = 7 * DAY_MS
+# 1970-01-01 was a Thursday; shift so weeks start on Monday
+WEEK_EPOCH_SHIFT_MS = 3 * DAY_MS
+OFFSET_MS = LEADERBOARD_WINDOW_UTC_OFFSET_MINUTES * 60 * 1000
+
+
+def window_start(window: str, now_ms: Optional[float] = None) -> Optional[int]:
+    """Get the start of the current window in epoch milliseconds.
+
+    Days start at midnight and weeks on Monday at midnight, in the timezone
+    given by LEADERBOARD_WINDOW_UTC_OFFSET_MINUTES.
+
+    Args:
+        window: One of "day", "week" or "all"
+        now_ms: Current time in epoch milliseconds (default: now)
+
+    Returns:
+        Window start in epoch milliseconds, or None for "all"
+    """
+    if window == "all":
+        return None
+    if now_ms is None:
+        now_ms = time.time() * 1000
+    local_ms = int(now_ms) + OFFSET_MS
+    if window == "day":
+        return local_ms - local_ms % DAY_MS - OFFSET_MS
+    if window == "week":
+        shifted = local_ms + WEEK_EPOCH_SHIFT_MS
+        return shifted - shifted % WEEK_MS - WEEK_EPOCH_SHIFT_MS - OFFSET_MS
+    raise ValueError(f"Unknown leaderboard window: {window}")
@@ -1,8 +1,9 @@
 """Authentication API endpoints."""
 from fastapi import APIRouter, Query
 from app.services.auth_service import AuthService
+from app.utils.metrics import MetricsRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=MetricsRoute)
 
 
 @router.get("/token", response_model=dict)
@@ -1,12 +1,38 @@
 """Leaderboard API endpoints."""
-from fastapi import APIRouter, HTTPException, Query, Security, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.controllers.leaderboard_controller import LeaderboardController
-from app.models.leaderboard import LeaderboardEntry, AddScoreRequest, LeaderboardResponse
-from app.utils.auth_dependency import api_key_header
-from app.services.auth_service import AuthService
-from typing import List
+from app.services.leaderboard_broadcaster import SubscriberLimitError
+from app.services.leaderboard_export import ExportLimitError, ExportUnavailableError
+from app.services.score_wal import WalSyncError
+from app.models.leaderboard import (
+    LeaderboardEntry,
+    AddScoreRequest,
+    LeaderboardResponse,
+    LeaderboardWindow,
+    LeaderboardDistinct,
+    ExportFormat,
+    BatchScoreResponse,
+    RankResponse,
+    CacheStatsResponse,
+)
+from app.utils.auth_dependency import verify_token, verify_token_or_query
+from app.utils.metrics import MetricsRoute
+from app.utils.http_cache import etag_matches, leaderboard_cache_headers
+from app.config import GAME_SESSION_REQUIRED
+from typing import List, Any, AsyncIterator, Optional
+import json
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"], route_class=MetricsRoute)
 
-router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+def _check_direct_scores_allowed() -> None:
+    """Reject client-claimed scores when results must come from a game session."""
+    if GAME_SESSION_REQUIRED:
+        raise HTTPException(
+            status_code=403,
+            detail="Scores must be submitted through a game session (POST /api/sessions)",
+        )
 
 
 @router.get(
@@ -15,70 +41,338 @@ router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 )
 async def get_leaderboard(
     limit: int = Query(10, ge=1, le=100),
-    token: str = Security(api_key_header)
+    cursor: Optional[str] = Query(None, description="nextCursor of the previous page"),
+    window: LeaderboardWindow = Query("all", description="Only entries from today, this week, or all time"),
+    distinct: Optional[LeaderboardDistinct] = Query(None, description="'players' to list each player's best game once"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy; answered with 304 if unchanged"),
+    token: str = Depends(verify_token)
 ):
     """Get top leaderboard entries.
     
+    Pass the returned nextCursor as ``cursor`` to fetch the following page;
+    every page costs the same however deep it is. The body is encoded
+    directly from the cached rows (response_model documents its shape).
+    
+    Every page carries an ETag derived from its content; sending it back
+    in If-None-Match returns 304 (for cached first pages, without reading
+    the database or encoding the body).
+    
     Args:
         limit: Maximum number of entries to return (default: 10, max: 100)
+        cursor: Opaque cursor from a previous response (default: first page)
+        window: "day", "week" or "all" (default: "all")
+        distinct: "players" for one entry per player (all-time only)
+        if_none_match: ETag from a previous response
         token: API token for authentication (get from GET /api/auth/token)
         
     Returns:
-        LeaderboardResponse with entries and total count
+        LeaderboardResponse with entries, total count and next page cursor
     """
-    # Verify token
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing token. Please provide 'token' header with API token",
-        )
+    try:
+        etag = LeaderboardController.get_leaderboard_etag(limit, cursor, window, distinct)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=leaderboard_cache_headers(etag))
+        
+        body = await LeaderboardController.get_leaderboard_json(limit, cursor, window, distinct)
+        etag = LeaderboardController.leaderboard_etag(body)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=leaderboard_cache_headers(etag))
+        return Response(content=body, media_type="application/json", headers=leaderboard_cache_headers(etag))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events"}}
+)
+async def stream_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    last_event_id: Optional[str] = Header(None, description="id of the last event received, sent by reconnecting clients"),
+    token: str = Depends(verify_token_or_query)
+):
+    """Stream changes of the top leaderboard entries as Server-Sent Events.
     
-    if not AuthService.verify_token(token):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
+    The first ``snapshot`` event carries the current top ``limit`` entries;
+    each later ``diff`` event carries the entries that entered the top
+    ``limit`` (``added``) and the ids that left it (``removed``). Applying a
+    diff, re-sorting by score then id (both descending) and truncating to
+    ``limit`` reproduces the board. Bursts of writes are merged into one diff,
+    and a slow client gets one diff covering everything it missed.
+    
+    Args:
+        limit: Number of top entries to follow (default: 10, max: 100)
+        last_event_id: Last-Event-ID of a reconnecting client
+        token: API token, as "token" header or query parameter (EventSource cannot send headers)
+        
+    Returns:
+        text/event-stream response that stays open until the client leaves
+    """
+    try:
+        events = await LeaderboardController.stream_leaderboard(limit, last_event_id)
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/csv": {}, "application/vnd.apache.parquet": {}},
+            "description": "All matching entries in id order",
+        },
+        501: {"description": "Format not available on this server"},
+        503: {"description": "Too many exports running"},
+    }
+)
+async def export_leaderboard(
+    format: ExportFormat = Query("ndjson", description="ndjson, csv or parquet"),
+    after: int = Query(0, ge=0, description="Resume after this entry id (the last id received)"),
+    since: Optional[int] = Query(None, ge=0, description="Only entries with a timestamp at or after this (epoch ms)"),
+    until: Optional[int] = Query(None, ge=0, description="Only entries with a timestamp before this (epoch ms)"),
+    include_archive: bool = Query(True, alias="includeArchive", description="Also export entries moved to the archive"),
+    token: str = Depends(verify_token)
+):
+    """Export the whole leaderboard for analytics.
+    
+    Rows (id, name, score, maxCombo, timestamp) are streamed in id order,
+    a chunk at a time, so any number of rows can be exported. Archived
+    entries are merged in by id unless ``includeArchive`` is false. If the
+    transfer breaks, request again with ``after`` set to the last id
+    received; NDJSON and CSV bodies can be used up to their last
+    complete line, a Parquet file only once complete.
     
+    Args:
+        format: "ndjson" (default), "csv" or "parquet"
+        after: Only entries with a greater id
+        since: Only entries with a timestamp at or after this (epoch ms)
+        until: Only entries with a timestamp before this (epoch ms)
+        include_archive: Also include entries moved to leaderboard_archive
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        Streaming response with the entries as an attachment
+    """
     try:
-        entries = LeaderboardController.get_leaderboard(limit)
-        return LeaderboardResponse(entries=entries, total=len(entries))
+        export = LeaderboardController.export_leaderboard(format, after, since, until, include_archive)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ExportLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        export.chunks,
+        media_type=export.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="leaderboard.{export.extension}"',
+            "Cache-Control": "no-store",
+            # Send each chunk as it is produced
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @router.post(
     "",
     response_model=LeaderboardEntry,
-    status_code=201
+    status_code=201,
+    responses={
+        202: {"model": LeaderboardEntry, "description": "Accepted into the write-ahead log (no id yet)"},
+        503: {"description": "Logged but not synced; recorded once a later sync succeeds, do not resubmit"},
+    }
 )
 async def add_score(
     request: AddScoreRequest,
-    token: str = Security(api_key_header)
+    response: Response,
+    token: str = Depends(verify_token)
 ):
     """Add a new score to the leaderboard.
     
+    Disabled (403) when GAME_SESSION_REQUIRED is set; games then submit
+    their event log to POST /api/sessions/{session_id}/score instead.
+    With SCORE_WAL_ENABLED the score is accepted once it is on disk and
+    answered with 202 and no id; it appears on the leaderboard when the
+    write-ahead log is drained. If the log was written but could not be
+    synced the answer is 503: the score is still inserted once a later sync
+    succeeds, so it must not be submitted again.
+    
     Args:
         request: AddScoreRequest containing name, score, and maxCombo
+        response: Response whose status is set to 202 for logged scores
         token: API token for authentication (get from GET /api/auth/token)
         
     Returns:
         Created leaderboard entry
     """
-    # Verify token
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing token. Please provide 'token' header with API token",
-        )
+    _check_direct_scores_allowed()
+    try:
+        entry = await LeaderboardController.add_score(request)
+        if entry.id is None:
+            response.status_code = 202
+        return entry
+    except WalSyncError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _iter_json_array(items: List[Any]) -> AsyncIterator[Any]:
+    """Yield the items of an already parsed JSON array."""
+    for item in items:
+        yield item
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[bytes]:
+    """Yield the non-empty lines of an NDJSON request body as it streams in."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+@router.post(
+    "/batch",
+    response_model=BatchScoreResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": AddScoreRequest.model_json_schema()
+                    }
+                },
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "description": "One AddScoreRequest JSON object per line"}
+                },
+            },
+        }
+    }
+)
+async def add_scores_batch(
+    request: Request,
+    token: str = Depends(verify_token)
+):
+    """Add many scores in one request.
     
-    if not AuthService.verify_token(token):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
+    Accepts a JSON array of AddScoreRequest items, or an NDJSON stream
+    (Content-Type: application/x-ndjson) with one item per line. Items are
+    validated individually and inserted in chunked transactions. Disabled
+    (403) when GAME_SESSION_REQUIRED is set.
+    
+    Args:
+        request: Raw request carrying the JSON array or NDJSON body
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        BatchScoreResponse with the id or error of every item
+    """
+    _check_direct_scores_allowed()
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = _iter_ndjson(request)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Request body must be a JSON array")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=422, detail="Request body must be a JSON array")
+        items = _iter_json_array(body)
     
     try:
-        entry = LeaderboardController.add_score(request)
-        return entry
+        return await LeaderboardController.add_scores(items)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@router.get(
+    "/rank",
+    response_model=RankResponse
+)
+async def get_rank(
+    score: int = Query(..., ge=0, description="Score to rank"),
+    token: str = Depends(verify_token)
+):
+    """Get the rank a score would have on the leaderboard.
+    
+    Ranks are shared by equal scores: rank = 1 + number of entries with a
+    strictly higher score.
+    
+    Args:
+        score: Score to rank
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        RankResponse with rank and total entry count
+    """
+    try:
+        return await LeaderboardController.get_rank(score)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/entries/{entry_id}/rank",
+    response_model=RankResponse
+)
+async def get_entry_rank(
+    entry_id: int,
+    token: str = Depends(verify_token)
+):
+    """Get the rank of an existing leaderboard entry.
+    
+    Args:
+        entry_id: Entry ID
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        RankResponse with rank, total entry count and the entry's score
+    """
+    try:
+        rank = await LeaderboardController.get_entry_rank(entry_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if rank is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return rank
+
+
+@router.get(
+    "/cache",
+    response_model=CacheStatsResponse
+)
+async def get_cache_stats(
+    window: LeaderboardWindow = Query("all", description="Window whose cache to report"),
+    token: str = Depends(verify_token)
+):
+    """Get leaderboard cache hit/miss counters for this worker process.
+    
+    Args:
+        window: "day", "week" or "all" (default: "all")
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        CacheStatsResponse with cache counters
+    """
+    return LeaderboardController.get_cache_stats(window)
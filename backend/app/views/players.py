@@ -0,0 +1,38 @@
+"""Player API endpoints."""
+from fastapi import APIRouter, Depends, HTTPException, Path
+from app.controllers.player_controller import PlayerController
+from app.models.player import PlayerStatsResponse
+from app.utils.auth_dependency import verify_token
+from app.utils.metrics import MetricsRoute
+
+router = APIRouter(prefix="/players", tags=["players"], route_class=MetricsRoute)
+
+
+@router.get(
+    "/{name}",
+    response_model=PlayerStatsResponse
+)
+async def get_player(
+    name: str = Path(..., min_length=1, max_length=50),
+    token: str = Depends(verify_token)
+):
+    """Get a player's best score, best combo and number of games.
+    
+    Answered from the per-player aggregate table without reading the
+    player's game history.
+    
+    Args:
+        name: Player name
+        token: API token for authentication (get from GET /api/auth/token)
+        
+    Returns:
+        PlayerStatsResponse
+    """
+    try:
+        player = await PlayerController.get_player(name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if player is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return player
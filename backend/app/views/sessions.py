@@ -0,0 +1,81 @@
+"""Game session API endpoints."""
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from app.controllers.session_controller import SessionController
+from app.services.auth_service import AuthService
+from app.services.game_session_service import InvalidSessionError, SessionUsedError
+from app.services.replay_validator import ReplayError
+from app.services.score_wal import WalSyncError
+from app.models.session import GameSessionResponse, GameResultRequest, GameResultResponse
+from app.utils.auth_dependency import verify_token
+from app.utils.metrics import MetricsRoute
+
+router = APIRouter(prefix="/sessions", tags=["sessions"], route_class=MetricsRoute)
+
+
+@router.post(
+    "",
+    response_model=GameSessionResponse,
+    status_code=201
+)
+async def create_session(
+    token: str = Depends(verify_token)
+):
+    """Start a game session.
+    
+    Call when a game starts; the signed session id is needed to submit the
+    game's result. Issuing one does not touch the database.
+    
+    Args:
+        token: API token for authentication (get from GET /api/auth/token)
+    
+    Returns:
+        GameSessionResponse with the session id and its expiry
+    """
+    return SessionController.create_session(AuthService.get_client_id(token))
+
+
+@router.post(
+    "/{session_id}/score",
+    response_model=GameResultResponse,
+    status_code=201
+)
+async def submit_result(
+    request: GameResultRequest,
+    response: Response,
+    session_id: str = Path(..., max_length=100),
+    token: str = Depends(verify_token)
+):
+    """Submit a game's event log; the score is recomputed from it.
+    
+    The throws and scores are replayed with the game's rules (points,
+    swish bonus, combo window, ball lifetime); the leaderboard entry gets
+    the recomputed score and max combo, never client-claimed values. Each
+    session accepts one result. With SCORE_WAL_ENABLED the answer is 202
+    without an id, as for POST /api/leaderboard, and 503 if the log was
+    written but not synced (the score is still recorded; the session stays
+    used).
+    
+    Args:
+        request: GameResultRequest with the player name and event log
+        response: Response whose status is set to 202 for logged scores
+        session_id: Session id from POST /api/sessions
+        token: API token of the client the session was issued to
+    
+    Returns:
+        Created leaderboard entry with shotsTaken, shotsMade and accuracy
+    """
+    try:
+        entry = await SessionController.submit_result(session_id, AuthService.get_client_id(token), request)
+        if entry.id is None:
+            response.status_code = 202
+        return entry
+    except InvalidSessionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except SessionUsedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ReplayError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except WalSyncError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,45 @@
+"""Leaderboard retention script: archive old rows, maintain monthly partitions, purge expired game sessions.
+
+Run from cron, e.g. nightly:
+    uv run python archive_leaderboard.py
+    uv run python archive_leaderboard.py --partition --months-ahead 3
+"""
+import argparse
+import logging
+from app.config import (
+    LEADERBOARD_RETENTION_TOP_K,
+    LEADERBOARD_RETENTION_DAYS,
+    LEADERBOARD_ARCHIVE_BATCH_SIZE,
+    GAME_SESSION_TTL_SECONDS,
+)
+from app.database import init_db
+from app.services.archive_service import ArchiveService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=LEADERBOARD_RETENTION_TOP_K, help="best entries never archived")
+    parser.add_argument("--days", type=int, default=LEADERBOARD_RETENTION_DAYS, help="archive other entries older than this")
+    parser.add_argument("--batch-size", type=int, default=LEADERBOARD_ARCHIVE_BATCH_SIZE, help="rows moved per transaction")
+    parser.add_argument("--partition", action="store_true", help="also create/extend monthly partitions (MySQL)")
+    parser.add_argument("--months-ahead", type=int, default=3, help="future months that must have a partition")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without changing it")
+    args = parser.parse_args()
+
+    try:
+        init_db()  # Creates leaderboard_archive if missing
+        moved = ArchiveService.archive_entries(args.top_k, args.days, args.batch_size, dry_run=args.dry_run)
+        logger.info(f"{'Would archive' if args.dry_run else 'Archived'} {moved} leaderboard rows")
+        if args.partition:
+            statements = ArchiveService.partition_table(args.months_ahead, args.days, dry_run=args.dry_run)
+            for statement in statements:
+                logger.info(f"{'Would run' if args.dry_run else 'Ran'}: {statement}")
+            if not statements:
+                logger.info("Partitions are up to date")
+        purged = ArchiveService.purge_game_sessions(GAME_SESSION_TTL_SECONDS, args.batch_size, dry_run=args.dry_run)
+        logger.info(f"{'Would purge' if args.dry_run else 'Purged'} {purged} expired game sessions")
+    except Exception as e:
+        logger.error(f"Leaderboard retention failed: {str(e)}")
+        raise
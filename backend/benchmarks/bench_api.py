@@ -0,0 +1,270 @@
+"""Benchmark: API throughput and latency percentiles against a seeded database.
+
+Seeds a throwaway SQLite database (or the database given by --database-url)
+with 10k, 1M or 10M leaderboard rows, runs the FastAPI app in-process and
+drives read, write, auth-failure and mixed workloads through it. Reports
+requests/second and p50/p95/p99 latency per workload and compares them with
+the baseline recorded for the same row count.
+
+Usage:
+    uv run python benchmarks/bench_api.py --rows 10k
+    uv run python benchmarks/bench_api.py --rows 1m --requests 5000
+    uv run python benchmarks/bench_api.py --rows 10k --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ROW_PRESETS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SEED_CHUNK = 50_000
+DAY_MS = 86_400_000
+
+
+def parse_rows(value: str) -> int:
+    """Parse a row count given as a preset (10k, 1m, 10m) or an integer."""
+    return ROW_PRESETS.get(value.lower()) or int(value)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="seeded rows: 10k, 1m, 10m or a number")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per workload")
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight requests")
+    parser.add_argument("--database-url", default="", help="async SQLAlchemy URL to use instead of a temp SQLite file")
+    parser.add_argument("--seed-cache", default="", help="directory keeping seeded SQLite files between runs")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for data and workload mix")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    return parser.parse_args()
+
+
+def seed_rows(engine, rows: int, seed: int) -> None:
+    """Insert ``rows`` deterministic leaderboard rows spread over the last 30 days."""
+    from sqlalchemy import insert
+    from app.models.db_models import LeaderboardEntryDB
+
+    rng = random.Random(seed)
+    now = int(time.time() * 1000)
+    table = LeaderboardEntryDB.__table__
+    table.create(engine, checkfirst=True)
+    for offset in range(0, rows, SEED_CHUNK):
+        chunk = [
+            {
+                "name": f"player-{rng.randrange(max(rows // 20, 1))}",
+                "score": int(rng.paretovariate(1.5) * 100),
+                "max_combo": rng.randrange(30),
+                "timestamp": now - rng.randrange(30 * DAY_MS),
+            }
+            for _ in range(min(SEED_CHUNK, rows - offset))
+        ]
+        with engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        print(f"\rseeded {offset + len(chunk):,}/{rows:,} rows", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+def prepare_database(args: argparse.Namespace) -> None:
+    """Point the app at the benchmark database and seed it before the app is imported.
+
+    Rows are loaded before ``init_db()`` runs the migrations, so secondary
+    indexes and the player_best table are built once over the full data set.
+    """
+    # Every request comes from one client; measure the API, not the rate limiter
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench-api-"), "bench.db")
+        cached = os.path.join(args.seed_cache, f"leaderboard-{args.rows}-{args.seed}.db") if args.seed_cache else ""
+        if cached and os.path.exists(cached):
+            shutil.copyfile(cached, db_path)
+        # Concurrent writers queue on SQLite's single write lock; wait instead of failing
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}?timeout=60"
+    sys.path.insert(0, BACKEND_DIR)
+
+    from sqlalchemy import func, inspect, select
+    from app.database import engine, init_db
+    from app.models.db_models import LeaderboardEntryDB
+
+    seeded = 0
+    if inspect(engine).has_table(LeaderboardEntryDB.__tablename__):
+        with engine.connect() as connection:
+            seeded = connection.scalar(select(func.count()).select_from(LeaderboardEntryDB))
+    if seeded < args.rows:
+        seed_rows(engine, args.rows - seeded, args.seed + seeded)
+    init_db()
+
+    if not args.database_url and args.seed_cache and not os.path.exists(cached):
+        os.makedirs(args.seed_cache, exist_ok=True)
+        engine.dispose()
+        shutil.copyfile(db_path, cached)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_workload(client, requests: list, concurrency: int) -> dict:
+    """Send ``requests`` (method, url, body, headers, expected status) and time each one."""
+    queue = iter(requests)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, body, headers, expected in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+
+def build_workloads(count: int, rng: random.Random, cursor: str, headers: dict) -> dict:
+    """Build the request list of every workload."""
+    bad = {"token": "not-the-token"}
+
+    def read(limit):
+        return ("GET", f"/api/leaderboard?limit={limit}", None, headers, 200)
+
+    def write():
+        body = {"name": f"bench-{rng.randrange(1000)}", "score": rng.randrange(5000), "maxCombo": rng.randrange(30)}
+        return ("POST", "/api/leaderboard", body, headers, 201)
+
+    page = ("GET", f"/api/leaderboard?limit=50&cursor={cursor}", None, headers, 200)
+    denied = ("GET", "/api/leaderboard?limit=10", None, bad, 401)
+
+    def mixed():
+        roll = rng.random()
+        if roll < 0.60:
+            return read(10)
+        if roll < 0.75:
+            return read(100)
+        if roll < 0.85:
+            return page
+        if roll < 0.97:
+            return write()
+        return denied
+
+    return {
+        "read limit=10": [read(10) for _ in range(count)],
+        "read limit=100": [read(100) for _ in range(count)],
+        "read cursor page": [page] * count,
+        "write": [write() for _ in range(count)],
+        "auth failure": [denied] * count,
+        "mixed": [mixed() for _ in range(count)],
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """List the workloads that regressed beyond ``tolerance`` against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rps']:.0f} req/s vs baseline {base['rps']:.0f}")
+        # p99 of a few thousand requests is too noisy to gate on; it is reported only
+        for key in ("p50", "p95"):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]:.2f} ms vs baseline {base[key]:.2f} ms")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    import logging
+    import httpx
+    from app.config import API_TOKEN
+    from app.main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One line per request otherwise
+    headers = {"token": API_TOKEN}
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            first = await client.get("/api/leaderboard?limit=100", headers=headers)
+            first.raise_for_status()
+            cursor = first.json()["nextCursor"]
+            for name, requests in build_workloads(args.requests, rng, cursor, headers).items():
+                results[name] = await run_workload(client, requests, args.concurrency)
+
+    print(f"rows: {args.rows:,}  requests/workload: {args.requests:,}  concurrency: {args.concurrency}")
+    print(f"{'workload':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<18}{result['rps']:>10.0f}{result['p50']:>10.2f}"
+            f"{result['p95']:>10.2f}{result['p99']:>10.2f}{result['errors']:>8}"
+        )
+
+    if any(result["errors"] for result in results.values()):
+        print("unexpected status codes returned; results not compared")
+        return 1
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    key = str(args.rows)
+    if args.save_baseline:
+        baselines[key] = {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workloads": {
+                name: {metric: round(result[metric], 3) for metric in ("rps", "p50", "p95", "p99")}
+                for name, result in results.items()
+            },
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline for {args.rows:,} rows saved to {args.baseline}")
+        return 0
+
+    if key not in baselines:
+        print(f"no baseline for {args.rows:,} rows; run with --save-baseline to record one")
+        return 0
+    baseline = baselines[key]
+    if (baseline["requests"], baseline["concurrency"]) != (args.requests, args.concurrency):
+        print(
+            f"baseline was recorded with --requests {baseline['requests']} "
+            f"--concurrency {baseline['concurrency']}; rerun with the same settings to compare"
+        )
+        return 0
+    regressions = compare(results, baseline["workloads"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    prepare_database(arguments)
+    sys.exit(asyncio.run(main(arguments)))
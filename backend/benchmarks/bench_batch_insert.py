@@ -0,0 +1,91 @@
+"""Benchmark: bulk score submission vs. one POST per score.
+
+Runs the FastAPI app in-process against a throwaway SQLite database and
+compares rows/second for ``POST /api/leaderboard`` (one request per score)
+with ``POST /api/leaderboard/batch`` (JSON array and NDJSON).
+
+Usage:
+    uv run python benchmarks/bench_batch_insert.py --rows 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench-batch-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"  # One client sending thousands of POSTs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx  # noqa: E402
+from app.config import API_TOKEN  # noqa: E402
+from app.main import app  # noqa: E402
+
+HEADERS = {"token": API_TOKEN}
+
+
+def make_scores(count: int) -> list:
+    """Build ``count`` score submissions."""
+    return [{"name": f"player-{i % 500}", "score": i % 10000, "maxCombo": i % 25} for i in range(count)]
+
+
+async def bench_single(client: httpx.AsyncClient, scores: list, concurrency: int) -> float:
+    """Submit every score with its own POST, ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(score):
+        async with semaphore:
+            response = await client.post("/api/leaderboard", json=score, headers=HEADERS)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(post(score) for score in scores))
+    return time.perf_counter() - start
+
+
+async def bench_batch(client: httpx.AsyncClient, scores: list, batch_size: int, ndjson: bool) -> float:
+    """Submit the scores through /batch, ``batch_size`` per request."""
+    start = time.perf_counter()
+    for offset in range(0, len(scores), batch_size):
+        batch = scores[offset:offset + batch_size]
+        if ndjson:
+            body = "\n".join(json.dumps(score) for score in batch)
+            response = await client.post(
+                "/api/leaderboard/batch",
+                content=body,
+                headers={**HEADERS, "content-type": "application/x-ndjson"},
+            )
+        else:
+            response = await client.post("/api/leaderboard/batch", json=batch, headers=HEADERS)
+        response.raise_for_status()
+        assert response.json()["failed"] == 0
+    return time.perf_counter() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    scores = make_scores(args.rows)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {
+                "single": await bench_single(client, scores, args.concurrency),
+                "batch (json)": await bench_batch(client, scores, args.batch_size, ndjson=False),
+                "batch (ndjson)": await bench_batch(client, scores, args.batch_size, ndjson=True),
+            }
+
+    baseline = args.rows / results["single"]
+    print(f"{'path':<16}{'seconds':>10}{'rows/s':>12}{'speedup':>10}")
+    for name, seconds in results.items():
+        rate = args.rows / seconds
+        print(f"{name:<16}{seconds:>10.3f}{rate:>12.0f}{rate / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="scores submitted per path")
+    parser.add_argument("--batch-size", type=int, default=500, help="items per /batch request")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight single POSTs")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+"""Benchmark: leaderboard export throughput and memory, streamed vs. loaded at once.
+
+Seeds a throwaway SQLite database with ``--rows`` entries and reports, per
+format, rows per second, output size and the peak of Python allocations
+(tracemalloc) while the whole export is consumed:
+
+- ndjson / csv / parquet: ``LeaderboardExporter`` (server-side cursor, one
+  chunk encoded and sent at a time)
+- ndjson, .all(): every row fetched into a list first, then encoded the same
+  way, which is what the export would cost without the cursor
+
+Streamed peaks should stay flat as ``--rows`` grows; the .all() peak grows
+with it. Parquet is skipped unless pyarrow is installed.
+
+Usage:
+    uv run python benchmarks/bench_export.py
+    uv run --extra export python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-export-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import insert, select  # noqa: E402
+from app.database import AsyncSessionLocal, engine, ensure_schema  # noqa: E402
+from app.models.db_models import LeaderboardEntryDB  # noqa: E402
+from app.services.leaderboard_export import ENCODERS, ExportUnavailableError, LeaderboardExporter  # noqa: E402
+
+SEED_CHUNK = 50_000
+
+
+def seed_rows(rows: int) -> None:
+    """Insert ``rows`` random leaderboard rows."""
+    rng = random.Random(1)
+    now = int(time.time() * 1000)
+    table = LeaderboardEntryDB.__table__
+    for offset in range(0, rows, SEED_CHUNK):
+        chunk = [
+            {
+                "name": f"player-{rng.randrange(max(rows // 20, 1))}",
+                "score": rng.randrange(100000),
+                "max_combo": rng.randrange(30),
+                "timestamp": now - rng.randrange(30 * 86_400_000),
+            }
+            for _ in range(min(SEED_CHUNK, rows - offset))
+        ]
+        with engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        print(f"\rseeded {offset + len(chunk):,}/{rows:,} rows", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+async def streamed(format: str, chunk_rows: int) -> int:
+    """Consume a whole export; return its size in bytes."""
+    export = LeaderboardExporter(max_concurrent=1, chunk_rows=chunk_rows).open(format)
+    size = 0
+    async for data in export.chunks:
+        size += len(data)
+    return size
+
+
+async def loaded_at_once(format: str, chunk_rows: int) -> int:
+    """Fetch every row with ``.all()``, then encode them; return the size in bytes."""
+    query = select(
+        LeaderboardEntryDB.id, LeaderboardEntryDB.name, LeaderboardEntryDB.score,
+        LeaderboardEntryDB.max_combo, LeaderboardEntryDB.timestamp,
+    ).order_by(LeaderboardEntryDB.id)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    encoder = ENCODERS[format]()
+    return len(encoder.start() + await encoder.encode(rows) + await encoder.finish())
+
+
+async def measure(export, format: str, chunk_rows: int) -> tuple:
+    """Rows/s (untraced run) and peak traced allocations in MiB of one export."""
+    start = time.perf_counter()
+    size = await export(format, chunk_rows)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    await export(format, chunk_rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak / 2**20
+
+
+async def main(args: argparse.Namespace) -> None:
+    ensure_schema()
+    seed_rows(args.rows)
+    cases = [(f"{format}, streamed", streamed, format) for format in ("ndjson", "csv", "parquet")]
+    cases.append(("ndjson, .all()", loaded_at_once, "ndjson"))
+
+    print(f"{args.rows:,} rows, {args.chunk_rows} rows per chunk")
+    print(f"{'export':<20}{'rows/s':>12}{'MiB out':>10}{'peak MiB':>10}")
+    for name, export, format in cases:
+        try:
+            elapsed, size, peak = await measure(export, format, args.chunk_rows)
+        except ExportUnavailableError as e:
+            print(f"{name:<20}  skipped: {str(e)}")
+            continue
+        print(f"{name:<20}{args.rows / elapsed:>12,.0f}{size / 2**20:>10.1f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="seeded leaderboard rows")
+    parser.add_argument("--chunk-rows", type=int, default=2000, help="rows per streamed chunk (EXPORT_CHUNK_ROWS)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -0,0 +1,98 @@
+"""Benchmark: replay validation of submitted game event logs.
+
+Generates realistic 180 s games (a throw every 0.3-1.5 s, 60% made, 0.6-1.5 s
+flights) and measures, per submission:
+
+- loop: ``replay_loop``, the game's event-by-event scoring without any checks
+- replay: ``replay``, every rule check plus scoring in whole-list passes
+- parse+replay: ``GameResultRequest.model_validate_json`` of the request body,
+  then ``replay`` (the CPU work of POST /api/sessions/{id}/score before the
+  database)
+
+Scores and combos of ``replay`` must match ``replay_loop`` on every game; the
+script checks that first.
+
+Usage:
+    uv run python benchmarks/bench_replay.py
+    uv run python benchmarks/bench_replay.py --games 500 --duration 600
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.models.session import GameResultRequest  # noqa: E402
+from app.services.replay_validator import replay, replay_loop  # noqa: E402
+
+
+def make_game(rng: random.Random, duration_ms: int) -> dict:
+    """Build the event log of one game, as the frontend submits it."""
+    shots = []
+    time = rng.randint(300, 1500)
+    while time < duration_ms:
+        shots.append(time)
+        time += rng.randint(300, 1500)
+    made = sorted(
+        (shot + rng.randint(600, 1500), index, rng.random() < 0.3)
+        for index, shot in enumerate(shots)
+        if rng.random() < 0.6
+    )
+    return {
+        "name": "Bench",
+        "shots": shots,
+        "hits": [index for _, index, _ in made],
+        "hitTimes": [hit_time for hit_time, _, _ in made],
+        "swishes": [swish for _, _, swish in made],
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(42)
+    games = [make_game(rng, args.duration * 1000) for _ in range(args.games)]
+    bodies = [json.dumps(game).encode() for game in games]
+    elapsed = args.duration * 1000
+
+    for game in games:
+        events = (game["shots"], game["hits"], game["hitTimes"], game["swishes"])
+        if replay(*events, elapsed) != replay_loop(*events):
+            raise SystemExit(f"replay differs from replay_loop: {replay(*events, elapsed)} != {replay_loop(*events)}")
+
+    def run_loop():
+        for game in games:
+            replay_loop(game["shots"], game["hits"], game["hitTimes"], game["swishes"])
+
+    def run_replay():
+        for game in games:
+            replay(game["shots"], game["hits"], game["hitTimes"], game["swishes"], elapsed)
+
+    def run_parse_replay():
+        for body in bodies:
+            request = GameResultRequest.model_validate_json(body)
+            replay(request.shots, request.hits, request.hitTimes, request.swishes, elapsed)
+
+    paths = {"loop": run_loop, "replay": run_replay, "parse+replay": run_parse_replay}
+    results = {}
+    for name, func in paths.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        results[name] = seconds / (args.number * len(games)) * 1_000_000
+
+    shots = sum(len(game["shots"]) for game in games) / len(games)
+    made = sum(len(game["hits"]) for game in games) / len(games)
+    size = sum(map(len, bodies)) / len(bodies)
+    print(f"{args.games} games of {args.duration}s: {shots:.0f} shots, {made:.0f} made, {size:.0f} bytes on average; identical scores")
+    print(f"{'path':<14}{'us/game':>10}{'games/s/core':>15}")
+    for name, micros in results.items():
+        print(f"{name:<14}{micros:>10.1f}{1_000_000 / micros:>15,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=200, help="distinct random games")
+    parser.add_argument("--duration", type=int, default=180, help="game length in seconds")
+    parser.add_argument("--number", type=int, default=20, help="passes over the games per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    main(parser.parse_args())
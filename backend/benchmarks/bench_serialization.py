@@ -0,0 +1,84 @@
+"""Benchmark: leaderboard response encoding, model path vs. direct JSON path.
+
+Compares the CPU cost of turning a page of cached entry dicts into the JSON
+body of ``GET /api/leaderboard``:
+
+- models: LeaderboardEntry(**entry) per row, LeaderboardResponse, then
+  FastAPI's response_model step (validate again, dump to JSON)
+- direct: ``encode_leaderboard`` (orjson over the dicts, no models)
+
+Both must produce identical bytes; the script checks that first.
+
+Usage:
+    uv run python benchmarks/bench_serialization.py --limit 100
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pydantic import TypeAdapter  # noqa: E402
+from app.models.leaderboard import LeaderboardEntry, LeaderboardResponse  # noqa: E402
+from app.utils.cursor import encode_cursor  # noqa: E402
+from app.utils.json_encoding import encode_leaderboard  # noqa: E402
+
+# Same adapter FastAPI builds for response_model=LeaderboardResponse
+RESPONSE_ADAPTER = TypeAdapter(LeaderboardResponse)
+
+
+def make_entries(count: int) -> list:
+    """Build ``count`` entry dicts shaped like DatabaseService returns them."""
+    return [
+        {
+            "name": f"玩家 {i % 37}",
+            "score": 100000 - i * 7,
+            "maxCombo": i % 25,
+            "timestamp": float(1703123456789 + i * 1000),
+            "id": str(500000 - i),
+        }
+        for i in range(count)
+    ]
+
+
+def encode_with_models(entries: list, next_cursor: str) -> bytes:
+    """The model path: build models, then FastAPI's validate + dump_json."""
+    response = LeaderboardResponse(
+        entries=[LeaderboardEntry(**entry) for entry in entries],
+        total=len(entries),
+        nextCursor=next_cursor,
+    )
+    return RESPONSE_ADAPTER.dump_json(RESPONSE_ADAPTER.validate_python(response))
+
+
+def main(args: argparse.Namespace) -> None:
+    entries = make_entries(args.limit)
+    next_cursor = encode_cursor(entries[-1]["score"], int(entries[-1]["id"]))
+
+    expected = encode_with_models(entries, next_cursor)
+    actual = encode_leaderboard(entries, next_cursor)
+    if actual != expected:
+        raise SystemExit(f"outputs differ:\n{expected[:200]!r}\n{actual[:200]!r}")
+
+    paths = {
+        "models": lambda: encode_with_models(entries, next_cursor),
+        "direct": lambda: encode_leaderboard(entries, next_cursor),
+    }
+    results = {}
+    for name, func in paths.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        results[name] = seconds / args.number * 1_000_000
+
+    print(f"limit={args.limit}, {len(expected)} bytes, identical output")
+    print(f"{'path':<10}{'us/response':>14}{'speedup':>10}")
+    for name, micros in results.items():
+        print(f"{name:<10}{micros:>14.1f}{results['models'] / micros:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100, help="entries per response")
+    parser.add_argument("--number", type=int, default=2000, help="encodings per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""Benchmark: gunicorn startup time and time-to-first-request, with and without preload.
+
+Starts gunicorn with gunicorn_config.py against a throwaway SQLite database
+(or --database-url), once with GUNICORN_PRELOAD=true and once with false,
+and reports:
+
+- first response: spawn to the first 200 from GET /health
+- all workers ready: spawn until every worker finished its lifespan startup
+  (counted from app_startup_duration_seconds{phase="ready"} in /metrics)
+- worker ready p50/max: per-worker worker-start-to-ready time
+- first /openapi.json: latency of the first schema request
+
+Usage:
+    uv run python benchmarks/bench_startup.py --workers 4
+    uv run python benchmarks/bench_startup.py --workers 9 --runs 3
+"""
+import argparse
+import os
+import re
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+READY_BUCKETS = re.compile(r'app_startup_duration_seconds_bucket\{le="([^"]+)",phase="ready"\} ([0-9.e+]+)')
+READY_COUNT = re.compile(r'app_startup_duration_seconds_count\{phase="ready"\} ([0-9.e+]+)')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--runs", type=int, default=1, help="starts per mode (the median is reported)")
+    parser.add_argument("--database-url", default="", help="async SQLAlchemy URL to use instead of a temp SQLite file")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the workers")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode()
+
+
+def start_once(args: argparse.Namespace, preload: bool) -> dict:
+    """Start gunicorn, time it until every worker is ready, then stop it."""
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    port = free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_PRELOAD="true" if preload else "false",
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_ACCESS_LOG=os.path.join(workdir, "access.log"),
+        GUNICORN_ERROR_LOG=os.path.join(workdir, "error.log"),
+        DATABASE_URL=args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(workdir, "metrics"),
+        LEADERBOARD_SNAPSHOT_PATH=os.path.join(workdir, "leaderboard.snapshot"),
+        RATE_LIMIT_SHARED_PATH=os.path.join(workdir, "ratelimit.table"),
+    )
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn_config.py"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    first_response = None
+    all_ready = None
+    try:
+        while all_ready is None:
+            if process.poll() is not None:
+                raise SystemExit(f"gunicorn exited with {process.returncode}, see {workdir}/error.log")
+            if time.perf_counter() - start > args.timeout:
+                raise SystemExit(f"workers not ready after {args.timeout}s, see {workdir}/error.log")
+            try:
+                get(f"{base}/health")
+                if first_response is None:
+                    first_response = time.perf_counter() - start
+                count = READY_COUNT.search(get(f"{base}/metrics"))
+                if count and float(count.group(1)) >= args.workers:
+                    all_ready = time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.01)
+
+        metrics = get(f"{base}/metrics")
+        buckets = [(float(le), float(count)) for le, count in READY_BUCKETS.findall(metrics)]
+        openapi_start = time.perf_counter()
+        get(f"{base}/openapi.json")
+        openapi = time.perf_counter() - openapi_start
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Per-worker ready times only exist as histogram buckets across processes
+    def bucket_bound(fraction: float) -> float:
+        for bound, count in sorted(buckets):
+            if count >= fraction * args.workers:
+                return bound
+        return float("inf")
+
+    return {
+        "first response": first_response * 1000,
+        "all workers ready": all_ready * 1000,
+        "worker ready p50 (<=)": bucket_bound(0.5) * 1000,
+        "worker ready max (<=)": bucket_bound(1.0) * 1000,
+        "first /openapi.json": openapi * 1000,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    results = {}
+    for preload in (False, True):
+        runs = [start_once(args, preload) for _ in range(args.runs)]
+        results[preload] = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+    print(f"{args.workers} workers, median of {args.runs} start(s), milliseconds")
+    print(f"{'':<24}{'no preload':>12}{'preload':>12}")
+    for name in results[False]:
+        print(f"{name:<24}{results[False][name]:>12.0f}{results[True][name]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
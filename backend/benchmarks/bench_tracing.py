@@ -0,0 +1,192 @@
+"""Benchmark: cost of logging and request tracing on the event loop.
+
+Reports:
+
+- per log call: a JSON record written straight to a file by the calling
+  thread, through the queue handler (written by the writer thread), and
+  both again with a sink that takes 1 ms per record (a slow disk or a full
+  pipe), where the queue handler drops records instead of waiting
+- per call of a ``@traced`` method: outside a trace, inside a sampled
+  trace, and undecorated
+- per request: in-process GET /api/leaderboard/rank and GET
+  /api/leaderboard?limit=10 (cached) and POST /api/leaderboard, with
+  TRACE_SAMPLE_RATE 0, 0.01 and 1
+
+Usage:
+    uv run python benchmarks/bench_tracing.py
+    uv run python benchmarks/bench_tracing.py --requests 5000 --records 50000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+SAMPLE_RATES = (0.0, 0.01, 1.0)
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-tracing-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ["LOG_FILE"] = os.path.join(WORKDIR, "app.log")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from prometheus_client import REGISTRY  # noqa: E402
+from app.utils.json_logging import JsonFormatter, LogQueueHandler, LogQueueListener  # noqa: E402
+from app.utils.tracing import MAX_SPANS, Trace, TracingMiddleware, _trace, traced  # noqa: E402
+
+
+class SlowSink(logging.Handler):
+    """Handler that takes 1 ms per record."""
+
+    def emit(self, record):
+        time.sleep(0.001)
+
+
+def dropped_records() -> float:
+    return REGISTRY.get_sample_value("log_records_dropped_total") or 0
+
+
+def time_log_calls(handler: logging.Handler, records: int) -> float:
+    """Microseconds per ``logger.info`` call with ``handler`` attached."""
+    bench_logger = logging.getLogger(f"bench.{id(handler)}")
+    bench_logger.propagate = False
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.addHandler(handler)
+    start = time.perf_counter()
+    for index in range(records):
+        bench_logger.info("score added", extra={"player": "bench", "score": index})
+    elapsed = time.perf_counter() - start
+    bench_logger.removeHandler(handler)
+    return elapsed / records * 1_000_000
+
+
+def bench_logging(records: int) -> dict:
+    results = {}
+    path = os.path.join(WORKDIR, "bench.log")
+    sinks = {
+        "file": lambda: logging.FileHandler(path),
+        "1 ms sink": SlowSink,
+    }
+    for sink_name, make_sink in sinks.items():
+        sink = make_sink()
+        sink.setFormatter(JsonFormatter())
+        count = records if sink_name == "file" else min(records, 2000)
+        results[f"direct, {sink_name}"] = (time_log_calls(sink, count), 0)
+
+        handler = LogQueueHandler(queue.Queue(10000))
+        listener = LogQueueListener(handler.queue, make_sink())
+        listener.handlers[0].setFormatter(JsonFormatter())
+        listener.start()
+        dropped = dropped_records()
+        micros = time_log_calls(handler, records)
+        results[f"queued, {sink_name}"] = (micros, dropped_records() - dropped)
+        listener.stop()
+    return results
+
+
+class Plain:
+    @staticmethod
+    def method(value):
+        return value
+
+
+@traced
+class Traced:
+    @staticmethod
+    def method(value):
+        return value
+
+
+def bench_spans(number: int) -> dict:
+    """Nanoseconds per call of a static method, with and without @traced."""
+    def per_call(func) -> float:
+        return min(timeit.repeat(lambda: func(1), number=number, repeat=5)) / number * 1e9
+
+    def sampled_calls():
+        # A fresh trace every MAX_SPANS calls, so every call records its span
+        token = _trace.set(Trace())
+        for _ in range(MAX_SPANS):
+            Traced.method(1)
+        _trace.reset(token)
+
+    batches = max(number // MAX_SPANS, 1)
+    return {
+        "undecorated": per_call(Plain.method),
+        "@traced, not sampled": per_call(Traced.method),
+        "@traced, sampled": min(timeit.repeat(sampled_calls, number=batches, repeat=5)) / (batches * MAX_SPANS) * 1e9,
+    }
+
+
+def find_tracing(app) -> TracingMiddleware:
+    layer = app.middleware_stack
+    while not isinstance(layer, TracingMiddleware):
+        layer = layer.app
+    return layer
+
+
+async def bench_requests(requests: int, repeat: int) -> dict:
+    import httpx
+    from app.config import API_TOKEN
+    from app.main import app
+
+    headers = {"token": API_TOKEN}
+    endpoints = {
+        "GET rank": ("GET", "/api/leaderboard/rank?score=100", None),
+        "GET top 10": ("GET", "/api/leaderboard?limit=10", None),
+        "POST score": ("POST", "/api/leaderboard", {"name": "bench", "score": 100, "maxCombo": 3}),
+    }
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            await client.get("/api/leaderboard?limit=10", headers=headers)
+            tracing = find_tracing(app)
+            for name, (method, url, body) in endpoints.items():
+                for _ in range(requests // 10):  # Warm-up
+                    await client.request(method, url, json=body, headers=headers)
+                # Rates interleaved, so drift affects them alike
+                for _ in range(repeat):
+                    for rate in SAMPLE_RATES:
+                        tracing.sample_rate = rate
+                        start = time.perf_counter()
+                        for _ in range(requests):
+                            response = await client.request(method, url, json=body, headers=headers)
+                            response.raise_for_status()
+                        elapsed = (time.perf_counter() - start) / requests * 1_000_000
+                        results[(name, rate)] = min(results.get((name, rate), elapsed), elapsed)
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    logging_results = bench_logging(args.records)
+    print(f"log call, {args.records} records")
+    print(f"{'handler':<20}{'us/call':>10}{'dropped':>10}")
+    for name, (micros, dropped) in logging_results.items():
+        print(f"{name:<20}{micros:>10.1f}{dropped:>10.0f}")
+
+    print(f"\n{'call':<24}{'ns/call':>10}")
+    for name, nanos in bench_spans(args.calls).items():
+        print(f"{name:<24}{nanos:>10.0f}")
+
+    request_results = asyncio.run(bench_requests(args.requests, args.repeat))
+    print(f"\nrequest, in-process, best of {args.repeat} x {args.requests}")
+    print(f"{'endpoint':<14}{'rate 0 us':>12}{'rate 0.01 us':>14}{'rate 1 us':>12}")
+    for name in dict.fromkeys(name for name, _ in request_results):
+        row = [request_results[(name, rate)] for rate in SAMPLE_RATES]
+        print(f"{name:<14}{row[0]:>12.0f}{row[1]:>14.0f}{row[2]:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint and sample rate")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per sample rate (best is reported)")
+    parser.add_argument("--calls", type=int, default=200000, help="calls per traced-method timing run")
+    parser.add_argument("--records", type=int, default=20000, help="log calls per handler")
+    try:
+        main(parser.parse_args())
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
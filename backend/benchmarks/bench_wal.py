@@ -0,0 +1,114 @@
+"""Benchmark: score write latency through the write-ahead log vs. direct inserts.
+
+Runs against a throwaway SQLite database and WAL directory and reports, at
+``--concurrency`` concurrent submitters:
+
+- direct: ``DatabaseService.add_leaderboard_entry`` per score
+- wal: ``ScoreWal.append`` per score (write + fsync, drained in the background)
+- wal, database down: ``ScoreWal.append`` while another connection holds an
+  exclusive lock on the database for ``--outage`` seconds, so every drain
+  attempt fails as it would during a failover
+
+followed by the backlog left by the outage and how fast it drained once the
+database was back.
+
+Usage:
+    uv run python benchmarks/bench_wal.py
+    uv run python benchmarks/bench_wal.py --concurrency 64 --outage 5
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-wal-")
+DATABASE_PATH = os.path.join(WORKDIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.database import ensure_schema  # noqa: E402
+from app.services.database_service import DatabaseService  # noqa: E402
+from app.services.score_wal import ScoreWal  # noqa: E402
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+
+async def submit(write, concurrency: int, duration: float) -> list:
+    """Submit scores from ``concurrency`` tasks for ``duration`` seconds; return latencies."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def submitter(task: int):
+        count = 0
+        while time.perf_counter() < deadline:
+            entry = {"name": f"bench-{task}-{count}", "score": count, "maxCombo": 0, "timestamp": time.time() * 1000}
+            start = time.perf_counter()
+            await write(entry)
+            latencies.append(time.perf_counter() - start)
+            count += 1
+
+    await asyncio.gather(*(submitter(task) for task in range(concurrency)))
+    return latencies
+
+
+def hold_exclusive_lock(seconds: float, locked: threading.Event) -> None:
+    """Keep the database locked for writers, like a primary that is failing over."""
+    connection = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    connection.execute("BEGIN EXCLUSIVE")
+    locked.set()
+    time.sleep(seconds)
+    connection.execute("ROLLBACK")
+    connection.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    ensure_schema()
+    wal = ScoreWal(directory=os.path.join(WORKDIR, "wal"), retry_max=0.5)
+    await wal.start()
+    results = {}
+
+    results["direct"] = await submit(DatabaseService.add_leaderboard_entry, args.concurrency, args.duration)
+    results["wal"] = await submit(wal.append, args.concurrency, args.duration)
+    while wal.backlog():
+        await asyncio.sleep(0.01)
+
+    locked = threading.Event()
+    outage = threading.Thread(target=hold_exclusive_lock, args=(args.outage, locked))
+    outage.start()
+    locked.wait()
+    results["wal, database down"] = await submit(wal.append, args.concurrency, args.outage - 0.5)
+    backlog = wal.backlog()
+    await asyncio.to_thread(outage.join)
+    recovered = time.perf_counter()
+    while wal.backlog():
+        await asyncio.sleep(0.01)
+    drain_seconds = time.perf_counter() - recovered
+    await wal.close()
+
+    print(f"concurrency {args.concurrency}, SQLite, milliseconds")
+    print(f"{'path':<22}{'writes/s':>10}{'p50':>8}{'p99':>8}{'max':>8}")
+    for name, latencies in results.items():
+        seconds = args.outage - 0.5 if name == "wal, database down" else args.duration
+        print(
+            f"{name:<22}{len(latencies) / seconds:>10.0f}{percentile(latencies, 0.5):>8.2f}"
+            f"{percentile(latencies, 0.99):>8.2f}{max(latencies) * 1000:>8.2f}"
+        )
+    print(f"backlog after the outage: {backlog} scores, drained in {drain_seconds:.2f}s ({backlog / drain_seconds:.0f} scores/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent submitters")
+    parser.add_argument("--duration", type=float, default=3, help="seconds per healthy run")
+    parser.add_argument("--outage", type=float, default=3, help="seconds the database stays locked")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
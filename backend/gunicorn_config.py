@@ -1,11 +1,20 @@
 """Gunicorn configuration file for production deployment."""
+import glob
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 # Server socket
 bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
 backlog = 2048
 
+# Addresses of reverse proxies whose X-Forwarded-For / X-Forwarded-Proto
+# headers are trusted, so the app (rate limits, logs) sees the real client
+# IP instead of the proxy's. Comma-separated, "*" trusts any peer (only if
+# the port is unreachable except through the proxy)
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1,::1")
+
 # Worker processes
 workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
 worker_class = "uvicorn.workers.UvicornWorker"
@@ -13,6 +22,37 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Import the app once in the master and fork workers from it: workers skip the
+# framework imports and share the pre-built OpenAPI schema. Code changes then
+# need a full restart (HUP reloads workers from the already loaded app)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Directory of the files the workers share. Unless GUNICORN_RUNTIME_DIR
+# names one, each master creates its own (mode 0700) and removes it on exit,
+# so two deployments on one host never share these files and other local
+# users cannot plant or read them. Kept in the environment so a config
+# reload (HUP) keeps the same directory
+if not os.getenv("GUNICORN_RUNTIME_DIR"):
+    os.environ["GUNICORN_RUNTIME_DIR"] = tempfile.mkdtemp(prefix="shooting-game-")
+    os.environ["GUNICORN_RUNTIME_DIR_CREATED"] = "true"
+runtime_dir = os.environ["GUNICORN_RUNTIME_DIR"]
+os.makedirs(runtime_dir, mode=0o700, exist_ok=True)
+
+# Share the cached leaderboard between workers through a memory-mapped file so
+# MySQL read load does not grow with the worker count
+os.environ.setdefault("LEADERBOARD_SNAPSHOT_PATH", os.path.join(runtime_dir, "leaderboard.snapshot"))
+
+# Enforce rate limits per host rather than per worker
+os.environ.setdefault("RATE_LIMIT_SHARED_PATH", os.path.join(runtime_dir, "ratelimit.table"))
+
+# Open a full pool in every worker before it takes traffic
+os.environ.setdefault("DB_POOL_WARMUP", os.getenv("DB_POOL_SIZE", "5"))
+
+# Aggregate Prometheus metrics of all workers for GET /metrics
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(runtime_dir, "metrics"))
+# Must exist before a preloaded app defines its metrics (emptied in on_starting)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], mode=0o700, exist_ok=True)
+
 # Logging
 accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")  # "-" means stdout
 errorlog = os.getenv("GUNICORN_ERROR_LOG", "-")  # "-" means stderr
@@ -34,3 +74,66 @@ tmp_upload_dir = None
 # keyfile = None
 # certfile = None
 
+
+def on_starting(server):
+    """Prepare shared state once in the master, before any worker starts.
+
+    Removes the metric files of a previous run and applies pending schema
+    migrations (unless DB_MIGRATE_ON_STARTUP=false); workers are forked
+    from the master and see them done, so they skip the step. With
+    preload_app it also builds the OpenAPI schema, so workers inherit it
+    instead of each walking the routes.
+    """
+    import sys
+    # Only prometheus_client's own files: the directory may be shared with
+    # something else if it was configured explicitly
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.unlink(path)
+
+    if os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true":
+        from app.database import engine, ensure_schema
+        try:
+            applied = ensure_schema()
+            server.log.info(f"Applied {len(applied)} migrations: {', '.join(applied) or 'schema already up to date'}")
+        except Exception as e:
+            server.log.error(f"Failed to migrate database, workers will retry: {str(e)}")
+        engine.dispose()
+
+    main = sys.modules.get("app.main")
+    if main is not None:
+        main.app.openapi()
+
+
+def on_exit(server):
+    """Remove the runtime directory if this master created it."""
+    if os.getenv("GUNICORN_RUNTIME_DIR_CREATED") == "true":
+        shutil.rmtree(runtime_dir, ignore_errors=True)
+
+
+def child_exit(server, worker):
+    """Drop the live-gauge samples of a worker that exited."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    """Per-worker setup right after fork.
+
+    With preload_app the master has already imported the app and may hold
+    pooled connections; drop them in the child so workers never share a
+    socket. Each worker then warms its own pool on its event loop during
+    application startup (DB_POOL_WARMUP), and its startup clock restarts
+    at the fork.
+    """
+    import sys
+    database = sys.modules.get("app.database")
+    if database is not None:
+        database.reset_after_fork()
+    startup = sys.modules.get("app.utils.startup")
+    if startup is not None:
+        startup.startup_timer.restart()
+    server.log.info(
+        f"Worker {worker.pid}: up to "
+        f"{int(os.getenv('DB_POOL_SIZE', '5')) + int(os.getenv('DB_MAX_OVERFLOW', '10'))} "
+        f"database connections"
+    )
@@ -1,6 +1,5 @@
 """Database initialization script."""
-from app.database import init_db, engine
-from app.models.db_models import Base
+from app.database import init_db
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -8,11 +7,11 @@ logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
     try:
-        logger.info("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully!")
+        logger.info("Applying database migrations...")
+        applied = init_db()
+        logger.info(f"Applied {len(applied)} migrations: {', '.join(applied) or 'schema already up to date'}")
     except Exception as e:
-        logger.error(f"Failed to create database tables: {str(e)}")
+        logger.error(f"Failed to migrate database: {str(e)}")
         raise
 
 
@@ -0,0 +1,55 @@
+"""Shared fixtures: a throwaway SQLite database and an in-process API client.
+
+The environment is set before any ``app`` module is imported, since
+``app.config`` reads it once at import time.
+"""
+import os
+import shutil
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SCORE_WAL_ENABLED"] = "false"
+os.environ["SCORE_WAL_DIR"] = os.path.join(WORKDIR, "score-wal")
+os.environ["LEADERBOARD_SNAPSHOT_PATH"] = ""
+os.environ["LOG_FORMAT"] = "text"
+os.environ["TRACE_SAMPLE_RATE"] = "0"
+
+import pytest  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient running the app's lifespan once for the whole session."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the app's event loop (where its pools live)."""
+    return client.portal.call
+
+
+@pytest.fixture
+def headers():
+    from app.config import API_TOKEN
+    return {"token": API_TOKEN}
+
+
+@pytest.fixture
+def count_rows():
+    """Return a function counting the rows of the ``leaderboard`` table."""
+    from app.database import engine
+    from app.models.db_models import LeaderboardEntryDB
+
+    def count() -> int:
+        with engine.connect() as connection:
+            return connection.scalar(select(func.count()).select_from(LeaderboardEntryDB))
+    return count
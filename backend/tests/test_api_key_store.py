@@ -0,0 +1,49 @@
+"""API key store: a key issued right after being rejected is accepted promptly."""
+import asyncio
+
+from app.services.api_key_store import ApiKeyStore
+
+
+def test_key_issued_after_a_miss(tmp_path):
+    key_file = tmp_path / "keys.txt"
+    key_file.write_text("# no keys yet\n")
+
+    async def scenario():
+        store = ApiKeyStore(ttl=3600, miss_reload_interval=0.05, key_file=str(key_file), from_db=False)
+        assert store.lookup("fresh-key") is None
+        key_file.write_text("partner:fresh-key\n")
+        # Still rejected from the negative cache, without another reload
+        assert store.lookup("fresh-key") is None
+        assert store.negative_hits == 1
+
+        await asyncio.sleep(0.06)
+        assert store.lookup("fresh-key") is None  # checked again, triggers a reload
+        await store._reload_task
+        key = store.lookup("fresh-key")
+        assert key is not None and key.client_id == "partner"
+
+    asyncio.run(scenario())
+
+
+def test_repeated_bad_token_is_cached(tmp_path):
+    async def scenario():
+        store = ApiKeyStore(ttl=3600, miss_reload_interval=60, key_file="", from_db=False)
+        for _ in range(100):
+            assert store.lookup("bad-token") is None
+        assert (store.misses, store.negative_hits) == (1, 99)
+
+    asyncio.run(scenario())
+
+
+def test_rejections_are_logged_as_a_count(caplog):
+    store = ApiKeyStore(ttl=3600, miss_reload_interval=60, key_file="", from_db=False, log_interval=3600)
+    with caplog.at_level("WARNING", logger="app.services.api_key_store"):
+        for attempt in range(50):
+            assert store.lookup(f"secret-token-{attempt % 5}") is None
+    assert len(caplog.records) == 1
+    assert "secret" not in caplog.text
+
+    store.log_interval = 0
+    with caplog.at_level("WARNING", logger="app.services.api_key_store"):
+        store.lookup("secret-token-0")
+    assert "Rejected 50 API token(s)" in caplog.records[-1].getMessage()
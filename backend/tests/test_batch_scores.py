@@ -0,0 +1,47 @@
+"""POST /api/leaderboard/batch."""
+import json
+
+import pytest
+
+from app.controllers import leaderboard_controller
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(leaderboard_controller, "SCORE_BULK_MAX_ITEMS", 3)
+    monkeypatch.setattr(leaderboard_controller, "SCORE_BULK_CHUNK_SIZE", 2)
+
+
+def items(count: int) -> list:
+    return [{"name": f"batch-{index}", "score": index, "maxCombo": 0} for index in range(count)]
+
+
+def test_batch_inserts_valid_items_and_reports_invalid_ones(client, headers, count_rows, small_batches):
+    before = count_rows()
+    body = items(2) + [{"name": "", "score": -1, "maxCombo": 0}]
+    response = client.post("/api/leaderboard/batch", json=body, headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert [item["index"] for item in result["results"]] == [0, 1, 2]
+    assert result["results"][2]["error"]
+    assert count_rows() == before + 2
+
+
+def test_json_array_over_limit_writes_nothing(client, headers, count_rows, small_batches):
+    before = count_rows()
+    response = client.post("/api/leaderboard/batch", json=items(4), headers=headers)
+    assert response.status_code == 413
+    assert count_rows() == before
+
+
+def test_ndjson_over_limit_writes_nothing(client, headers, count_rows, small_batches):
+    before = count_rows()
+    body = "\n".join(json.dumps(item) for item in items(4))
+    response = client.post(
+        "/api/leaderboard/batch",
+        content=body,
+        headers={**headers, "content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+    assert count_rows() == before
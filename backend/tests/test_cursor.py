@@ -0,0 +1,75 @@
+"""Keyset cursors: encoding, and paging through the leaderboard with them."""
+import pytest
+from sqlalchemy import desc, select, union_all
+
+from app.database import engine
+from app.models.db_models import LeaderboardArchiveDB, LeaderboardEntryDB
+from app.services.leaderboard_cache import leaderboard_caches
+from app.utils.cursor import decode_cursor, encode_cursor
+from tests.test_player_best import archive, post
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(1200, 987654)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [1200, 987654]
+    assert decode_cursor(encode_cursor("ünïcode", 0), 2) == ["ünïcode", 0]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode_cursor(1200),
+    encode_cursor(1, 2, 3),
+    "eyJzY29yZSI6MX0",  # {"score":1}
+    "",
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def all_pages(client, headers, limit: int) -> list:
+    """Ids of every entry, following nextCursor from the first page."""
+    leaderboard_caches["all"].invalidate()
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/leaderboard", params=params, headers=headers).json()
+        seen += [int(entry["id"]) for entry in page["entries"]]
+        cursor = page.get("nextCursor")
+        if cursor is None:
+            return seen
+
+
+def ranked_ids() -> list:
+    """Ids of both tables in (score DESC, id DESC) order."""
+    merged = union_all(
+        select(LeaderboardEntryDB.id, LeaderboardEntryDB.score),
+        select(LeaderboardArchiveDB.id, LeaderboardArchiveDB.score),
+    ).subquery()
+    with engine.connect() as connection:
+        return connection.execute(
+            select(merged.c.id).order_by(desc(merged.c.score), desc(merged.c.id))
+        ).scalars().all()
+
+
+def test_pages_follow_score_then_id(client, headers):
+    # Ties on score must keep a stable order across page boundaries
+    for score in (40, 40, 40, 40, 15, 40, 15):
+        post(client, headers, "paged-player", score)
+    assert all_pages(client, headers, 3) == ranked_ids()
+
+
+def test_deep_pages_include_archived_entries(client, headers):
+    # Archived entries are outside the top K, so past the first page
+    ids = [int(post(client, headers, "archived-pages", 0)) for _ in range(3)]
+    archive(client, headers, ids[:2])
+    seen = all_pages(client, headers, 5)
+    assert set(ids) <= set(seen)
+    assert seen == ranked_ids()
+
+
+def test_malformed_cursor_is_rejected(client, headers):
+    response = client.get("/api/leaderboard", params={"cursor": "bad!"}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+"""ETag / If-None-Match on GET /api/leaderboard."""
+from app.services.leaderboard_cache import leaderboard_caches
+
+
+def get(client, headers, etag=None, query="limit=10"):
+    extra = {"if-none-match": etag} if etag else {}
+    return client.get(f"/api/leaderboard?{query}", headers={**headers, **extra})
+
+
+def test_etag_survives_reload_and_cold_cache(client, headers):
+    client.post("/api/leaderboard", json={"name": "etag", "score": 10**6, "maxCombo": 0}, headers=headers)
+    leaderboard_caches["all"].invalidate()
+
+    cold = get(client, headers)
+    assert cold.status_code == 200
+    etag = cold.headers["etag"]
+    warm = get(client, headers)
+    assert warm.headers["etag"] == etag
+    assert get(client, headers, etag).status_code == 304
+
+    # A reload that finds nothing new keeps the ETag, and a cold cache
+    # still answers the revalidation with 304
+    leaderboard_caches["all"].invalidate()
+    revalidated = get(client, headers, etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_etag_changes_with_the_page(client, headers):
+    etag = get(client, headers).headers["etag"]
+    client.post("/api/leaderboard", json={"name": "etag", "score": 10**6 + 1, "maxCombo": 0}, headers=headers)
+    response = get(client, headers, etag)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert get(client, headers, response.headers["etag"]).status_code == 304
+
+
+def test_cursor_pages_have_an_etag(client, headers):
+    first = get(client, headers, query="limit=1").json()
+    page = get(client, headers, query=f"limit=1&cursor={first['nextCursor']}")
+    assert page.status_code == 200
+    assert get(client, headers, page.headers["etag"], query=f"limit=1&cursor={first['nextCursor']}").status_code == 304
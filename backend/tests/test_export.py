@@ -0,0 +1,48 @@
+"""Leaderboard export merges archived entries in by id."""
+import orjson
+
+from app.services.leaderboard_export import leaderboard_exporter
+from tests.test_player_best import archive, post
+
+
+def export(client, headers, after: int, **params) -> list:
+    response = client.get("/api/leaderboard/export", params={"after": after, **params}, headers=headers)
+    assert response.status_code == 200
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_export_includes_archive(client, headers, monkeypatch):
+    monkeypatch.setattr(leaderboard_exporter, "chunk_rows", 2)
+    name = "exported-player"
+    ids = [int(post(client, headers, name, score)) for score in range(5)]
+    archive(client, headers, [ids[0], ids[2], ids[3]])
+    after = ids[0] - 1
+
+    rows = [row for row in export(client, headers, after) if row["name"] == name]
+    assert [row["id"] for row in rows] == ids
+    assert [row["score"] for row in rows] == list(range(5))
+
+    rows = [row for row in export(client, headers, after, includeArchive="false") if row["name"] == name]
+    assert [row["id"] for row in rows] == [ids[1], ids[4]]
+
+    # Resuming in the middle of the archived range
+    rows = [row for row in export(client, headers, ids[2]) if row["name"] == name]
+    assert [row["id"] for row in rows] == ids[3:]
+
+
+def test_export_never_iterated_frees_its_slot(client, run, monkeypatch):
+    monkeypatch.setattr(leaderboard_exporter, "max_concurrent", 2)
+
+    async def scenario():
+        for _ in range(3):
+            exports = [leaderboard_exporter.open("ndjson") for _ in range(2)]
+            for export in exports:
+                await export.chunks.aclose()
+        assert leaderboard_exporter.active == 0
+
+        export = leaderboard_exporter.open("ndjson")
+        async for _ in export.chunks:
+            assert leaderboard_exporter.active == 1
+        assert leaderboard_exporter.active == 0
+
+    run(scenario)
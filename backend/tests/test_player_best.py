@@ -0,0 +1,51 @@
+"""player_best stays consistent with the history, archived games included."""
+from sqlalchemy import delete, insert, select
+
+from app.database import engine
+from app.models.db_models import LeaderboardArchiveDB, LeaderboardEntryDB
+from app.services.database_service import DatabaseService
+
+
+def post(client, headers, name: str, score: int, combo: int = 0) -> str:
+    response = client.post("/api/leaderboard", json={"name": name, "score": score, "maxCombo": combo}, headers=headers)
+    return response.json()["id"]
+
+
+def archive(client, headers, entry_ids: list) -> None:
+    """Move entries to leaderboard_archive, as archive_leaderboard.py does.
+
+    A newer entry is added first: archived rows are old, and SQLite would
+    otherwise hand out the highest archived id again.
+    """
+    post(client, headers, "newer-player", 1)
+    table = LeaderboardEntryDB.__table__
+    columns = [table.c.id, table.c.name, table.c.score, table.c.max_combo, table.c.timestamp, table.c.created_at]
+    with engine.begin() as connection:
+        connection.execute(
+            insert(LeaderboardArchiveDB.__table__).from_select(
+                [column.name for column in columns], select(*columns).where(table.c.id.in_(entry_ids))
+            )
+        )
+        connection.execute(delete(table).where(table.c.id.in_(entry_ids)))
+
+
+def test_delete_keeps_archived_history(client, headers, run):
+    name = "archived-player"
+    ids = [post(client, headers, name, score, combo) for score, combo in ((500, 9), (20, 1), (10, 2))]
+    archive(client, headers, [int(ids[0]), int(ids[1])])
+
+    assert run(DatabaseService.delete_entry, int(ids[2]))
+    stats = client.get(f"/api/players/{name}", headers=headers).json()
+    assert (stats["bestScore"], stats["bestCombo"], stats["games"], stats["bestEntryId"]) == (500, 9, 2, ids[0])
+
+
+def test_delete_archived_entry(client, headers, run):
+    name = "archived-best"
+    ids = [post(client, headers, name, score) for score in (700, 30)]
+    archive(client, headers, [int(ids[0])])
+
+    assert run(DatabaseService.delete_entry, int(ids[0]))
+    assert run(DatabaseService.get_entry_by_id, int(ids[0])) is None
+    stats = client.get(f"/api/players/{name}", headers=headers).json()
+    assert (stats["bestScore"], stats["games"]) == (30, 1)
+    assert not run(DatabaseService.delete_entry, int(ids[0]))
@@ -0,0 +1,23 @@
+"""Pool checkouts and occupancy reach Prometheus, not just /health/pool."""
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_checkouts_and_occupancy_are_exported(client, run):
+    before = sample("db_pool_checkout_wait_seconds_count", result="acquired")
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+            return sample("db_pool_connections_in_use")
+
+    assert run(scenario) >= 1
+    assert sample("db_pool_checkout_wait_seconds_count", result="acquired") > before
+    assert sample("db_pool_connections_in_use") == 0
+    assert sample("db_pool_overflow_connections") == 0
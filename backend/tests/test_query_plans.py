@@ -0,0 +1,94 @@
+"""EXPLAIN every hot read query: no full table scans, no unexpected sorts.
+
+The DatabaseService read paths run against the test database while the SQL
+they send is recorded; each statement is then EXPLAINed with its real
+parameters. Run this after changing a query or an index.
+"""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.config import API_TOKEN
+from app.database import Base, async_engine, engine
+from app.services.database_service import DatabaseService
+from app.utils.windows import window_start
+from tests.test_player_best import post
+
+# name: (query given the seeded rows, whether sorting the matched rows is expected)
+QUERIES = {
+    "top 100": (lambda rows: DatabaseService._fetch_leaderboard(100), False),
+    "keyset page": (lambda rows: DatabaseService.get_leaderboard_after(rows["score"], rows["id"], 50), False),
+    # Window pages sort the window's rows; the index bounds how many
+    "day window top 100": (lambda rows: DatabaseService._fetch_leaderboard(100, window_start("day")), True),
+    "week window keyset page": (
+        lambda rows: DatabaseService.get_leaderboard_after(rows["score"], rows["id"], 50, window_start("week")),
+        True,
+    ),
+    "players top 100": (lambda rows: DatabaseService.get_player_leaderboard(100), False),
+    "players keyset page": (
+        lambda rows: DatabaseService.get_player_leaderboard(50, (rows["player_score"], rows["player_id"])),
+        False,
+    ),
+    "player stats": (lambda rows: DatabaseService.get_player_stats(rows["name"]), False),
+    "entry by id": (lambda rows: DatabaseService.get_entry_by_id(rows["id"]), False),
+    "rank index counts": (lambda rows: DatabaseService.get_score_counts(), False),
+    "rank index catch-up": (lambda rows: DatabaseService.get_scores_since(rows["id"] - 10), False),
+}
+
+
+def plan_problems(plan: list, allow_sort: bool) -> list:
+    """List what is wrong with one SQLite query plan (empty if the plan is fine).
+
+    Scanning or sorting the rows of a subquery is fine: the subqueries are
+    the per-table pages of a merge, each already limited.
+    """
+    tables = set(Base.metadata.tables)
+    scans = [(parent, match.group(1)) for _, parent, _, detail in plan if (match := re.fullmatch(r"SCAN (\w+)", detail))]
+    merged = {parent for parent, name in scans if name not in tables}
+    problems = [f"full scan: SCAN {name}" for _, name in scans if name in tables]
+    for _, parent, _, detail in plan:
+        if "TEMP B-TREE" in detail and not allow_sort and parent not in merged:
+            problems.append(f"sort: {detail}")
+    return problems
+
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    """Entries with tied scores and repeat players, all inside today's window."""
+    headers = {"token": API_TOKEN}
+    ids = [post(client, headers, f"plan-{index % 7}", 100 * (index % 5), index % 3) for index in range(30)]
+    top = client.portal.call(DatabaseService.get_player_leaderboard, 5)
+    return {
+        "id": int(ids[-1]),
+        "score": 100 * (29 % 5),
+        "name": "plan-1",
+        "player_score": top[-1]["score"],
+        "player_id": int(top[-1]["id"]),
+    }
+
+
+@pytest.fixture
+def captured():
+    """SELECT statements sent to the database while the test runs."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_plan(name, seeded, captured, run):
+    query, allow_sort = QUERIES[name]
+    run(query, seeded)
+    assert captured, "query sent no SELECT"
+
+    with engine.connect() as connection:
+        for statement, parameters in captured:
+            plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            assert not plan_problems(plan, allow_sort), "\n".join(str(row) for row in plan)
@@ -0,0 +1,181 @@
+"""ScoreHistogram and RankIndex against a plain sorted list of scores."""
+import asyncio
+import bisect
+import random
+from array import array
+
+import pytest
+
+from app.services.rank_index import RankIndex, ScoreHistogram, _fenwick_from_raw
+
+
+def rank_in(scores: list, score: int) -> int:
+    return len(scores) - bisect.bisect_right(scores, score) + 1
+
+
+def assert_ranks(histogram: ScoreHistogram, scores: list, probes) -> None:
+    scores = sorted(scores)
+    assert histogram.total == len(scores)
+    for score in probes:
+        assert histogram.count_above(score) + 1 == rank_in(scores, score), score
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 8, 9, 1000, 4097])
+def test_fenwick_from_raw(size):
+    rng = random.Random(size)
+    raw = array("q", [0] + [rng.randrange(5) for _ in range(size)])
+    tree = _fenwick_from_raw(array("q", raw))
+    for index in range(1, size + 1):
+        prefix, position = 0, index
+        while position > 0:
+            prefix += tree[position]
+            position -= position & -position
+        assert prefix == sum(raw[1:index + 1])
+
+
+def test_add_matches_sorted_list():
+    rng = random.Random(1)
+    histogram = ScoreHistogram(max_score=5000)
+    scores = []
+    for _ in range(3000):
+        score = rng.choice([rng.randrange(100), rng.randrange(5000), rng.randrange(5001, 10**9)])
+        histogram.add(score)
+        scores.append(score)
+    for score in rng.sample(scores, 500):
+        histogram.add(score, -1)
+        scores.remove(score)
+    assert_ranks(histogram, scores, [-1, 0, 50, 4999, 5000, 5001, 10**9] + rng.sample(scores, 200))
+
+
+def test_overflow_bulk_add_and_remove():
+    histogram = ScoreHistogram(max_score=10)
+    histogram.add(50, 3)
+    histogram.add(20, 2)
+    histogram.add(50, -2)
+    histogram.add(50, -5)  # More than are left
+    histogram.add(30, -1)  # Never added
+    assert_ranks(histogram, [20, 20], [0, 20, 30, 50])
+
+
+def test_from_counts_matches_add():
+    rng = random.Random(2)
+    counts = [(rng.randrange(20000), rng.randrange(1, 4)) for _ in range(2000)]
+    counts += [(rng.randrange(20001, 10**6), 1) for _ in range(50)]
+    counts += counts[:100]  # Same score from the hot and the archive table
+    histogram = ScoreHistogram.from_counts(counts, max_score=20000)
+    scores = [score for score, count in counts for _ in range(count)]
+    assert_ranks(histogram, scores, [0, 19999, 20000, 20001] + rng.sample(scores, 300))
+
+    # Growing past the built size keeps every count
+    histogram.add(19999)
+    assert_ranks(histogram, scores + [19999], [0, 19998, 19999, 20000])
+
+
+def test_from_counts_empty():
+    assert ScoreHistogram.from_counts([]).count_above(0) == 0
+
+
+@pytest.mark.parametrize("max_score", [10**6, 1500])
+def test_grow_keeps_counts(max_score):
+    rng = random.Random(3)
+    histogram = ScoreHistogram(max_score=max_score)
+    scores = []
+    for limit in (3, 10, 1000, 1200, 100000, 10**6):
+        for _ in range(200):
+            score = rng.randrange(limit)
+            histogram.add(score)
+            scores.append(score)
+        assert_ranks(histogram, scores, rng.sample(scores, 50) + [0, limit])
+
+
+def test_periodic_rebuild_runs_in_background():
+    async def scenario():
+        index = RankIndex(max_score=1000, sync_interval=0, rebuild_interval=0)
+        table = [(5, 1), (10, 2)]
+        release = asyncio.Event()
+        loads = 0
+
+        async def load_counts():
+            nonlocal loads
+            loads += 1
+            if loads > 1:
+                await release.wait()
+            return list(table), 3
+
+        async def load_since(last_id):
+            return []
+
+        await index.ensure_fresh(load_counts, load_since)
+        assert (index.total, index.rank(5)) == (3, 3)
+
+        table.append((7, 1))
+        # A due rebuild must not hold up the lookup that finds it due
+        await asyncio.wait_for(index.ensure_fresh(load_counts, load_since), 1)
+        assert index.total == 3
+        release.set()
+        await index._rebuild_task
+        assert (index.total, index.rank(5)) == (4, 4)
+        await index.close()
+
+    asyncio.run(scenario())
+
+
+def sync_scenario(table: list, **kwargs):
+    """RankIndex built over ``table`` rows of (id, score), catching up with it on every call."""
+    index = RankIndex(max_score=1000, sync_interval=0, rebuild_interval=3600, **kwargs)
+
+    async def load_counts():
+        return [(score, 1) for _, score in table], max((entry_id for entry_id, _ in table), default=0)
+
+    async def load_since(last_id):
+        return sorted((entry_id, score) for entry_id, score in table if entry_id > last_id)
+
+    def sync():
+        asyncio.run(index.ensure_fresh(load_counts, load_since))
+
+    sync()
+    return index, sync
+
+
+def test_local_insert_seen_by_catch_up_before_it_is_recorded():
+    table = [(1, 10)]
+    index, sync = sync_scenario(table)
+    index.begin_inserts([2])
+    table.append((2, 50))  # Committed; the inserting request has not resumed yet
+    sync()
+    index.record_insert(2, 50)
+    sync()
+    assert (index.total, index.rank(10)) == (2, 2)
+
+
+def test_lower_id_committing_later_is_counted():
+    table = [(1, 10), (3, 30)]
+    index, sync = sync_scenario(table)
+    table.append((5, 50))  # Id 4 is still committing
+    sync()
+    assert index.total == 3
+    table.append((4, 40))
+    sync()
+    assert (index.total, index.rank(10)) == (4, 4)
+    assert (index._last_id, index._seen) == (5, set())
+
+
+def test_gap_is_skipped_after_gap_interval():
+    table = [(1, 10)]
+    index, sync = sync_scenario(table, gap_interval=0)
+    table.append((3, 30))  # Id 2 was rolled back
+    sync()
+    assert index._last_id == 1
+    sync()
+    assert (index.total, index._last_id, index._seen) == (2, 3, set())
+
+
+def test_cancelled_insert_is_not_counted():
+    table = [(1, 10)]
+    index, sync = sync_scenario(table)
+    index.begin_inserts([2])
+    index.cancel_inserts([2])
+    index.record_insert(2, 99)
+    table.append((2, 20))  # Id handed out again by another worker
+    sync()
+    assert (index.total, index.rank(20)) == (2, 1)
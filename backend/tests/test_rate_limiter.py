@@ -0,0 +1,18 @@
+"""Shared rate limit table file handling."""
+import errno
+import os
+
+import pytest
+
+from app.services.rate_limiter import SharedBuckets
+
+
+def test_table_is_not_opened_through_a_symlink(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.write_bytes(b"keep me")
+    os.symlink(target, tmp_path / "ratelimit.table")
+
+    with pytest.raises(OSError) as raised:
+        SharedBuckets(str(tmp_path / "ratelimit.table"), 64, 60).take("client", 0.0, 1.0, 1.0)
+    assert raised.value.errno == errno.ELOOP
+    assert target.read_bytes() == b"keep me"
@@ -0,0 +1,56 @@
+"""Replay validator: the whole-column ``replay`` against the event loop ``replay_loop``."""
+import random
+
+import pytest
+
+from app.services.replay_validator import ReplayError, ReplayResult, replay, replay_loop
+
+
+def make_game(rng: random.Random, duration_ms: int, spacing: tuple) -> tuple:
+    """Random valid event log: (shots, hits, hit_times, swishes)."""
+    shots = []
+    time = rng.randint(*spacing)
+    while time < duration_ms:
+        shots.append(time)
+        time += rng.randint(*spacing)
+    made = sorted(
+        (shot + rng.randint(100, 3000), index, rng.random() < 0.3)
+        for index, shot in enumerate(shots)
+        if rng.random() < 0.6
+    )
+    return shots, [index for _, index, _ in made], [hit_time for hit_time, _, _ in made], [swish for _, _, swish in made]
+
+
+def test_known_game():
+    # Two scores 1 s apart (combo 2, one a swish), then one after a 4 s pause
+    result = replay([0, 500, 4000, 4200], [0, 1, 2], [800, 1800, 5800], [False, True, False], 6000)
+    assert result == ReplayResult(score=2 + (2 + 1 + 1) + 2, max_combo=2, shots_taken=4, shots_made=3)
+
+
+@pytest.mark.parametrize("spacing", [(60, 400), (300, 1500), (1000, 4000)])
+def test_replay_matches_loop(spacing):
+    rng = random.Random(sum(spacing))
+    for _ in range(300):
+        events = make_game(rng, rng.choice((0, 5_000, 60_000)), spacing)
+        assert replay(*events, 70_000) == replay_loop(*events)
+
+
+def test_no_scores():
+    assert replay([100, 900], [], [], [], 1000) == replay_loop([100, 900], [], [], []) == ReplayResult(0, 0, 2, 0)
+
+
+@pytest.mark.parametrize("events, elapsed", [
+    (([100], [0], [500, 600], [False]), 1000),  # column lengths differ
+    (([100], [0, 0], [500, 600], [False, False]), 1000),  # more scores than shots
+    (([-5], [], [], []), 1000),  # negative time
+    (([100, 120], [], [], []), 1000),  # shots too close together
+    (([100], [0], [120], [False]), 5000),  # flight too short
+    (([100, 900], [0, 0], [500, 1000], [False, False]), 5000),  # ball scores twice
+    (([100], [1], [500], [False]), 5000),  # unknown shot
+    (([100], [0], [4200], [False]), 5000),  # ball already gone
+    (([100, 900], [1, 0], [1300, 1200], [False, False]), 5000),  # scores out of time order
+    (([100], [0], [500], [False]), -2000),  # later than the session allows
+])
+def test_rejected_logs(events, elapsed):
+    with pytest.raises(ReplayError):
+        replay(*events, elapsed)
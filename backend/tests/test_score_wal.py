@@ -0,0 +1,241 @@
+"""Score write-ahead log: record parsing, checkpoints, adoption and quarantine."""
+import asyncio
+import fcntl
+import os
+import threading
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import func, select
+
+from app.database import engine
+from app.models.db_models import LeaderboardEntryDB, ScoreWalCheckpointDB
+from app.services.database_service import DatabaseService
+from app.controllers import leaderboard_controller
+from app.services.score_wal import DEAD_LETTER_SUFFIX, FILE_HEADER, RECORD_HEADER, SEGMENT_SUFFIX, ScoreWal
+
+
+@pytest.fixture
+def player():
+    """Name prefix unique to the test, to count its rows."""
+    return f"wal-{uuid.uuid4().hex[:8]}"
+
+
+def count_rows(prefix: str) -> int:
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(func.count()).select_from(LeaderboardEntryDB).where(LeaderboardEntryDB.name.like(f"{prefix}%"))
+        )
+
+
+def checkpoint_exists(segment: str) -> bool:
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(func.count()).select_from(ScoreWalCheckpointDB).where(ScoreWalCheckpointDB.segment == segment)
+        ) > 0
+
+
+def entry(name: str, score: int = 1) -> dict:
+    return {"name": name, "score": score, "maxCombo": 0, "timestamp": 1_700_000_000_000}
+
+
+async def drain_all(*wals: ScoreWal, passes: int = 50) -> None:
+    """Drain until every log is empty, ignoring failed passes."""
+    for _ in range(passes):
+        if not any(wal.backlog() for wal in wals):
+            return
+        await asyncio.gather(*(wal.drain() for wal in wals), return_exceptions=True)
+    raise AssertionError(f"backlog left: {[wal.backlog() for wal in wals]}")
+
+
+def crash(wal: ScoreWal) -> None:
+    """Drop a worker's segments without draining them, as if it was killed."""
+    for segment in wal._segments:
+        segment.close()
+    wal._segments = []
+    wal._active = wal._spare = None
+
+
+def test_records_stop_at_torn_record(tmp_path):
+    wal = ScoreWal(directory=str(tmp_path))
+
+    async def scenario():
+        for score in range(3):
+            await wal.append(entry("torn", score))
+
+    asyncio.run(scenario())
+    segment = wal._active
+    records = list(ScoreWal._records(segment.mm, FILE_HEADER.size, segment.end))
+    assert [orjson.loads(payload)["score"] for payload, _ in records] == [0, 1, 2]
+    assert records[-1][1] == segment.end
+
+    # Flip a byte of the last payload: its CRC no longer matches
+    segment.mm[segment.end - 1] ^= 0xFF
+    assert len(list(ScoreWal._records(segment.mm, FILE_HEADER.size, segment.end))) == 2
+    # A header whose length runs past the limit is not a record either
+    RECORD_HEADER.pack_into(segment.mm, records[0][1], 10_000, 0)
+    assert len(list(ScoreWal._records(segment.mm, FILE_HEADER.size, segment.end))) == 1
+    crash(wal)
+
+
+def test_crash_and_adopt(tmp_path, client, run, player):
+    async def scenario():
+        first = ScoreWal(directory=str(tmp_path), batch_size=2)
+        first._open()
+        for score in range(5):
+            await first.append(entry(player, score))
+        assert await first.drain() == 2
+        segment = first._segments[0]
+        # A record cut short by the crash, after the last acknowledged one
+        RECORD_HEADER.pack_into(segment.mm, segment.end, 20, 12345)
+        crash(first)
+
+        second = ScoreWal(directory=str(tmp_path), batch_size=2)
+        second._open()
+        await second._adopt()
+        assert second.backlog() == 3
+        await drain_all(second)
+        return segment.name
+
+    name = run(scenario)
+    assert count_rows(player) == 5
+    assert not os.path.exists(os.path.join(tmp_path, name))
+    assert not checkpoint_exists(name)
+
+
+def test_concurrent_drainers_insert_each_record_once(tmp_path, client, run, player):
+    async def scenario():
+        owner = ScoreWal(directory=str(tmp_path), batch_size=2)
+        owner._open()
+        for score in range(7):
+            await owner.append(entry(player, score))
+        segment = owner._segments[0]
+        segment.sealed = True
+        # Let another worker adopt the segment while its owner still drains it
+        fcntl.flock(segment.fd, fcntl.LOCK_UN)
+        other = ScoreWal(directory=str(tmp_path), batch_size=3)
+        other._open()
+        await other._adopt()
+        assert other.backlog() == 7
+        await drain_all(owner, other)
+
+    run(scenario)
+    assert count_rows(player) == 7
+
+
+def test_checkpoint_races(client, run, player):
+    segment = f"{player}{SEGMENT_SUFFIX}"
+    entries = [entry(player, score) for score in range(3)]
+
+    assert len(run(DatabaseService.add_wal_entries, segment, None, 100, entries)) == 3
+    # Same range again, first drain or not: already done elsewhere
+    assert run(DatabaseService.add_wal_entries, segment, None, 100, entries) is None
+    assert run(DatabaseService.add_wal_entries, segment, FILE_HEADER.size, 100, entries) is None
+    assert len(run(DatabaseService.add_wal_entries, segment, 100, 200, entries[:1])) == 1
+    assert count_rows(player) == 4
+
+
+def test_rejected_rows_are_not_a_lost_race(client, run, player):
+    segment = f"{player}{SEGMENT_SUFFIX}"
+    with pytest.raises(Exception, match="Error draining WAL entries"):
+        run(DatabaseService.add_wal_entries, segment, None, 100, [entry(None)])
+    assert not checkpoint_exists(segment)
+
+
+def test_poison_record_is_quarantined(tmp_path, client, run, player):
+    async def scenario():
+        wal = ScoreWal(directory=str(tmp_path), batch_size=10, quarantine_attempts=2)
+        wal._open()
+        for score in range(3):
+            await wal.append(entry(player, score))
+        await wal.append(entry(None, 99))  # name is NOT NULL
+        for score in range(3, 6):
+            await wal.append(entry(player, score))
+        poisoned = wal._active
+        poisoned.sealed = True
+        wal._active = None
+        for score in range(6, 8):
+            await wal.append(entry(player, score))
+
+        # The segment behind the bad record is not held up
+        assert await wal.drain() == 2
+        await drain_all(wal)
+        assert wal.quarantined == 1
+        return poisoned
+
+    poisoned = run(scenario)
+    assert count_rows(player) == 8
+    assert not os.path.exists(poisoned.path)
+    with open(poisoned.path[:-len(SEGMENT_SUFFIX)] + DEAD_LETTER_SUFFIX, "rb") as dead:
+        lines = [orjson.loads(line) for line in dead]
+    assert len(lines) == 1
+    assert orjson.loads(lines[0]["record"])["score"] == 99
+    assert lines[0]["segment"] == poisoned.name
+
+
+def test_outage_quarantines_nothing(tmp_path, client, run, player, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise Exception("database is down")
+
+    async def scenario():
+        wal = ScoreWal(directory=str(tmp_path), batch_size=10, quarantine_attempts=2)
+        wal._open()
+        for score in range(3):
+            await wal.append(entry(player, score))
+        with monkeypatch.context() as patch:
+            patch.setattr(DatabaseService, "add_wal_entries", unavailable)
+            patch.setattr(DatabaseService, "get_wal_checkpoint", unavailable)
+            for _ in range(10):
+                with pytest.raises(Exception, match="down"):
+                    await wal.drain()
+        assert (wal.quarantined, wal.backlog()) == (0, 3)
+        await drain_all(wal)
+
+    run(scenario)
+    assert count_rows(player) == 3
+
+
+def test_segments_are_created_off_the_loop(tmp_path):
+    created_in = []
+
+    class RecordingWal(ScoreWal):
+        def _create_segment(self):
+            created_in.append(threading.get_ident())
+            return super()._create_segment()
+
+    async def scenario():
+        wal = RecordingWal(directory=str(tmp_path), segment_bytes=4096, sync_delay=0)
+        for score in range(200):
+            await wal.append(entry("rollover", score))
+        segments = len(wal._segments)
+        crash(wal)
+        return segments
+
+    loop_thread = threading.get_ident()
+    assert asyncio.run(scenario()) > 2
+    assert created_in and loop_thread not in created_in
+
+
+def test_unsynced_record_is_not_stored_twice(tmp_path, client, headers, run, player, monkeypatch):
+    wal = ScoreWal(directory=str(tmp_path), sync_delay=0)
+    monkeypatch.setattr(leaderboard_controller, "SCORE_WAL_ENABLED", True)
+    monkeypatch.setattr(leaderboard_controller, "score_wal", wal)
+
+    def failing_msync(ranges):
+        raise OSError("I/O error")
+
+    monkeypatch.setattr(wal, "_msync", failing_msync)
+    response = client.post("/api/leaderboard", json={"name": player, "score": 10, "maxCombo": 0}, headers=headers)
+    assert response.status_code == 503
+    assert count_rows(player) == 0
+
+    monkeypatch.undo()
+
+    async def scenario():
+        await wal._sync()
+        await drain_all(wal)
+        await wal.close()
+
+    run(scenario)
+    assert count_rows(player) == 1
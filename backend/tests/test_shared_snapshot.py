@@ -0,0 +1,18 @@
+"""Shared leaderboard snapshot file handling."""
+import errno
+import os
+
+import pytest
+
+from app.services.shared_snapshot import SharedSnapshot
+
+
+def test_snapshot_is_not_opened_through_a_symlink(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.write_bytes(b"keep me")
+    os.symlink(target, tmp_path / "leaderboard.snapshot")
+
+    with pytest.raises(OSError) as raised:
+        SharedSnapshot(str(tmp_path / "leaderboard.snapshot"), 4096).version()
+    assert raised.value.errno == errno.ELOOP
+    assert target.read_bytes() == b"keep me"
@@ -2,7 +2,14 @@ import React, { useState, useEffect, useRef } from 'react';
 import ArcadeCanvas from './components/ArcadeCanvas';
 import { GameState, GameStats, LeaderboardEntry } from './types';
 import { generateCoachCommentary } from './services/geminiService';
-import { getLeaderboard, addScoreToLeaderboard } from './services/apiService';
+import {
+  getLeaderboard,
+  addScoreToLeaderboard,
+  startGameSession,
+  submitGameSession,
+  GameEventLog,
+  GameSession
+} from './services/apiService';
 
 const GAME_DURATION = 180; // 3 minutes
 const LEADERBOARD_KEY = 'neon-hoops-leaderboard';
@@ -39,6 +46,13 @@ const App: React.FC = () => {
   const scoreRef = useRef<number>(0);
   const maxComboRef = useRef<number>(0);
 
+  // Server-side validation: the session issued at game start and the event
+  // log (times relative to the game start) the backend replays on game over
+  const sessionRef = useRef<Promise<GameSession | null> | null>(null);
+  const gameStartRef = useRef<number>(0);
+  const eventLogRef = useRef<GameEventLog>({ shots: [], hits: [], hitTimes: [], swishes: [] });
+  const shotIndexRef = useRef<Map<number, number>>(new Map());
+
   // Load leaderboard function
   const loadLeaderboard = async () => {
     try {
@@ -86,9 +100,17 @@ const App: React.FC = () => {
     // The user played the game, so we should record it
     
     try {
-      // Save to backend
-      console.log("Calling addScoreToLeaderboard with:", { finalName, finalScore, finalMaxCombo });
-      const newEntry = await addScoreToLeaderboard(finalName, finalScore, finalMaxCombo);
+      // Save to backend: the replayed event log if the game has a session,
+      // otherwise the score as counted here
+      const session = sessionRef.current ? await sessionRef.current : null;
+      let newEntry: LeaderboardEntry;
+      if (session) {
+        console.log("Calling submitGameSession with:", { finalName, shots: eventLogRef.current.shots.length });
+        newEntry = await submitGameSession(session.sessionId, finalName, eventLogRef.current);
+      } else {
+        console.log("Calling addScoreToLeaderboard with:", { finalName, finalScore, finalMaxCombo });
+        newEntry = await addScoreToLeaderboard(finalName, finalScore, finalMaxCombo);
+      }
       console.log("Score saved successfully:", newEntry);
       setLastEntryTimestamp(newEntry.timestamp || Date.now());
       
@@ -142,6 +164,16 @@ const App: React.FC = () => {
     gameOverHandledRef.current = false;
     scoreRef.current = 0;
     maxComboRef.current = 0;
+
+    // New session and empty event log; a game without a session (backend
+    // unreachable) still saves its score the old way
+    gameStartRef.current = Date.now();
+    eventLogRef.current = { shots: [], hits: [], hitTimes: [], swishes: [] };
+    shotIndexRef.current = new Map();
+    sessionRef.current = startGameSession().catch((error) => {
+      console.error("Failed to start game session", error);
+      return null;
+    });
     
     setScore(0);
     setCombo(0);
@@ -238,6 +270,21 @@ const App: React.FC = () => {
     }
   };
 
+  const handleThrow = (ballId: number, time: number) => {
+    const log = eventLogRef.current;
+    shotIndexRef.current.set(ballId, log.shots.length);
+    log.shots.push(time - gameStartRef.current);
+  };
+
+  const handleHit = (ballId: number, time: number, isSwish: boolean) => {
+    const shotIndex = shotIndexRef.current.get(ballId);
+    if (shotIndex === undefined) return;
+    const log = eventLogRef.current;
+    log.hits.push(shotIndex);
+    log.hitTimes.push(time - gameStartRef.current);
+    log.swishes.push(isSwish);
+  };
+
   // Timer Effect
   useEffect(() => {
     if (gameState === GameState.PLAYING) {
@@ -353,6 +400,8 @@ const App: React.FC = () => {
           key={gameSessionId}
           onScoreUpdate={handleScoreUpdate}
           onGameOver={handleGameOver}
+          onThrow={handleThrow}
+          onHit={handleHit}
           gameActive={gameState === GameState.PLAYING}
           timeLeft={timeLeft}
         />
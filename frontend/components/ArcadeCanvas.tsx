@@ -6,6 +6,9 @@ interface ArcadeCanvasProps {
   onGameOver: () => void;
   gameActive: boolean;
   timeLeft: number;
+  // Event log for server-side replay: throw and score times (Date.now())
+  onThrow?: (ballId: number, time: number) => void;
+  onHit?: (ballId: number, time: number, isSwish: boolean) => void;
 }
 
 // Physics Constants
@@ -20,7 +23,9 @@ const ArcadeCanvas: React.FC<ArcadeCanvasProps> = ({
   onScoreUpdate, 
   onGameOver, 
   gameActive,
-  timeLeft 
+  timeLeft,
+  onThrow,
+  onHit
 }) => {
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const containerRef = useRef<HTMLDivElement>(null);
@@ -198,6 +203,7 @@ const ArcadeCanvas: React.FC<ArcadeCanvasProps> = ({
             points += bonus;
 
             onScoreUpdate(points, comboRef.current > 1);
+            onHit?.(ball.id, now, isSwish);
 
             // Visuals
             createExplosion(ball.pos.x, ball.pos.y, '#fbbf24'); // Amber
@@ -390,6 +396,7 @@ const ArcadeCanvas: React.FC<ArcadeCanvasProps> = ({
         ball.dragStart = null;
         ball.dragCurrent = null;
         ball.createdAt = Date.now(); // Reset creation time to throw time for cleanup logic
+        onThrow?.(ball.id, ball.createdAt);
 
         // Move to active balls
         activeBallsRef.current.push(ball);
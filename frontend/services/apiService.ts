@@ -11,6 +11,10 @@ const DEFAULT_API_TOKEN = import.meta.env.VITE_API_TOKEN || 'shooting-game-api-t
 let cachedToken: string | null = null;
 let tokenPromise: Promise<string> | null = null;
 
+// Read-your-writes deadline returned by the last score submission; sent back
+// on reads so they see that score even if the backend's read replicas lag
+let readYourWrites: string | null = null;
+
 export interface LeaderboardEntry {
   name: string;
   score: number;
@@ -24,6 +28,20 @@ export interface AddScoreRequest {
   maxCombo: number;
 }
 
+export interface GameSession {
+  sessionId: string;
+  issuedAt: number;
+  expiresAt: number;
+}
+
+// Event log of one game; times are milliseconds since the game started
+export interface GameEventLog {
+  shots: number[];
+  hits: number[];
+  hitTimes: number[];
+  swishes: boolean[];
+}
+
 export interface LeaderboardResponse {
   entries: LeaderboardEntry[];
   total: number;
@@ -76,12 +94,16 @@ async function getApiTokenInternal(): Promise<string> {
 /**
  * Get authorization headers with token
  */
-async function getAuthHeaders(): Promise<HeadersInit> {
+async function getAuthHeaders(): Promise<Record<string, string>> {
   const token = await getApiTokenInternal();
-  return {
+  const headers: Record<string, string> = {
     'token': token,
     'Content-Type': 'application/json',
   };
+  if (readYourWrites && Number(readYourWrites) > Date.now()) {
+    headers['X-Read-Your-Writes'] = readYourWrites;
+  }
+  return headers;
 }
 
 /**
@@ -96,6 +118,9 @@ export async function getLeaderboard(limit: number = 10): Promise<LeaderboardEnt
     const response = await fetch(`${API_BASE_URL}/leaderboard?limit=${limit}`, {
       method: 'GET',
       headers: headers,
+      // Always revalidate: an unchanged leaderboard costs a 304 with no body,
+      // and a just-submitted score is never hidden by a cached copy
+      cache: 'no-cache',
     });
 
     console.log('Leaderboard response status:', response.status, response.statusText);
@@ -171,6 +196,8 @@ export async function addScoreToLeaderboard(
       throw new Error(`Failed to add score: ${response.status} ${response.statusText}`);
     }
 
+    readYourWrites = response.headers.get('X-Read-Your-Writes') || readYourWrites;
+
     const data: LeaderboardEntry = await response.json();
     // Ensure the response has all required fields
     return {
@@ -193,3 +220,59 @@ export async function getApiToken(): Promise<string> {
   return await getApiTokenInternal();
 }
 
+/**
+ * Start a game session; its id is needed to submit the game's event log
+ */
+export async function startGameSession(): Promise<GameSession> {
+  const headers = await getAuthHeaders();
+  const response = await fetch(`${API_BASE_URL}/sessions`, {
+    method: 'POST',
+    headers: headers,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Failed to start game session: ${response.status} ${response.statusText}`);
+  }
+  return await response.json();
+}
+
+/**
+ * Submit a game's event log; the backend replays it and stores the recomputed score
+ */
+export async function submitGameSession(
+  sessionId: string,
+  name: string,
+  log: GameEventLog
+): Promise<LeaderboardEntry> {
+  try {
+    const headers = await getAuthHeaders();
+    const response = await fetch(`${API_BASE_URL}/sessions/${encodeURIComponent(sessionId)}/score`, {
+      method: 'POST',
+      headers: headers,
+      body: JSON.stringify({ name, ...log }),
+    });
+
+    if (!response.ok) {
+      const errorText = await response.text();
+      console.error('API Error Response:', {
+        status: response.status,
+        statusText: response.statusText,
+        body: errorText
+      });
+      throw new Error(`Failed to submit game: ${response.status} ${response.statusText}`);
+    }
+
+    readYourWrites = response.headers.get('X-Read-Your-Writes') || readYourWrites;
+
+    const data: LeaderboardEntry = await response.json();
+    return {
+      name: data.name || 'Anonymous',
+      score: data.score || 0,
+      maxCombo: data.maxCombo || 0,
+      timestamp: data.timestamp || Date.now()
+    };
+  } catch (error) {
+    console.error('Error submitting game session:', error);
+    throw error;
+  }
+}